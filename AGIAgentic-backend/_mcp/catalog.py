@@ -0,0 +1,100 @@
+
+
+import os
+import json
+import time
+import hashlib
+
+from typing import Any, Dict, List
+from mcp.types import Tool as MCPTool
+from langchain_mcp_adapters.sessions import Connection # type: ignore
+
+from common.logger import logger
+
+
+def connection_fingerprint(connection: Connection) -> str:
+  """ Fingerprint of a server connection, a cached catalog entry is only reused for the same connection
+  Args:
+      connection (Connection): The server connection.
+  Returns:
+      str: A short hash of the connection configuration.
+  """
+  payload = json.dumps(connection, sort_keys=True, ensure_ascii=False, default=str)
+  return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def definitions_digest(definitions: Dict[str, List[MCPTool]]) -> str:
+  """ Digest of a tool catalog, used to detect changes between refreshes
+  Args:
+      definitions (Dict[str, List[MCPTool]]): Server names mapped to their tool definitions.
+  Returns:
+      str: A hash of the catalog.
+  """
+  payload = json.dumps(
+    {server_name: [tool.model_dump(mode="json") for tool in tools] for server_name, tools in definitions.items()},
+    sort_keys=True, ensure_ascii=False
+  )
+  return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MCPToolCatalog:
+  """ Last known MCP tool definitions persisted to a local JSON file
+  Loading the file lets the application build its MCP tools at boot without contacting the servers.
+  """
+
+  def __init__(self, path: str) -> None:
+    """ Initialize the catalog
+    Args:
+        path (str): Path of the catalog file, an empty path disables persistence.
+    """
+    self.path = path
+
+  def load(self, connections: Dict[str, Connection]) -> Dict[str, List[MCPTool]]:
+    """ Load the cached definitions of the configured servers
+    Args:
+        connections (Dict[str, Connection]): Server names mapped to their connections.
+    Returns:
+        Dict[str, List[MCPTool]]: Definitions of the servers whose connection did not change since they were cached.
+    """
+    if not self.path or not os.path.exists(self.path):
+      return {}
+    try:
+      with open(self.path, "r", encoding="utf-8") as f:
+        servers: Dict[str, Any] = json.load(f).get("servers", {})
+      definitions = {
+        server_name: [MCPTool.model_validate(tool) for tool in servers[server_name]["tools"]]
+        for server_name, connection in connections.items()
+        if server_name in servers and servers[server_name].get("fingerprint") == connection_fingerprint(connection)
+      }
+    except Exception as e:
+      logger.error(f"Error loading MCP tool catalog {self.path}: {str(e)}")
+      return {}
+    logger.info(f"Loaded MCP tool catalog from {self.path}, services: {list(definitions.keys())}")
+    return definitions
+
+  def save(self, connections: Dict[str, Connection], definitions: Dict[str, List[MCPTool]]) -> None:
+    """ Persist the definitions of the configured servers
+    Args:
+        connections (Dict[str, Connection]): Server names mapped to their connections.
+        definitions (Dict[str, List[MCPTool]]): Server names mapped to their tool definitions.
+    """
+    if not self.path:
+      return
+    payload = {
+      "saved_at": time.time(),
+      "servers": {
+        server_name: {
+          "fingerprint": connection_fingerprint(connections[server_name]),
+          "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+        }
+        for server_name, tools in definitions.items() if server_name in connections
+      },
+    }
+    try:
+      os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+      tmp_path = f"{self.path}.tmp"
+      with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+      os.replace(tmp_path, self.path)
+    except Exception as e:
+      logger.error(f"Error saving MCP tool catalog {self.path}: {str(e)}")
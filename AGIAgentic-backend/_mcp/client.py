@@ -1,15 +1,24 @@
 
 
+import time
 import asyncio
 import traceback
 
-from typing import Dict, Union, List
+from typing import Any, Callable, Dict, Tuple, Union, List
+from mcp.types import Tool as MCPTool
 from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.sessions import Connection # type: ignore
+from langchain_mcp_adapters.sessions import Connection, create_session # type: ignore
+from langchain_mcp_adapters.tools import _list_all_tools, convert_mcp_tool_to_langchain_tool # type: ignore
 from langchain_mcp_adapters.client import MultiServerMCPClient # type: ignore
 
 from conf.config import config_manager
 from common.logger import logger
+from .pool import MCPSessionPool
+from .catalog import MCPToolCatalog, definitions_digest
+
+
+# Keys of a service configuration that are handled here and not passed to the MCP client
+MCP_EXTRA_CONFIG_KEYS = ("tool_cache", "discovery_timeout", "discovery_retries")
 
 
 class MCPClientManager:
@@ -25,6 +34,11 @@ class MCPClientManager:
     self.mcp_configs = mcp_configs or {}
     self._client = None
     self._client_lock = asyncio.Lock()
+    self._session_pool: Union[MCPSessionPool, None] = None
+    self.catalog = MCPToolCatalog(config_manager.mcp_config.TOOL_CATALOG_PATH)
+    self._definitions: Dict[str, List[MCPTool]] = {}
+    self._loaded_from_catalog = False
+    self._discovery_stats: Dict[str, Dict[str, Any]] = {}
   
   async def _validate_config(self, config: Connection) -> bool:
     """ Validate MCP configuration
@@ -78,7 +92,9 @@ class MCPClientManager:
             is_valid = await self._validate_config(config)
             logger.debug(f"Validation result for service {service_name}: {is_valid}")
             if is_valid:
-              filtered_configs[service_name] = config
+              filtered_configs[service_name] = { # type: ignore
+                key: value for key, value in config.items() if key not in MCP_EXTRA_CONFIG_KEYS
+              }
           except Exception as e:
             logger.warning(f"Invalid MCP configuration for service {service_name}: {str(e)}")
             continue
@@ -99,15 +115,169 @@ class MCPClientManager:
     if self._client is not None:
       async with self._client_lock:
         try:
-          # langchain_mcp_adapters does not have a close method yet
           logger.info("Closing MCP client.")
+          if self._session_pool is not None:
+            await self._session_pool.close()
         except Exception as e:
           logger.error(f"Error closing MCP client: {str(e)}")
         finally:
+          self._session_pool = None
           self._client = None
 
-  async def get_all_tools(self) -> List[BaseTool]:
+  @property
+  def session_pool(self) -> Union[MCPSessionPool, None]:
+    """ The pool of long-lived MCP sessions, None until tools are built or when pooling is disabled """
+    return self._session_pool
+
+  @property
+  def loaded_from_catalog(self) -> bool:
+    """ Whether the current tools were built from the cached catalog rather than a live discovery """
+    return self._loaded_from_catalog
+
+  async def _list_server_tools(self, server_name: str, connection: Connection) -> List[MCPTool]:
+    """ List the tool definitions of one MCP service over a short-lived session """
+    async with create_session(connection) as session:
+      await session.initialize()
+      return await _list_all_tools(session)
+
+  def _discovery_policy(self, server_name: str) -> Tuple[float, int]:
+    """ Discovery timeout and retries of a service, `discovery_timeout`/`discovery_retries` in its configuration override the settings """
+    config: Dict[str, Any] = self.mcp_configs.get(server_name, {}) # type: ignore
+    mcp_config = config_manager.mcp_config
+    return (
+      float(config.get("discovery_timeout", mcp_config.DISCOVERY_TIMEOUT)),
+      int(config.get("discovery_retries", mcp_config.DISCOVERY_RETRIES))
+    )
+
+  async def _discover_server(self, server_name: str, connection: Connection) -> List[MCPTool]:
+    """ List the tool definitions of one MCP service with its own timeout and retry policy """
+    timeout, retries = self._discovery_policy(server_name)
+    stats = self._discovery_stats.setdefault(server_name, {
+      "status": "pending", "attempts": 0, "successes": 0, "failures": 0, "timeouts": 0,
+      "last_latency_ms": None, "total_latency_ms": 0.0, "tools": 0, "last_error": None, "last_success_at": None,
+    })
+    delay = config_manager.mcp_config.DISCOVERY_RETRY_BACKOFF
+    for attempt in range(retries + 1):
+      stats["attempts"] += 1
+      start_time = time.perf_counter()
+      try:
+        mcp_tools = await asyncio.wait_for(self._list_server_tools(server_name, connection), timeout=timeout)
+      except Exception as e:
+        stats["failures"] += 1
+        if isinstance(e, asyncio.TimeoutError):
+          stats["timeouts"] += 1
+          e = TimeoutError(f"no answer within {timeout}s")
+        stats["last_error"] = str(e)
+        logger.warning(f"Discovering tools of MCP service {server_name} failed (attempt {attempt + 1}/{retries + 1}): {str(e)}")
+        if attempt == retries:
+          stats["status"] = "failed"
+          raise e
+        await asyncio.sleep(delay)
+        delay *= 2
+        continue
+      latency_ms = (time.perf_counter() - start_time) * 1000
+      stats.update(status="ok", last_latency_ms=round(latency_ms, 2), tools=len(mcp_tools), last_error=None, last_success_at=time.time())
+      stats["successes"] += 1
+      stats["total_latency_ms"] += latency_ms
+      return mcp_tools
+    return []
+
+  async def discover_tool_definitions(
+    self,
+    timeout: Union[float, None] = None,
+    on_result: Union[Callable[[str, List[MCPTool]], None], None] = None
+  ) -> Dict[str, List[MCPTool]]:
+    """ List the tool definitions of every MCP service concurrently
+    Args:
+        timeout (Union[float, None]): Seconds to wait for all services, services answering later are left out.
+        on_result (Union[Callable[[str, List[MCPTool]], None], None]): Called as soon as each service answers.
+    Returns:
+        Dict[str, List[MCPTool]]: Service names mapped to their tool definitions, failed services are left out.
+    """
+    client = await self.get_or_create_client()
+    if client is None:
+      logger.error("MCP client is not available.")
+      return {}
+    connections: Dict[str, Connection] = client.connections # type: ignore
+    tasks = {
+      asyncio.create_task(self._discover_server(server_name, connection)): server_name
+      for server_name, connection in connections.items()
+    }
+    definitions: Dict[str, List[MCPTool]] = {}
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    pending = set(tasks)
+    while pending:
+      remaining = None if deadline is None else max(0.0, deadline - loop.time())
+      done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+      if not done:
+        break
+      for task in done:
+        server_name = tasks[task]
+        if task.exception() is not None:
+          logger.error(f"Error retrieving tools from MCP service {server_name}: {str(task.exception())}")
+          continue
+        definitions[server_name] = task.result()
+        if on_result is not None:
+          on_result(server_name, task.result())
+    if pending:
+      logger.warning(f"MCP services {[tasks[task] for task in pending]} did not answer within {timeout}s, they are merged by the background refresh.")
+      for task in pending:
+        task.cancel()
+      await asyncio.gather(*pending, return_exceptions=True)
+    return definitions
+
+  def _apply_tool_cache_policies(self, server_name: str, tools: List[BaseTool]) -> List[BaseTool]:
+    """ Mark MCP tools as cacheable according to the `tool_cache` section of their service
+    `"tool_cache": {"<tool name>": {"ttl": 300, "key_args": ["query"]}}`, "*" matches every tool of the service.
+    Args:
+        server_name (str): The MCP service name.
+        tools (List[BaseTool]): The tools of the service.
+    Returns:
+        List[BaseTool]: The same tools, with a `cache` entry in the metadata of cacheable ones.
+    """
+    policies: Dict[str, Any] = self.mcp_configs.get(server_name, {}).get("tool_cache", {}) or {} # type: ignore
+    for tool in tools:
+      policy = policies.get(tool.name, policies.get("*"))
+      if policy:
+        tool.metadata = {**(tool.metadata or {}), "cache": policy}
+    return tools
+
+  def build_tools(self, definitions: Dict[str, List[MCPTool]]) -> List[BaseTool]:
+    """ Build LangChain tools from MCP tool definitions, without contacting the services
+    The tools call their service through pooled sessions, or a new session per call when pooling is disabled.
+    Args:
+        definitions (Dict[str, List[MCPTool]]): Service names mapped to their tool definitions.
+    Returns:
+        List[BaseTool]: The tools of all services.
+    """
+    if self._client is None:
+      return []
+    connections: Dict[str, Connection] = self._client.connections # type: ignore
+    if config_manager.mcp_config.SESSION_POOL_ENABLED and self._session_pool is None:
+      self._session_pool = MCPSessionPool(connections)
+    tools: List[BaseTool] = []
+    for server_name, mcp_tools in definitions.items():
+      if server_name not in connections:
+        continue
+      if self._session_pool is not None:
+        server_tools = self._session_pool.build_tools(server_name, mcp_tools)
+      else:
+        server_tools = [
+          convert_mcp_tool_to_langchain_tool(None, tool, connection=connections[server_name], server_name=server_name)
+          for tool in mcp_tools
+        ]
+      for tool in server_tools:
+        # Labels the tool call metrics with the service
+        tool.metadata = {**(tool.metadata or {}), "mcp_server": server_name}
+      tools.extend(self._apply_tool_cache_policies(server_name, server_tools))
+    return tools
+
+  async def get_all_tools(self, use_catalog: bool = True) -> List[BaseTool]:
     """ Get all available tools from the MCP services
+    The cached catalog is used when it covers every configured service, otherwise the services are queried.
+    Args:
+        use_catalog (bool): Whether the cached catalog may be used instead of querying the services.
     Returns:
         List: A list of tools available from all configured MCP services.
     """
@@ -115,9 +285,20 @@ class MCPClientManager:
     if client is None:
       logger.error("MCP client is not available.")
       return []
+    connections: Dict[str, Connection] = client.connections # type: ignore
     try:
-      # Set a timeout for getting tools
-      all_tools = await asyncio.wait_for(client.get_tools(), timeout=config_manager.mcp_config.GET_ALL_TOOLS_TIMEOUT)
+      cached = self.catalog.load(connections) if use_catalog else {}
+      self._loaded_from_catalog = bool(cached) and set(cached) == set(connections)
+      if self._loaded_from_catalog:
+        definitions = cached
+      else:
+        # Wait at most GET_ALL_TOOLS_TIMEOUT, services that have not answered by then keep their cached tools
+        discovered = await self.discover_tool_definitions(timeout=config_manager.mcp_config.GET_ALL_TOOLS_TIMEOUT)
+        definitions = {**cached, **discovered}
+        if discovered:
+          self.catalog.save(connections, definitions)
+      self._definitions = definitions
+      all_tools = self.build_tools(definitions)
       if not all_tools:
         logger.warning("No tools retrieved from MCP services.")
         return []
@@ -133,6 +314,46 @@ class MCPClientManager:
       logger.error(f"Error retrieving tools from MCP Services: {str(e)}")
       return []
 
+  @property
+  def missing_services(self) -> List[str]:
+    """ Configured services whose tools are not known yet """
+    if self._client is None:
+      return []
+    return [server_name for server_name in self._client.connections if server_name not in self._definitions] # type: ignore
+
+  async def refresh_tools(self, on_update: Callable[[List[BaseTool]], None]) -> None:
+    """ Query every service again and reconcile the catalog as each one answers
+    Services that fail keep their last known definitions.
+    Args:
+        on_update (Callable[[List[BaseTool]], None]): Called with the full new tool list whenever a service changed.
+    """
+    client = await self.get_or_create_client()
+    if client is None:
+      return
+    connections: Dict[str, Connection] = client.connections # type: ignore
+
+    def merge(server_name: str, mcp_tools: List[MCPTool]) -> None:
+      if server_name in self._definitions and \
+        definitions_digest({server_name: mcp_tools}) == definitions_digest({server_name: self._definitions[server_name]}):
+        return
+      logger.info(f"MCP tool catalog changed, service: {server_name}, tools: {len(mcp_tools)}")
+      self._definitions = {**self._definitions, server_name: mcp_tools}
+      self.catalog.save(connections, self._definitions)
+      on_update(self.build_tools(self._definitions))
+
+    # bounded by the per-service discovery timeouts
+    await self.discover_tool_definitions(on_result=merge)
+
+  def discovery_stats(self) -> Dict[str, Any]:
+    """ Get discovery latency and failure counters per service """
+    return {
+      server_name: {
+        **{key: value for key, value in stats.items() if key != "total_latency_ms"},
+        "avg_latency_ms": round(stats["total_latency_ms"] / stats["successes"], 2) if stats["successes"] else None,
+      }
+      for server_name, stats in self._discovery_stats.items()
+    }
+
   def get_mcp_tools(self) -> List[BaseTool]:
     """ Get all available tools from the MCP services (synchronous wrapper)
     Returns:
@@ -1,12 +1,15 @@
 
 import os
 import json
+import asyncio
 import concurrent.futures
 
-from typing import Any, List
+from typing import Any, Callable, List, Optional, Tuple
 from typing_extensions import Self
 from .client import MCPClientManager
 from common.logger import logger
+from conf.config import config_manager as app_config_manager
+from utils.tool.tool_cache import memoize_tools
 
 
 class MCPConfigManager:
@@ -55,21 +58,64 @@ class MCPManager:
     """ Initialize the MCP Manager """
     self.config_manager = config
     self.client_manager = client(self.config_manager.load_config())
+    self._refresh_task: Optional[asyncio.Task[None]] = None
+
+  def start_refresh(self, on_update: Callable[[List[Any]], None]) -> None:
+    """ Start reconciling the MCP tool catalog in the background
+    Must be called from the serving event loop. The first refresh runs right away when the tools were
+    built from the cached catalog or some services are missing, then every `MCP_TOOL_CATALOG_REFRESH_INTERVAL` seconds.
+    Args:
+        on_update (Callable[[List[Any]], None]): Called with the new tools whenever the catalog changes.
+    """
+    interval = app_config_manager.mcp_config.TOOL_CATALOG_REFRESH_INTERVAL
+    catch_up = self.client_manager.loaded_from_catalog or bool(self.client_manager.missing_services)
+    if self._refresh_task is not None or (interval <= 0 and not catch_up):
+      return
+    self._refresh_task = asyncio.create_task(self._refresh_forever(interval, on_update), name="mcp-catalog-refresh")
+
+  async def _refresh_forever(self, interval: float, on_update: Callable[[List[Any]], None]) -> None:
+    # catch up right away when booted from the cache or when some services did not answer in time
+    catch_up = self.client_manager.loaded_from_catalog or bool(self.client_manager.missing_services)
+    delay = 0.0 if catch_up else interval
+    while True:
+      await asyncio.sleep(delay)
+      try:
+        # Wrap tools that opted into result caching
+        await self.client_manager.refresh_tools(lambda tools: on_update(memoize_tools(tools)))
+      except Exception as e:
+        logger.error(f"Error refreshing MCP tool catalog: {str(e)}")
+      if interval <= 0:
+        return
+      delay = interval
+
+  async def stop_refresh(self) -> None:
+    """ Stop the background catalog refresh """
+    if self._refresh_task is not None:
+      self._refresh_task.cancel()
+      try:
+        await self._refresh_task
+      except (asyncio.CancelledError, Exception):
+        pass
+      self._refresh_task = None
 
 
-def initialize_mcp_manager() -> List[Any]:
-  """ Initialize the MCP Manager singleton """
+def initialize_mcp_manager() -> Tuple[MCPManager, List[Any]]:
+  """ Initialize the MCP Manager singleton
+  Returns:
+      Tuple[MCPManager, List[Any]]: The MCP manager, which owns the MCP sessions, and the MCP tools.
+  """
   mcp_tools: List[Any] = []
-  mcp_manager = MCPManager(MCPClientManager, MCPConfigManager(config_file="mcp_config.json"))
+  mcp_manager = MCPManager(MCPClientManager, MCPConfigManager(config_file=app_config_manager.mcp_config.CONFIG_PATH))
   try: 
     with concurrent.futures.ThreadPoolExecutor() as executor:
         future = executor.submit(mcp_manager.client_manager.get_mcp_tools)
         tools = future.result()
-        mcp_tools.extend(tools)
+        # Wrap tools that opted into result caching
+        mcp_tools.extend(memoize_tools(tools))
         logger.info(f"Retrieved {len(tools)} tools from MCP services.")
   except Exception as e:
     logger.error(f"Error initializing MCP Manager or retrieving tools: {str(e)}")
-  return mcp_tools
+  return mcp_manager, mcp_tools
     
 
 
@@ -0,0 +1,368 @@
+
+
+import time
+import anyio
+import httpx
+import asyncio
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, Tool as MCPTool
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.sessions import Connection, create_session # type: ignore
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool # type: ignore
+
+from conf.config import config_manager
+from common.logger import logger
+
+
+# Errors that leave a session unusable: a lost connection, or a call whose answer may still arrive
+_TRANSPORT_ERRORS = (
+  asyncio.CancelledError, TimeoutError, ConnectionError, httpx.TransportError,
+  anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+)
+
+
+def _breaks_session(error: BaseException) -> bool:
+  """ Whether an error raised by a borrowed session leaves it unusable
+  A JSON-RPC error answered by the server (unknown tool, invalid params...) does not, the session
+  closing or a request timing out does.
+  """
+  if isinstance(error, McpError):
+    return error.error.code in (CONNECTION_CLOSED, httpx.codes.REQUEST_TIMEOUT)
+  return isinstance(error, _TRANSPORT_ERRORS)
+
+
+class PooledSession:
+  """ A long-lived MCP session
+  The session context is entered and exited by one holder task, as the MCP transports
+  require, while callers borrow the session from the pool.
+  """
+
+  def __init__(self, server_name: str) -> None:
+    self.server_name = server_name
+    self.session: Optional[ClientSession] = None
+    self.error: Optional[BaseException] = None
+    self.created_at = time.monotonic()
+    self.last_used = self.created_at
+    self.last_checked = self.created_at
+    self.broken = False
+    self._ready = asyncio.Event()
+    self._closing = asyncio.Event()
+    self._task: Optional[asyncio.Task[None]] = None
+
+  async def open(self, connection: Connection, timeout: float) -> None:
+    """ Start the holder task and wait for the MCP `initialize` handshake
+    Args:
+        connection (Connection): The server connection.
+        timeout (float): Seconds to wait for the handshake.
+    """
+    self._task = asyncio.create_task(self._hold(connection), name=f"mcp-session-{self.server_name}")
+    try:
+      await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+      await self.close()
+      raise
+    if self.session is None:
+      await self.close()
+      raise ConnectionError(f"Failed to open MCP session to '{self.server_name}': {self.error}")
+
+  async def _hold(self, connection: Connection) -> None:
+    try:
+      async with create_session(connection) as session:
+        await session.initialize()
+        self.session = session
+        self._ready.set()
+        await self._closing.wait()
+    except Exception as e:
+      self.error = e
+      if self.session is not None:
+        logger.warning(f"MCP session to '{self.server_name}' dropped: {str(e)}")
+    finally:
+      self.session = None
+      self.broken = True
+      self._ready.set()
+
+  @property
+  def alive(self) -> bool:
+    """ Whether the session can still be used """
+    return self.session is not None and not self.broken
+
+  async def ping(self, timeout: float) -> bool:
+    """ Check the session with an MCP ping
+    Args:
+        timeout (float): Seconds to wait for the pong.
+    Returns:
+        bool: True if the server answered.
+    """
+    if not self.alive:
+      return False
+    try:
+      await asyncio.wait_for(self.session.send_ping(), timeout=timeout) # type: ignore
+      self.last_checked = time.monotonic()
+      return True
+    except Exception as e:
+      logger.warning(f"MCP session health check to '{self.server_name}' failed: {str(e)}")
+      self.broken = True
+      return False
+
+  async def close(self, timeout: float = 5.0) -> None:
+    """ Ask the holder task to exit the session context and wait for it """
+    self.broken = True
+    self._closing.set()
+    if self._task is None:
+      return
+    try:
+      await asyncio.wait_for(asyncio.shield(self._task), timeout=timeout)
+    except Exception:
+      self._task.cancel()
+
+
+class ServerSessionPool:
+  """ Pool of long-lived sessions to one MCP server
+  Sessions are opened on demand up to `max_sessions`, health-checked with a ping when they
+  have not been used for a while, reopened with exponential backoff when they break and
+  closed after being idle for `idle_timeout` seconds.
+  """
+
+  def __init__(self, server_name: str, connection: Connection) -> None:
+    """ Initialize the pool
+    Args:
+        server_name (str): The MCP server name.
+        connection (Connection): The server connection.
+    """
+    mcp_config = config_manager.mcp_config
+    self.server_name = server_name
+    self.connection = connection
+    self.max_sessions = max(1, mcp_config.SESSION_POOL_MAX_SIZE)
+    self.idle_timeout = mcp_config.SESSION_IDLE_TIMEOUT
+    self.health_check_interval = mcp_config.SESSION_HEALTH_CHECK_INTERVAL
+    self.connect_timeout = mcp_config.SESSION_CONNECT_TIMEOUT
+    self.connect_retries = max(1, mcp_config.SESSION_CONNECT_RETRIES)
+    self.backoff = mcp_config.SESSION_RECONNECT_BACKOFF
+    self.backoff_max = mcp_config.SESSION_RECONNECT_BACKOFF_MAX
+    self._idle: List[PooledSession] = []
+    self._size = 0
+    self._in_use = 0
+    self._condition: Optional[asyncio.Condition] = None
+    self._closed = False
+    self._opened = 0
+    self._reconnects = 0
+    self._connect_failures = 0
+    self._health_check_failures = 0
+    self._reaped = 0
+    self._calls = 0
+
+  @property
+  def condition(self) -> asyncio.Condition:
+    # created lazily so the pool binds to the serving event loop
+    if self._condition is None:
+      self._condition = asyncio.Condition()
+    return self._condition
+
+  async def _open(self) -> PooledSession:
+    delay = self.backoff
+    for attempt in range(1, self.connect_retries + 1):
+      pooled = PooledSession(self.server_name)
+      try:
+        await pooled.open(self.connection, timeout=self.connect_timeout)
+        self._opened += 1
+        if attempt > 1:
+          self._reconnects += 1
+        logger.info(f"Opened MCP session to '{self.server_name}' (attempt {attempt}).")
+        return pooled
+      except Exception as e:
+        self._connect_failures += 1
+        logger.warning(f"Opening MCP session to '{self.server_name}' failed (attempt {attempt}/{self.connect_retries}): {str(e)}")
+        if attempt == self.connect_retries:
+          raise
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, self.backoff_max)
+    raise ConnectionError(f"Failed to open MCP session to '{self.server_name}'")
+
+  async def _checkout(self) -> Optional[PooledSession]:
+    """ Take an idle session, or reserve a slot for a new one (returns None) """
+    async with self.condition:
+      while True:
+        if self._closed:
+          raise RuntimeError(f"MCP session pool for '{self.server_name}' is closed")
+        if self._idle:
+          self._in_use += 1
+          return self._idle.pop()
+        if self._size < self.max_sessions:
+          self._size += 1
+          self._in_use += 1
+          return None
+        await self.condition.wait()
+
+  async def _discard(self, pooled: Optional[PooledSession]) -> None:
+    if pooled is not None:
+      await pooled.close()
+    async with self.condition:
+      self._size -= 1
+      self.condition.notify()
+
+  @asynccontextmanager
+  async def session(self) -> AsyncIterator[ClientSession]:
+    """ Borrow a session from the pool
+    A session that fails with a transport error, a timeout or a cancellation while borrowed is closed
+    instead of being returned to the pool, one that got a JSON-RPC error answer goes back to it.
+    Yields:
+        ClientSession: An initialized MCP session.
+    """
+    pooled = await self._checkout()
+    try:
+      if pooled is not None and not pooled.alive:
+        await pooled.close()
+        pooled = None
+      if pooled is not None and time.monotonic() - pooled.last_checked > self.health_check_interval:
+        if not await pooled.ping(timeout=self.connect_timeout):
+          self._health_check_failures += 1
+          await pooled.close()
+          pooled = None
+      if pooled is None:
+        pooled = await self._open()
+    except BaseException:
+      self._in_use -= 1
+      await self._discard(pooled)
+      raise
+
+    self._calls += 1
+    try:
+      yield pooled.session # type: ignore
+    except BaseException as e:
+      if _breaks_session(e):
+        pooled.broken = True
+      raise
+    finally:
+      pooled.last_used = time.monotonic()
+      self._in_use -= 1
+      if pooled.alive and not self._closed:
+        pooled.last_checked = pooled.last_used
+        async with self.condition:
+          self._idle.append(pooled)
+          self.condition.notify()
+      else:
+        await self._discard(pooled)
+
+  async def reap_idle(self) -> int:
+    """ Close sessions that have been idle longer than `idle_timeout`
+    Returns:
+        int: The number of closed sessions.
+    """
+    now = time.monotonic()
+    async with self.condition:
+      expired = [pooled for pooled in self._idle if not pooled.alive or now - pooled.last_used > self.idle_timeout]
+      self._idle = [pooled for pooled in self._idle if pooled not in expired]
+    for pooled in expired:
+      await self._discard(pooled)
+    self._reaped += len(expired)
+    return len(expired)
+
+  async def close(self) -> None:
+    """ Close every idle session and refuse new borrows """
+    self._closed = True
+    idle, self._idle = self._idle, []
+    await asyncio.gather(*(pooled.close() for pooled in idle), return_exceptions=True)
+    self._size -= len(idle)
+    if self._condition is not None:
+      async with self._condition:
+        self._condition.notify_all()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get pool statistics """
+    return {
+      "size": self._size,
+      "idle": len(self._idle),
+      "in_use": self._in_use,
+      "max_sessions": self.max_sessions,
+      "calls": self._calls,
+      "opened": self._opened,
+      "reconnects": self._reconnects,
+      "connect_failures": self._connect_failures,
+      "health_check_failures": self._health_check_failures,
+      "reaped": self._reaped,
+      "closed": self._closed,
+    }
+
+
+class PooledSessionProxy:
+  """ Session stand-in handed to the MCP tool converter, each call borrows a pooled session """
+
+  def __init__(self, pool: "MCPSessionPool", server_name: str) -> None:
+    self.pool = pool
+    self.server_name = server_name
+
+  async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+    async with self.pool.session(self.server_name) as session:
+      return await session.call_tool(name, arguments, **kwargs)
+
+
+class MCPSessionPool:
+  """ Session pools for every configured MCP server, plus the idle reaper task """
+
+  def __init__(self, connections: Dict[str, Connection]) -> None:
+    """ Initialize the session pools
+    Args:
+        connections (Dict[str, Connection]): Server names mapped to their connections.
+    """
+    self.pools: Dict[str, ServerSessionPool] = {
+      server_name: ServerSessionPool(server_name, connection) for server_name, connection in connections.items()
+    }
+    self._reaper: Optional[asyncio.Task[None]] = None
+
+  def _ensure_reaper(self) -> None:
+    if self._reaper is None or self._reaper.done():
+      self._reaper = asyncio.create_task(self._reap_forever(), name="mcp-session-reaper")
+
+  async def _reap_forever(self) -> None:
+    interval = config_manager.mcp_config.SESSION_REAP_INTERVAL
+    while True:
+      await asyncio.sleep(interval)
+      for pool in self.pools.values():
+        try:
+          reaped = await pool.reap_idle()
+          if reaped:
+            logger.info(f"Closed {reaped} idle MCP sessions to '{pool.server_name}'.")
+        except Exception as e:
+          logger.error(f"Error reaping MCP sessions to '{pool.server_name}': {str(e)}")
+
+  @asynccontextmanager
+  async def session(self, server_name: str) -> AsyncIterator[ClientSession]:
+    """ Borrow a session to a server
+    Args:
+        server_name (str): The MCP server name.
+    Yields:
+        ClientSession: An initialized MCP session.
+    """
+    self._ensure_reaper()
+    async with self.pools[server_name].session() as session:
+      yield session
+
+  def build_tools(self, server_name: str, mcp_tools: List[MCPTool]) -> List[BaseTool]:
+    """ Build LangChain tools that call a server through the pool
+    No session is opened here; sessions and the reaper start with the first tool call, on the serving event loop.
+    Args:
+        server_name (str): The MCP server name.
+        mcp_tools (List[MCPTool]): The tool definitions listed by the server.
+    Returns:
+        List[BaseTool]: The server tools.
+    """
+    proxy = PooledSessionProxy(self, server_name)
+    return [
+      convert_mcp_tool_to_langchain_tool(proxy, tool, server_name=server_name) # type: ignore
+      for tool in mcp_tools
+    ]
+
+  async def close(self) -> None:
+    """ Stop the reaper and close every session """
+    if self._reaper is not None:
+      self._reaper.cancel()
+      self._reaper = None
+    await asyncio.gather(*(pool.close() for pool in self.pools.values()), return_exceptions=True)
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get statistics of every server pool """
+    return {server_name: pool.stats() for server_name, pool in self.pools.items()}
@@ -5,6 +5,7 @@ from api.mcp_api import router as mcp_router
 from api.llm_api import router as llm_router
 from api.tool_api import router as tool_router
 from api.health_api import router as health_router
+from api.metrics_api import router as metrics_router
 from api.plan_executor_api import router as plan_executor_router
 
 
@@ -13,5 +14,6 @@ router.include_router(mcp_router)
 router.include_router(llm_router)
 router.include_router(tool_router)
 router.include_router(health_router)
+router.include_router(metrics_router)
 router.include_router(plan_executor_router)
 
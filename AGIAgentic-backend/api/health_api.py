@@ -1,9 +1,26 @@
 
 from fastapi import APIRouter
+from fastapi.requests import Request
 from fastapi.responses import JSONResponse
+from typing import Any, Dict
+
+from common.metrics import metrics_registry
+from conf.config import config_manager
+from graph.checkpoint import plan_checkpointer
+from services.admission import plan_admission
 
 router = APIRouter(prefix="/health",tags=["Health"])
 
+
+def _uptime() -> str:
+    """ Uptime of this worker, e.g. "2d 3h 4m 5s" """
+    seconds = int(metrics_registry.uptime())
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{days}d {hours}h {minutes}m {seconds}s" if days else f"{hours}h {minutes}m {seconds}s"
+
+
 @router.get("/")
 async def health_check():
     """ Health check endpoint to verify the service is running.
@@ -16,10 +33,22 @@ async def health_check():
 @router.get("/ready")
 async def readiness_check():
     """ Readiness check endpoint to verify the service is ready to handle requests.
+    A saturated worker, every plan slot busy and plans queued, answers 503 so the load balancer
+    sends new plans elsewhere.
     Returns:
-        dict: A simple readiness message.
+        dict: The readiness and the active and queued plan counts.
     """
-    return {"ready": True}
+    admission = plan_admission.stats()
+    return JSONResponse(
+      {
+          "ready": not admission["saturated"],
+          "active_plans": admission["active"],
+          "queued_plans": admission["queued"],
+          "max_active_plans": admission["max_active"],
+          "max_queued_plans": admission["max_queued"]
+      },
+      status_code=503 if admission["saturated"] else 200
+    )
 
 @router.get("/info")
 async def service_info():
@@ -33,7 +62,8 @@ async def service_info():
       {
           "service": "AGIAgentic Backend",
           "version": "1.0.0",
-          "uptime": "72 hours",
+          "uptime": _uptime(),
+          "uptime_seconds": round(metrics_registry.uptime(), 1),
           "os_name": platform.system(),
           "os_version": platform.version(),
           "os_detail": platform.platform()
@@ -41,19 +71,29 @@ async def service_info():
     )
 
 @router.get("/status")
-async def service_status():
+async def service_status(request: Request):
     """ Service status endpoint to provide detailed status information.
+    Args:
+        request (Request): The FastAPI request object.
     Returns:
-        dict: A detailed status message.
+        dict: The uptime and the state of the model providers, MCP services and plan checkpoints.
     """
+    llm_providers: Dict[str, Any] = getattr(request.app.state, "llm_providers", {})
+    mcp_manager = getattr(request.app.state, "mcp_manager", None)
+    missing_services = mcp_manager.client_manager.missing_services if mcp_manager is not None else []
     return JSONResponse(
       {
         "service": "AGIAgentic Backend",
         "version": "1.0.0",
-        "uptime": "72 hours",
+        "uptime": _uptime(),
+        "uptime_seconds": round(metrics_registry.uptime(), 1),
         "dependencies": {
-            "database": "connected",
-            "llm_provider": "operational"
+            "llm_providers": sorted(llm_providers),
+            "default_llm_provider": config_manager.model_config.DEFAULT_PROVIDER,
+            "mcp_services": "degraded" if missing_services else ("connected" if mcp_manager is not None else "not configured"),
+            "missing_mcp_services": missing_services,
+            "mcp_tools": len(getattr(request.app.state, "mcp_tools", [])),
+            "checkpointer": config_manager.agent_config.CHECKPOINTER if plan_checkpointer is not None else "none"
         }
       } 
     )
@@ -2,15 +2,20 @@
 
 
 
+import json
+import time
+
 from fastapi import APIRouter
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Dict, Any, Union
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 
 from common.logger import logger
 from services.llm import LLMService
-from utils.llm.llm_util import serialize_provider, serializable_llm_result
+from api.schemas.llm import EmbeddingBatchReqSchema, ChatBatchReqSchema
+from utils.llm.llm_util import serialize_provider, serializable_llm_result, encode_float32, serializable_batch_item, batch_summary
 
 
 
@@ -32,6 +37,135 @@ def get_llm(request: Request):
       "llm_providers": serializable
   })
 
+@router.get("/providers/{provider_name}/pool")
+def get_pool_stats(request: Request, provider_name: str):
+    """ Get client cache and connection pool statistics of a provider.
+    Args:
+        request (Request): The FastAPI request object.
+        provider_name (str): The name of the LLM provider.
+    Returns:
+        dict: A dictionary containing the pool statistics.
+    """
+    llm_providers: Dict[str, Any] = getattr(request.app.state, "llm_providers", {})
+    provider = llm_providers.get(provider_name)
+    if provider is None:
+        logger.error(f"LLM provider '{provider_name}' not found.")
+        return JSONResponse({
+            "error": f"LLM provider '{provider_name}' not found."
+        })
+    return JSONResponse({
+        "provider": provider_name,
+        "pool_stats": provider.pool_stats()
+    })
+
+@router.get("/providers/{provider_name}/limits")
+def get_limiter_stats(request: Request, provider_name: str):
+    """ Get request limiter statistics of a provider: in-flight requests, queue depth and wait times per model.
+    Args:
+        request (Request): The FastAPI request object.
+        provider_name (str): The name of the LLM provider.
+    Returns:
+        dict: A dictionary containing the limiter statistics.
+    """
+    llm_providers: Dict[str, Any] = getattr(request.app.state, "llm_providers", {})
+    provider = llm_providers.get(provider_name)
+    if provider is None:
+        logger.error(f"LLM provider '{provider_name}' not found.")
+        return JSONResponse({
+            "error": f"LLM provider '{provider_name}' not found."
+        })
+    return JSONResponse({
+        "provider": provider_name,
+        "limiter_stats": provider.limiter_stats()
+    })
+
+@router.get("/providers/{provider_name}/routes")
+def get_route_stats(request: Request, provider_name: str):
+    """ Get the routes of a routing provider: candidates and selection rule per role, latency and error rate per candidate.
+    Args:
+        request (Request): The FastAPI request object.
+        provider_name (str): The name of the routing provider, e.g. "router".
+    Returns:
+        dict: A dictionary containing the route statistics.
+    """
+    llm_providers: Dict[str, Any] = getattr(request.app.state, "llm_providers", {})
+    provider = llm_providers.get(provider_name)
+    if provider is None or not hasattr(provider, "route_stats"):
+        logger.error(f"LLM provider '{provider_name}' not found or does not route.")
+        return JSONResponse({
+            "error": f"LLM provider '{provider_name}' not found or does not route."
+        })
+    return JSONResponse({
+        "provider": provider_name,
+        "route_stats": provider.route_stats()
+    })
+
+@router.post("/{provider_name}/embedding/batch")
+async def embed_batch(provider_name: str, req: EmbeddingBatchReqSchema):
+    """ Embed a large list of texts in concurrent provider-sized batches.
+    Vectors are returned as base64 of little-endian float32 bytes, row after row. With `stream`
+    the response is NDJSON: one line per batch as it finishes, with the index of its first text,
+    then a final summary line.
+    Args:
+        provider_name (str): The name of the LLM provider.
+        req (EmbeddingBatchReqSchema): The texts and batching options.
+    Returns:
+        dict: The embeddings with their shape, or an NDJSON stream.
+    """
+    llm_service = LLMService(provider_name)
+    try:
+        # resolve the model before any request, an unknown provider is not an upstream error
+        llm_service.embedding_llm
+    except ValueError as e:
+        return JSONResponse({
+            "error": str(e)
+        }, status_code=404)
+    model_name = llm_service.model_config.EMBEDDING_MODEL
+    start_time = time.time()
+
+    if req.stream:
+        async def generate_ndjson():
+            count = 0
+            try:
+                async for start, vectors in llm_service.aiter_embedding_batches(req.texts, req.batch_size, req.concurrency):
+                    count += len(vectors)
+                    yield json.dumps({
+                        "start": start,
+                        "count": len(vectors),
+                        "dim": vectors.shape[1],
+                        "embeddings": encode_float32(vectors)
+                    }) + "\n"
+            except Exception as e:
+                logger.error(f"Error in batch embedding with provider '{provider_name}': {e}")
+                yield json.dumps({"error": str(e), "count": count}) + "\n"
+                return
+            yield json.dumps({
+                "done": True,
+                "provider": provider_name,
+                "model": model_name,
+                "count": count,
+                "duration": round(time.time() - start_time, 3)
+            }) + "\n"
+
+        return StreamingResponse(generate_ndjson(), media_type="application/x-ndjson")
+
+    try:
+        vectors = await llm_service.aembed_documents(req.texts, req.batch_size, req.concurrency)
+    except Exception as e:
+        logger.error(f"Error in batch embedding with provider '{provider_name}': {e}")
+        return JSONResponse({
+            "error": str(e)
+        }, status_code=502)
+    return JSONResponse({
+        "provider": provider_name,
+        "model": model_name,
+        "shape": list(vectors.shape),
+        "dtype": "float32",
+        "encoding": "base64",
+        "embeddings": encode_float32(vectors),
+        "duration": round(time.time() - start_time, 3)
+    })
+
 @router.get("/{provider_name}/{model_type}")
 def get_model(request: Request, provider_name: str, model_type: str):
     """ Get model information for a specific provider and model type.
@@ -77,7 +211,7 @@ def debug_model(
     logger.info(f"Debugging model '{model_type}' from provider '{provider_name}' with query: {query}")
     llm_service = LLMService(provider_name)
     llm = f"{model_type}_llm"
-    model_instance: Union[ChatOpenAI, OpenAIEmbeddings, None] = getattr(llm_service, llm, None)
+    model_instance: Union[BaseChatModel, Embeddings, None] = getattr(llm_service, llm, None)
     if model_instance is None:
         logger.error(f"Model type '{model_type}' not found for provider '{provider_name}'.")
         return JSONResponse({
@@ -96,3 +230,55 @@ def debug_model(
         "model_debug_info": serializable_llm_result(res)
     })
 
+@router.post("/{provider_name}/{model_type}/batch")
+async def chat_batch(provider_name: str, model_type: str, req: ChatBatchReqSchema):
+    """ Run a list of prompts through a chat model with bounded concurrency.
+    Each item holds the reply or the error of its prompt, a failed prompt does not fail the batch.
+    With `stream` the response is NDJSON: one line per prompt as it finishes, then a final summary
+    line with latency percentiles and token usage.
+    Args:
+        provider_name (str): The name of the LLM provider.
+        model_type (str): The type of the chat model (e.g., "simple", "reason", "code").
+        req (ChatBatchReqSchema): The prompts and batching options.
+    Returns:
+        dict: The items in prompt order with the batch summary, or an NDJSON stream.
+    """
+    llm_service = LLMService(provider_name)
+    try:
+        model_instance = getattr(llm_service, f"{model_type}_llm", None)
+    except ValueError as e:
+        return JSONResponse({
+            "error": str(e)
+        }, status_code=404)
+    if not isinstance(model_instance, BaseChatModel):
+        logger.error(f"Chat model type '{model_type}' not found for provider '{provider_name}'.")
+        return JSONResponse({
+            "error": f"Chat model type '{model_type}' not found for provider '{provider_name}'."
+        }, status_code=404)
+    logger.info(f"Batch chat with '{model_type}' from provider '{provider_name}', prompts: {len(req.prompts)}")
+    start_time = time.time()
+
+    if req.stream:
+        async def generate_ndjson():
+            items = []
+            async for index, (result, latency) in llm_service.aiter_chat_batch(model_instance, req.prompts, req.concurrency):
+                item = serializable_batch_item(index, result, latency)
+                items.append(item)
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+            yield json.dumps({
+                "done": True,
+                "provider": provider_name,
+                "model_type": model_type,
+                **batch_summary(items, time.time() - start_time)
+            }) + "\n"
+
+        return StreamingResponse(generate_ndjson(), media_type="application/x-ndjson")
+
+    results = await llm_service.abatch_chat(model_instance, req.prompts, req.concurrency)
+    items = [serializable_batch_item(index, result, latency) for index, (result, latency) in enumerate(results)]
+    return JSONResponse({
+        "provider": provider_name,
+        "model_type": model_type,
+        "items": items,
+        "summary": batch_summary(items, time.time() - start_time)
+    })
@@ -5,6 +5,7 @@ from fastapi.requests import Request
 from fastapi.responses import JSONResponse
 
 from common.logger import logger
+from services.mcp import MCPService
 from utils.mcp_.mcp_util import serialize_tool
 
 
@@ -28,3 +29,37 @@ def get_tools(request: Request):
 
 
 
+
+
+@router.get("/pool")
+def get_session_pool(request: Request):
+  """ Get MCP session pool statistics
+  Args:
+      request (Request): The FastAPI request object.
+  Returns:
+      dict: Session pool statistics per MCP server.
+  """
+  mcp_manager = getattr(request.app.state, "mcp_manager", None)
+  session_pool = mcp_manager.client_manager.session_pool if mcp_manager is not None else None
+  return JSONResponse({
+      "enabled": session_pool is not None,
+      "servers": session_pool.stats() if session_pool is not None else {}
+  })
+
+
+@router.get("/discovery")
+def get_discovery_stats(request: Request):
+  """ Get MCP tool discovery statistics
+  Args:
+      request (Request): The FastAPI request object.
+  Returns:
+      dict: The catalog version and discovery latency and failure counters per MCP server.
+  """
+  mcp_manager = getattr(request.app.state, "mcp_manager", None)
+  client_manager = mcp_manager.client_manager if mcp_manager is not None else None
+  return JSONResponse({
+      "catalog_version": MCPService().version,
+      "loaded_from_catalog": client_manager.loaded_from_catalog if client_manager is not None else False,
+      "missing_servers": client_manager.missing_services if client_manager is not None else [],
+      "servers": client_manager.discovery_stats() if client_manager is not None else {}
+  })
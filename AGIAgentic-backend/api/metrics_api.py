@@ -0,0 +1,85 @@
+
+
+from fastapi import APIRouter
+from fastapi.requests import Request
+from fastapi.responses import Response
+from typing import Any, Dict, List, Tuple
+
+from common.metrics import metrics_registry, CollectedMetric, CONTENT_TYPE, Labels
+from services.plan_cache import plan_cache
+from services.admission import plan_admission
+from services.semantic_plan_cache import semantic_plan_cache
+from utils.tool.tool_cache import ToolResultCache
+
+
+router = APIRouter(tags=["metrics"])
+
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+  return {
+    "plan": plan_cache.stats(),
+    "semantic_plan": semantic_plan_cache.stats(),
+    "tool_result": ToolResultCache().stats(),
+  }
+
+
+def _cache_samples(key: str) -> List[Tuple[Labels, float]]:
+  return [((name,), stats[key]) for name, stats in _cache_stats().items()]
+
+
+metrics_registry.collected(
+  "agiagentic_plans", "Plans holding an execution slot or waiting for one", ["state"], "gauge",
+  lambda: [(("active",), plan_admission.stats()["active"]), (("queued",), plan_admission.stats()["queued"])]
+)
+metrics_registry.collected(
+  "agiagentic_plans_rejected_total", "Plans rejected because the admission queue was full", [], "counter",
+  lambda: [((), plan_admission.stats()["rejected"])]
+)
+metrics_registry.collected(
+  "agiagentic_plan_queue_timeouts_total", "Plans that waited too long for an execution slot", [], "counter",
+  lambda: [((), plan_admission.stats()["queue_timeouts"])]
+)
+metrics_registry.collected(
+  "agiagentic_cache_hits_total", "Cache hits", ["cache"], "counter", lambda: _cache_samples("hits")
+)
+metrics_registry.collected(
+  "agiagentic_cache_misses_total", "Cache misses", ["cache"], "counter", lambda: _cache_samples("misses")
+)
+metrics_registry.collected(
+  "agiagentic_cache_hit_ratio", "Share of cache lookups that hit", ["cache"], "gauge", lambda: _cache_samples("hit_rate")
+)
+metrics_registry.collected(
+  "agiagentic_cache_entries", "Entries in the cache", ["cache"], "gauge", lambda: _cache_samples("size")
+)
+
+
+def _llm_limiter_metrics(llm_providers: Dict[str, Any]) -> List[CollectedMetric]:
+  """ Queue depth and in-flight requests of the model limiters of every provider """
+  limiters = [
+    ((provider_name, model_name), stats)
+    for provider_name, provider in llm_providers.items()
+    for model_name, stats in provider.limiter_stats()["models"].items()
+  ]
+  return [
+    CollectedMetric(
+      "agiagentic_llm_queue_depth", "LLM requests waiting for the model limiter", ["provider", "model"], "gauge",
+      lambda: [(labels, stats["queue_depth"]) for labels, stats in limiters]
+    ),
+    CollectedMetric(
+      "agiagentic_llm_in_flight", "LLM requests sent and not answered yet", ["provider", "model"], "gauge",
+      lambda: [(labels, stats["in_flight"]) for labels, stats in limiters]
+    ),
+  ]
+
+
+@router.get("/metrics")
+async def metrics(request: Request):
+  """ Prometheus metrics of this worker: graph node, plan operation, LLM and tool call histograms,
+  LLM tokens, active streams, plan admission, cache hit rates and LLM limiter queues.
+  Args:
+      request (Request): The FastAPI request object.
+  Returns:
+      Response: The metrics in the Prometheus text format.
+  """
+  llm_providers: Dict[str, Any] = getattr(request.app.state, "llm_providers", {})
+  return Response(metrics_registry.render(_llm_limiter_metrics(llm_providers)), media_type=CONTENT_TYPE)
@@ -1,33 +1,227 @@
 
 
+import uuid
+import asyncio
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from sse_starlette.sse import EventSourceResponse
+from typing import Any, AsyncIterator, Set
 
 
-from api.schemas.plan_executor import PlanExecutorReqSchema
+from api.schemas.plan_executor import PlanExecutorReqSchema, PlanThreadReqSchema
 
+from common.logger import logger
+from common.metrics import active_streams
+from graph.registry import graph_registry
+from services.plan_cache import plan_cache
+from services.admission import plan_admission, PlanTicket
+from services.semantic_plan_cache import semantic_plan_cache
+from utils.tool.tool_cache import ToolResultCache
+from utils.plan.plan_parser import planning_stats
 from graph.plan_graph import PlanExecutionGraph
+from graph.checkpoint import plan_checkpointer
+from llms.hedging import latency_tracker, llm_hedger
 
 
 router = APIRouter(prefix="/plan_executor", tags=["plan_executor"])
 
 
 
+# Threads with a run in progress in this worker, a thread runs once at a time
+_running_threads: Set[str] = set()
+
+
+def _too_many_plans() -> JSONResponse:
+    retry_after = plan_admission.retry_after()
+    return JSONResponse(
+        {"error": "Too many plans in progress, please retry later.", "retry_after": retry_after},
+        status_code=429,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+async def _admitted_stream(ticket: PlanTicket, thread_id: str, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """ Stream a plan run once it has an execution slot, with `queue_position` events while it waits
+    Args:
+        ticket (PlanTicket): The admission ticket of the run.
+        thread_id (str): The thread of the run.
+        events (AsyncIterator[Any]): The events of the run, started once admitted.
+    """
+    active_streams.inc()
+    try:
+        try:
+            async for position in plan_admission.wait_turn(ticket):
+                yield {
+                    "data": {
+                      "step": "queue_position",
+                      "message": f"⏳ 排队中，当前位置: {position}",
+                      "data": {
+                          "position": position,
+                          **plan_admission.stats()
+                      },
+                      "node": "admission"
+                  },
+                  "event": "queue_position"
+                }
+        except asyncio.TimeoutError:
+            yield {
+                "data": {
+                  "step": "queue_timeout",
+                  "message": "❌ 排队超时，请稍后重试。",
+                  "data": {
+                      "retry_after": plan_admission.retry_after()
+                  },
+                  "node": "admission"
+              },
+              "event": "queue_timeout"
+            }
+            return
+        async for event in events:
+          yield event
+    finally:
+        active_streams.dec()
+        plan_admission.leave(ticket)
+        _running_threads.discard(thread_id)
+
+
 @router.post("/stream")
 async def stream_plan_execution(req: PlanExecutorReqSchema):
     """ Endpoint to stream plan execution steps.
+    The plan waits for an execution slot first, streaming `queue_position` events, and is rejected
+    with 429 and Retry-After when the queue is full. The first event carries the thread id, which
+    resumes the plan after an interruption.
     Returns:
         dict: A message indicating the endpoint is working.
     """
 
-    async def generate_astream():
-        async for event in plan_executor_graph.chat_with_planning_stream(thread_id=req.user_id, user_task=req.user_task):
-          yield event
+    thread_id = req.request_id or uuid.uuid4().hex
+    if thread_id in _running_threads:
+        return JSONResponse({"error": f"Thread '{thread_id}' is already running."}, status_code=409)
+    ticket = plan_admission.try_enter()
+    if ticket is None:
+        return _too_many_plans()
+    _running_threads.add(thread_id)
+
+    # Get the shared plan execution graph, the request only carries its own state
+    plan_executor_graph = graph_registry.get_graph(PlanExecutionGraph)
+    return EventSourceResponse(
+        _admitted_stream(ticket, thread_id, plan_executor_graph.chat_with_planning_stream(
+            thread_id=thread_id,
+            user_task=req.user_task,
+            user_id=req.user_id,
+            session_id=req.session_id or "",
+            request_id=req.request_id or "",
+            use_plan_cache=req.use_plan_cache is not False,
+        ))
+    )
+
 
-    # Create plan execution graph and execute steps here
+@router.post("/resume")
+async def resume_plan_execution(req: PlanThreadReqSchema):
+    """ Endpoint to resume an interrupted plan from its last checkpoint.
+    The nodes completed before the interruption are not run again, the stream then continues
+    like `/stream`. A finished thread is not run again and answers 409 with its final status.
+    With `AGENT_STREAM_PLANNING`, off by default when plans are checkpointed, the steps run inside
+    the planning node, a plan interrupted before that node completed is planned and executed again.
+    Returns:
+        dict: The stream of the resumed plan.
+    """
+
+    if req.thread_id in _running_threads:
+        return JSONResponse({"error": f"Thread '{req.thread_id}' is already running."}, status_code=409)
+    # Reserve the thread before the first await, a concurrent call for it answers 409
+    _running_threads.add(req.thread_id)
+    streaming = False
+    try:
+        plan_executor_graph = graph_registry.get_graph(PlanExecutionGraph)
+        snapshot = await plan_executor_graph.get_thread_state(req.thread_id)
+        if snapshot is None:
+            return JSONResponse({"error": f"No checkpoint found for thread '{req.thread_id}'."}, status_code=404)
+        if not snapshot.next:
+            return JSONResponse({
+                "error": f"Thread '{req.thread_id}' has already finished.",
+                "status": snapshot.values.get("status"),
+                "step_results": snapshot.values.get("step_results", [])
+            }, status_code=409)
+        ticket = plan_admission.try_enter()
+        if ticket is None:
+            return _too_many_plans()
+        streaming = True
+    finally:
+        if not streaming:
+            _running_threads.discard(req.thread_id)
 
-    plan_executor_graph = PlanExecutionGraph()
-    plan_executor_graph.user_id = req.user_id
     return EventSourceResponse(
-        generate_astream()
+        _admitted_stream(ticket, req.thread_id, plan_executor_graph.chat_with_planning_stream(
+            thread_id=req.thread_id,
+            resume=True,
+        ))
     )
+
+
+@router.post("/retry")
+async def retry_plan_execution(req: PlanThreadReqSchema):
+    """ Endpoint to run the failed steps of a finished plan again.
+    The stored plan and the completed step results are reused, only the failed steps and the
+    steps skipped because of them run again, followed by a new summary. A thread that did not
+    finish is resumed like `/resume`.
+    Returns:
+        dict: The stream of the retried steps.
+    """
+
+    if req.thread_id in _running_threads:
+        return JSONResponse({"error": f"Thread '{req.thread_id}' is already running."}, status_code=409)
+    # Reserve the thread and take the admission ticket before the checkpoint is changed
+    _running_threads.add(req.thread_id)
+    ticket = plan_admission.try_enter()
+    streaming = False
+    try:
+        if ticket is None:
+            return _too_many_plans()
+        plan_executor_graph = graph_registry.get_graph(PlanExecutionGraph)
+        snapshot = await plan_executor_graph.get_thread_state(req.thread_id)
+        if snapshot is None:
+            return JSONResponse({"error": f"No checkpoint found for thread '{req.thread_id}'."}, status_code=404)
+        if not snapshot.next:
+            retry_steps = await plan_executor_graph.reset_failed_steps(req.thread_id)
+            if not retry_steps:
+                return JSONResponse({
+                    "error": f"Thread '{req.thread_id}' has no plan steps to retry.",
+                    "status": snapshot.values.get("status"),
+                    "step_results": snapshot.values.get("step_results", [])
+                }, status_code=409)
+            logger.info(f"Retrying steps {retry_steps} of thread '{req.thread_id}'")
+        streaming = True
+    finally:
+        if not streaming:
+            if ticket is not None:
+                plan_admission.leave(ticket)
+            _running_threads.discard(req.thread_id)
+
+    return EventSourceResponse(
+        _admitted_stream(ticket, req.thread_id, plan_executor_graph.chat_with_planning_stream(
+            thread_id=req.thread_id,
+            resume=True,
+        ))
+    )
+
+
+@router.get("/stats")
+async def plan_execution_stats():
+    """ Endpoint to inspect plan execution caches and planner output parsing.
+    Returns:
+        dict: Statistics of the plan caches, the graph registry, the tool cache, planning, admission, checkpoints,
+            node latencies and hedging.
+    """
+    return JSONResponse({
+        "plan_cache": plan_cache.stats(),
+        "semantic_plan_cache": semantic_plan_cache.stats(),
+        "graph_registry": graph_registry.stats(),
+        "tool_cache": ToolResultCache().stats(),
+        "planning": planning_stats.stats(),
+        "admission": plan_admission.stats(),
+        "checkpointer": plan_checkpointer.stats() if plan_checkpointer is not None else None,
+        "latency": latency_tracker.stats(),
+        "hedging": llm_hedger.stats(),
+    })
@@ -0,0 +1,21 @@
+
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class EmbeddingBatchReqSchema(BaseModel):
+  """ Schema for batch embedding input. """
+
+  texts: List[str] = Field(..., min_length=1)
+  batch_size: Optional[int] = Field(None, ge=1, description="Texts per provider request")
+  concurrency: Optional[int] = Field(None, ge=1, description="Concurrent provider requests")
+  stream: Optional[bool] = Field(False, description="Stream NDJSON lines, one per finished batch")
+
+
+class ChatBatchReqSchema(BaseModel):
+  """ Schema for batch chat completion input. """
+
+  prompts: List[str] = Field(..., min_length=1)
+  concurrency: Optional[int] = Field(None, ge=1, description="Concurrent provider requests")
+  stream: Optional[bool] = Field(False, description="Stream NDJSON lines, one per finished prompt")
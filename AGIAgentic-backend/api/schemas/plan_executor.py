@@ -11,4 +11,11 @@ class PlanExecutorReqSchema(BaseModel):
   user_id: str
   session_id: Optional[str] = ""
   request_id: Optional[str] = ""
+  use_plan_cache: Optional[bool] = True
 
+
+
+class PlanThreadReqSchema(BaseModel):
+  """ Schema for resuming or retrying the plan execution of a thread. """
+
+  thread_id: str
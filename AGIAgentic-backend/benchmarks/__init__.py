@@ -0,0 +1,4 @@
+""" Benchmarks for the AGIAgentic backend.
+
+Run them from the backend directory, e.g. ``python -m benchmarks.bench_graph_setup``.
+"""
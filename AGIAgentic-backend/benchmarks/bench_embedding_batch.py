@@ -0,0 +1,121 @@
+""" Batch embedding throughput against a local stand-in embedding server.
+
+The stand-in server runs in a child process, speaks the OpenAI-compatible `/embeddings` API and
+answers each request after a fixed latency plus a per-text cost, like a remote provider would.
+"per text" embeds one text per request in sequence, like the debug endpoint; the other rows go through
+`LLMService.aembed_documents` with different batch sizes and concurrency. The provider request
+limiter is active as configured.
+
+Usage:
+    python -m benchmarks.bench_embedding_batch [--texts 2000] [--latency 0.05] [--per-text 0.0005]
+"""
+
+import os
+import time
+import socket
+import asyncio
+import hashlib
+import argparse
+import multiprocessing
+
+os.environ.setdefault("MODEL_ZHIPU_API_KEY", "benchmark")
+
+import numpy as np
+import uvicorn
+
+from typing import Any, Dict, List, Tuple
+from fastapi import FastAPI, Request
+
+import services.llm as llm_service_module
+from services.llm import LLMService
+from conf.config import config_manager
+from llms.providers.zhipu import ZhipuProvider
+
+
+def _stand_in_server(latency: float, per_text: float, dim: int) -> FastAPI:
+    server = FastAPI()
+
+    @server.post("/embeddings")
+    async def embeddings(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        inputs: List[str] = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(latency + per_text * len(inputs))
+        data = []
+        for index, text in enumerate(inputs):
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+            data.append({"object": "embedding", "index": index, "embedding": vector.tolist()})
+        return {"object": "list", "data": data, "model": body["model"], "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    return server
+
+
+def _serve(port: int, latency: float, per_text: float, dim: int) -> None:
+    uvicorn.run(_stand_in_server(latency, per_text, dim), host="127.0.0.1", port=port, log_level="warning")
+
+
+def _start_server(latency: float, per_text: float, dim: int) -> Tuple[multiprocessing.Process, int]:
+    """ Run the stand-in server in its own process, so its CPU work does not slow the client down """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = multiprocessing.Process(target=_serve, args=(port, latency, per_text, dim), daemon=True)
+    process.start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+
+
+async def _per_text(service: LLMService, texts: List[str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        await service.embedding_llm.aembed_query(text)
+    return time.perf_counter() - start
+
+
+async def _batched(service: LLMService, texts: List[str], batch_size: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    vectors = await service.aembed_documents(texts, batch_size=batch_size, concurrency=concurrency)
+    assert vectors.shape[0] == len(texts)
+    return time.perf_counter() - start
+
+
+async def _run(args: argparse.Namespace) -> None:
+    service = LLMService("zhipu")
+    texts = [f"文档 {index}：用于批量向量化吞吐测试的示例文本。" for index in range(args.texts)]
+    # a sample is enough to measure the one-text-per-request rate
+    sample = texts[: min(len(texts), args.per_text_sample)]
+    duration = await _per_text(service, sample)
+    print(f"{'per text':<28}{len(sample):>8}{duration:>10.2f} s{len(sample) / duration:>12.1f} docs/s")
+    for batch_size, concurrency in ((16, 1), (64, 1), (64, 4), (64, 8), (128, 8)):
+        duration = await _batched(service, texts, batch_size, concurrency)
+        label = f"batch {batch_size}, concurrency {concurrency}"
+        print(f"{label:<28}{len(texts):>8}{duration:>10.2f} s{len(texts) / duration:>12.1f} docs/s")
+    limiter = service.limiter_stats()["models"].get(config_manager.model_config.EMBEDDING_MODEL, {})
+    print(f"limiter: granted {limiter.get('granted')}, max queue depth {limiter.get('max_queue_depth')}, wait {limiter.get('wait_ms')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=2000, help="number of texts to embed")
+    parser.add_argument("--per-text-sample", type=int, default=100, help="texts embedded one per request")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in server latency per request in seconds")
+    parser.add_argument("--per-text", type=float, default=0.0005, help="stand-in server cost per text in seconds")
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimension")
+    args = parser.parse_args()
+
+    server, port = _start_server(args.latency, args.per_text, args.dim)
+    config_manager.model_config.ZHIPU_BASE_URL = f"http://127.0.0.1:{port}"
+    llm_service_module._PROVIDERS["zhipu"] = ZhipuProvider()
+    try:
+        print(f"{'mode':<28}{'texts':>8}{'time':>12}{'throughput':>19}")
+        asyncio.run(_run(args))
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" Per-request setup time of the plan execution graph, before and after the graph registry.
+
+"Before" builds a new PlanExecutionGraph and one ReAct agent per plan step on every request,
+like the API did without the registry. "After" fetches both from the process-wide registry.
+No model is called, the benchmark only measures setup work.
+
+Usage:
+    python -m benchmarks.bench_graph_setup [--requests 50] [--steps 3]
+"""
+
+import os
+import time
+import argparse
+import statistics
+
+os.environ.setdefault("MODEL_ZHIPU_API_KEY", "benchmark")
+
+from typing import Any, Callable, Dict, List
+from langgraph.prebuilt import create_react_agent # type: ignore
+
+import services.llm as llm_service_module
+from main import app
+from tools import nitialize_tool_manager
+from llms.providers.zhipu import ZhipuProvider
+from graph.registry import graph_registry
+from graph.plan_graph import PlanExecutionGraph
+
+
+def _setup_uncached(steps: int) -> None:
+    """ Setup work of one request without the registry """
+    graph = PlanExecutionGraph(provider_name="zhipu")
+    for _ in range(steps):
+        create_react_agent(model=graph.simple_llm, tools=graph.local_tools + graph.mcp_tools) # type: ignore
+
+
+def _setup_cached(steps: int) -> None:
+    """ Setup work of one request with the registry """
+    graph = graph_registry.get_graph(PlanExecutionGraph, provider_name="zhipu")
+    for _ in range(steps):
+        graph_registry.get_react_agent(graph.provider_name, graph.simple_llm, graph.local_tools + graph.mcp_tools)
+
+
+def _measure(setup: Callable[[int], None], requests: int, steps: int) -> Dict[str, float]:
+    """ Time `requests` calls of `setup` and summarize them in milliseconds """
+    durations: List[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        setup(steps)
+        durations.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(durations), 3),
+        "median_ms": round(statistics.median(durations), 3),
+        "max_ms": round(max(durations), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="number of simulated requests")
+    parser.add_argument("--steps", type=int, default=3, help="plan steps per request")
+    args = parser.parse_args()
+
+    # Offline setup: a provider with a dummy key and the local tools
+    llm_service_module._PROVIDERS["zhipu"] = ZhipuProvider()
+    app.state.local_tools = nitialize_tool_manager()
+    app.state.mcp_tools = []
+
+    results: Dict[str, Any] = {
+        "before": _measure(_setup_uncached, args.requests, args.steps),
+        "after": _measure(_setup_cached, args.requests, args.steps),
+    }
+    print(f"requests={args.requests} steps={args.steps}")
+    for name, summary in results.items():
+        print(f"{name:>6}: mean {summary['mean_ms']:.3f} ms | median {summary['median_ms']:.3f} ms | max {summary['max_ms']:.3f} ms")
+    print(f"speedup (mean): {results['before']['mean_ms'] / max(results['after']['mean_ms'], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
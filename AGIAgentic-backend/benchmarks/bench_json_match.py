@@ -0,0 +1,114 @@
+""" Micro-benchmark of json_match over realistic and adversarial model outputs.
+
+"legacy" is the former regex cascade (full parse, greedy `\\{.*\\}`, then two nested-brace
+`findall` patterns), "scanner" is the current single-pass json_match and "incremental" feeds
+the same text to JSONObjectScanner in 16-character chunks, as a streamed response would arrive.
+Every case checks that the implementations agree before it is timed.
+
+Usage:
+    python -m benchmarks.bench_json_match [--repeat 5] [--size 1]
+"""
+
+import re
+import json
+import time
+import logging
+import argparse
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from utils.json_util import json_match, JSONObjectScanner
+
+
+def legacy_json_match(content: str) -> Dict[str, Any]:
+    """ The regex cascade json_match used before the scanner """
+    if not content:
+        return dict()
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+    try:
+        match = re.search(r'\{.*\}', content, re.DOTALL)
+        if match:
+            return json.loads(match.group())
+    except json.JSONDecodeError:
+        pass
+    for pattern in (r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', r'\{[^{}]*(?:\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}[^{}]*)*\}'):
+        for match in re.findall(pattern, content, re.DOTALL):
+            try:
+                return json.loads(match)
+            except json.JSONDecodeError:
+                continue
+    return dict()
+
+
+def incremental_json_match(content: str, chunk_size: int = 16) -> Dict[str, Any]:
+    scanner = JSONObjectScanner()
+    for index in range(0, len(content), chunk_size):
+        if scanner.feed(content[index:index + chunk_size]) is not None:
+            break
+    return scanner.finish() or dict()
+
+
+def _plan(steps: int) -> Dict[str, Any]:
+    return {
+        "task_analysis": "用户需要查询多个城市的当前时间并进行比较，{时区} 需要分别处理。",
+        "execution_plans": [
+            {
+                "step": number,
+                "description": f"调用 get_current_time 查询第 {number} 个城市的时间，参数 {{\"timezone\": \"Asia/Shanghai\"}}",
+                "expected_result": "形如 \"2025-01-01 12:00:00\" 的时间字符串",
+                "requires_confirmation": False,
+                "uncertainty_reason": "",
+                "depends_on": [number - 1] if number > 1 else [],
+            }
+            for number in range(1, steps + 1)
+        ],
+    }
+
+
+def _cases(size: int) -> List[Tuple[str, str]]:
+    plan = json.dumps(_plan(5 * size), ensure_ascii=False, indent=2)
+    prose = "模型先解释一下思路：我们会逐步完成任务，并确保每个步骤都可以验证。" * 20 * size
+    return [
+        ("clean plan", plan),
+        ("fenced plan with prose", f"好的，下面是执行计划：\n```json\n{plan}\n```\n{prose}"),
+        ("long prose before plan", f"{prose}\n{plan}"),
+        ("braces in prose", f"注意 {{时区}} 与 {{格式}} 的区别。{prose}\n{plan}\n如有问题请告诉我 {{谢谢}}。"),
+        ("two objects", f"{plan}\n补充信息：{json.dumps({'note': 'extra'}, ensure_ascii=False)}"),
+        ("unbalanced braces", "{" * 2000 * size + json.dumps({"a": 1})),
+        ("no json", prose + "{ 这不是 JSON }" * 50 * size),
+        ("unclosed braces in prose", ("{ " + "模型的解释文字" * 40) * 100 * size + json.dumps({"a": 1})),
+        ("unclosed braces, no json", ("{ " + "模型的解释文字" * 40) * 100 * size),
+        ("truncated plan", plan[: len(plan) * 2 // 3]),
+    ]
+
+
+def _time(function: Callable[[str], Dict[str, Any]], content: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(content)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, the best one is reported")
+    parser.add_argument("--size", type=int, default=1, help="scale factor of the generated texts")
+    args = parser.parse_args()
+    # json_match logs every failed parse
+    logging.disable(logging.ERROR)
+
+    print(f"{'case':<26}{'chars':>9}{'legacy ms':>12}{'scanner ms':>12}{'incremental ms':>16}  agree")
+    for name, content in _cases(args.size):
+        expected = json_match(content)
+        agree = incremental_json_match(content) == expected and (legacy_json_match(content) == expected or "differs")
+        timings = [_time(function, content, args.repeat) for function in (legacy_json_match, json_match, incremental_json_match)]
+        print(f"{name:<26}{len(content):>9}{timings[0]:>12.3f}{timings[1]:>12.3f}{timings[2]:>16.3f}  {agree}")
+
+
+if __name__ == "__main__":
+    main()
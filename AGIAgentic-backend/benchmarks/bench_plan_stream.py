@@ -0,0 +1,450 @@
+""" End-to-end load benchmark of `/plan_executor/stream` against a stand-in LLM and MCP server.
+
+The app runs in `--workers` uvicorn processes, one port each, with the mock LLM provider
+(`MODEL_DEFAULT_PROVIDER=mock`, seeded so every run replays the same answers) and a stand-in MCP
+server in its own process whose `lookup_fact` tool answers after `--tool-latency`. Each worker
+starts in an empty directory with no env file, so only the settings passed here apply.
+`--concurrency` clients send `--requests` plans round-robin across the workers after
+`--warmup` unrecorded ones.
+
+The report holds time to first event, first plan step and first summary token, end-to-end latency
+percentiles, throughput, the node durations from the final `timing_info`, tool call latencies,
+and per worker the event-loop lag, RSS and `/plan_executor/stats`. With `--baseline` the run is
+compared to an earlier report and the exit code is 1 when a metric regressed beyond `--tolerance`.
+
+Usage:
+    python -m benchmarks.bench_plan_stream [--requests 200] [--concurrency 16] [--workers 2]
+        [--output benchmarks/results/plan_stream.json] [--baseline old.json] [--env AGENT_MAX_ACTIVE_PLANS=16]
+"""
+
+import os
+import ast
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+
+import httpx
+
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils.stats_util import latency_summary
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Interval of the event-loop lag probe in the workers
+_LAG_INTERVAL = 0.05
+
+# Node durations reported in the final `timing_info` of a plan
+_NODE_TIMINGS = ("analyze_and_plan", "check_and_execute", "response_first_token", "response_generation")
+
+# Metrics compared with --baseline: path in the report and whether higher is better
+_COMPARED_METRICS: List[Tuple[str, bool]] = [
+    ("throughput_rps", True),
+    ("latency_ms.end_to_end.p50", False),
+    ("latency_ms.end_to_end.p95", False),
+    ("latency_ms.end_to_end.p99", False),
+    ("latency_ms.time_to_first_event.p95", False),
+    ("latency_ms.time_to_first_plan_step.p95", False),
+    ("latency_ms.time_to_first_summary_token.p95", False),
+    ("node_latency_ms.analyze_and_plan.p95", False),
+    ("node_latency_ms.check_and_execute.p95", False),
+    ("node_latency_ms.execute_step.p95", False),
+    ("node_latency_ms.response_generation.p95", False),
+    ("tool_latency_ms.lookup_fact.p95", False),
+    ("workers_max.loop_lag_ms_p99", False),
+    ("workers_max.rss_mb", False),
+]
+
+# Absolute change below which a metric is never reported as a regression, in its own unit
+_NOISE_FLOOR = 5.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: multiprocessing.process.BaseProcess, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"process on port {port} exited with code {process.exitcode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"nothing listens on port {port} after {timeout:g}s")
+
+
+def _serve_mcp(port: int, latency: float) -> None:
+    """ Stand-in MCP server with one tool, over streamable HTTP """
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("bench-stand-in", host="127.0.0.1", port=port, log_level="WARNING")
+
+    @server.tool()
+    async def lookup_fact(query: str = "mock") -> str:
+        """ Look up a fact about a topic """
+        await asyncio.sleep(latency)
+        return f"关于「{query}」的资料：这是基准测试替身 MCP 服务返回的固定结果。"
+
+    server.run(transport="streamable-http")
+
+
+class _BenchProbe:
+    """ ASGI wrapper of a worker app: samples event-loop lag and serves `GET /__bench__`
+    (`?reset=1` clears the samples) with the lag percentiles and the RSS of the worker.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        self.lags: Deque[float] = deque(maxlen=200_000)
+        self._sampler: Optional["asyncio.Task[None]"] = None
+
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(_LAG_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - start - _LAG_INTERVAL))
+
+    @staticmethod
+    def _rss_mb() -> Tuple[float, float]:
+        """ Current and peak resident set size in MB """
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        try:
+            with open("/proc/self/statm") as f:
+                current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+        except OSError:
+            current = peak
+        return round(current, 1), round(max(current, peak), 1)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http" and self._sampler is None:
+            self._sampler = asyncio.get_running_loop().create_task(self._sample_lag())
+        if scope["type"] != "http" or scope["path"] != "/__bench__":
+            await self.app(scope, receive, send)
+            return
+        if b"reset=1" in scope.get("query_string", b""):
+            self.lags.clear()
+        rss_mb, max_rss_mb = self._rss_mb()
+        body = json.dumps({
+            "pid": os.getpid(),
+            "rss_mb": rss_mb,
+            "max_rss_mb": max_rss_mb,
+            "loop_lag_samples": len(self.lags),
+            "loop_lag_ms": latency_summary(self.lags),
+        }).encode("utf-8")
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _serve_worker(port: int, env: Dict[str, str], workdir: str) -> None:
+    """ One app worker, configured only by `env` """
+    os.environ.update(env)
+    os.chdir(workdir)
+    sys.stderr = open(os.path.join(workdir, f"worker-{port}.log"), "a", buffering=1)
+    import uvicorn
+    from main import app
+    uvicorn.run(_BenchProbe(app), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _worker_env(args: argparse.Namespace, workdir: str, mcp_port: int) -> Dict[str, str]:
+    mcp_config_path = os.path.join(workdir, "mcp_config.json")
+    with open(mcp_config_path, "w", encoding="utf-8") as f:
+        json.dump({"mcp_services": {"bench-stand-in": {"transport": "streamable_http", "url": f"http://127.0.0.1:{mcp_port}/mcp"}}}, f)
+    env = {
+        "ENV_FILE_PATH": os.path.join(workdir, "none.env"),
+        "MCP_CONFIG_PATH": mcp_config_path,
+        "MCP_TOOL_CATALOG_PATH": "",
+        "MCP_TOOL_CATALOG_REFRESH_INTERVAL": "0",
+        "MODEL_ZHIPU_API_KEY": "benchmark",
+        "MODEL_DEFAULT_PROVIDER": "mock",
+        "MODEL_MOCK_SEED": str(args.seed),
+        "MODEL_MOCK_LATENCY": str(args.llm_latency),
+        "MODEL_MOCK_LATENCY_DISTRIBUTION": args.llm_distribution,
+        "MODEL_MOCK_LATENCY_SPREAD": str(args.llm_spread),
+        "MODEL_MOCK_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "MODEL_MOCK_ERROR_RATE": str(args.error_rate),
+        "MODEL_MOCK_PLAN_STEPS": str(args.steps),
+        "MODEL_MOCK_TOOLS": json.dumps(["lookup_fact"]),
+        "AGENT_CHECKPOINTER": "memory",
+        "CACHE_SEMANTIC_CACHE_ENABLED": "False",
+        "CACHE_SEMANTIC_CACHE_SNAPSHOT": "",
+        "SERVER_DEBUG": "False",
+    }
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+
+class _Sample:
+    """ Timings of one plan request, in seconds from its start """
+
+    def __init__(self) -> None:
+        self.status = "error"
+        self.first_event: Optional[float] = None
+        self.first_plan_step: Optional[float] = None
+        self.first_summary_token: Optional[float] = None
+        self.end_to_end: Optional[float] = None
+        self.timing_info: Dict[str, float] = {}
+        self.step_durations: List[float] = []
+        self.tool_latencies: Dict[str, List[float]] = {}
+
+
+async def _plan_request(client: httpx.AsyncClient, url: str, task: str, use_plan_cache: bool) -> _Sample:
+    sample = _Sample()
+    tool_starts: Dict[str, Deque[float]] = {}
+    start = time.perf_counter()
+    event = ""
+    try:
+        async with client.stream("POST", url, json={"user_task": task, "user_id": "bench", "use_plan_cache": use_plan_cache}) as response:
+            if response.status_code != 200:
+                await response.aread()
+                sample.status = "rejected" if response.status_code == 429 else f"http_{response.status_code}"
+                return sample
+            async for line in response.aiter_lines():
+                now = time.perf_counter() - start
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                    if sample.first_event is None:
+                        sample.first_event = now
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                # the stream sends the repr of each event dict
+                data = ast.literal_eval(line[5:].strip())
+                step = data.get("step")
+                if step == "plan_step" and sample.first_plan_step is None:
+                    sample.first_plan_step = now
+                elif event == "summary_delta" and sample.first_summary_token is None:
+                    sample.first_summary_token = now
+                elif event == "on_tool_start":
+                    tool_starts.setdefault(data["data"]["tool"], deque()).append(now)
+                elif event == "on_tool_end" and tool_starts.get(data["data"]["tool"]):
+                    # tool events carry no run id, parallel calls of one tool are paired in order
+                    tool = data["data"]["tool"]
+                    sample.tool_latencies.setdefault(tool, []).append(now - tool_starts[tool].popleft())
+                elif step == "completed":
+                    sample.status = "completed"
+                    sample.timing_info = data["data"].get("timing_info", {})
+                    for result in data["data"].get("step_results", []):
+                        sample.step_durations.extend(
+                            value for key, value in (result.get("timing") or {}).items() if key.endswith("_duration")
+                        )
+    except (httpx.HTTPError, ValueError, SyntaxError) as e:
+        sample.status = type(e).__name__
+        return sample
+    sample.end_to_end = time.perf_counter() - start
+    if sample.status == "error" and sample.first_event is not None:
+        sample.status = "failed"
+    return sample
+
+
+async def _drive(ports: List[int], args: argparse.Namespace, requests: int) -> Tuple[List[_Sample], float]:
+    """ Send `requests` plans from `args.concurrency` clients, round-robin across the workers """
+    counter = iter(range(requests))
+    samples: List[_Sample] = []
+    limits = httpx.Limits(max_connections=args.concurrency + len(ports), max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(args.timeout)) as client:
+        async def _client() -> None:
+            for index in counter:
+                url = f"http://127.0.0.1:{ports[index % len(ports)]}/api/v1/plan_executor/stream"
+                samples.append(await _plan_request(client, url, f"基准任务 {index % args.distinct_tasks}", args.plan_cache))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_client() for _ in range(args.concurrency)))
+        return samples, time.perf_counter() - start
+
+
+async def _worker_stats(ports: List[int], reset: bool = False) -> List[Dict[str, Any]]:
+    stats = []
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        for port in ports:
+            probe = (await client.get(f"http://127.0.0.1:{port}/__bench__", params={"reset": 1} if reset else None)).json()
+            if not reset:
+                probe["port"] = port
+                probe["server_stats"] = (await client.get(f"http://127.0.0.1:{port}/api/v1/plan_executor/stats")).json()
+            stats.append(probe)
+    return stats
+
+
+def _summary(values: List[Optional[float]]) -> Dict[str, float]:
+    return latency_summary(value for value in values if value is not None)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _report(args: argparse.Namespace, samples: List[_Sample], duration: float, workers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    completed = [sample for sample in samples if sample.status == "completed"]
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[sample.status] = statuses.get(sample.status, 0) + 1
+    tools: Dict[str, List[float]] = {}
+    for sample in completed:
+        for tool, latencies in sample.tool_latencies.items():
+            tools.setdefault(tool, []).extend(latencies)
+    node_latency = {
+        node: _summary([sample.timing_info.get(f"{node}_duration") for sample in completed]) for node in _NODE_TIMINGS
+    }
+    node_latency["execute_step"] = _summary([duration for sample in completed for duration in sample.step_durations])
+    return {
+        "benchmark": "plan_stream",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "requests": {"total": len(samples), **dict(sorted(statuses.items()))},
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(completed) / duration, 3) if duration else 0.0,
+        "latency_ms": {
+            "time_to_first_event": _summary([sample.first_event for sample in completed]),
+            "time_to_first_plan_step": _summary([sample.first_plan_step for sample in completed]),
+            "time_to_first_summary_token": _summary([sample.first_summary_token for sample in completed]),
+            "end_to_end": _summary([sample.end_to_end for sample in completed]),
+        },
+        "node_latency_ms": node_latency,
+        "tool_latency_ms": {tool: {"calls": len(latencies), **latency_summary(latencies)} for tool, latencies in sorted(tools.items())},
+        "workers_max": {
+            "loop_lag_ms_p99": max((worker["loop_lag_ms"]["p99"] for worker in workers), default=0.0),
+            "loop_lag_ms_max": max((worker["loop_lag_ms"]["max"] for worker in workers), default=0.0),
+            "rss_mb": max((worker["rss_mb"] for worker in workers), default=0.0),
+        },
+        "workers": workers,
+    }
+
+
+def _metric(report: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def compare_reports(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """ Print the change of the compared metrics against a baseline report
+    Args:
+        report (Dict[str, Any]): This run.
+        baseline (Dict[str, Any]): An earlier report.
+        tolerance (float): Relative change, e.g. 0.15, beyond which a worse metric is a regression.
+    Returns:
+        List[str]: The regressed metrics.
+    """
+    regressions = []
+    print(f"\n{'metric':<48}{'baseline':>12}{'this run':>12}{'change':>10}")
+    for path, higher_is_better in _COMPARED_METRICS:
+        old, new = _metric(baseline, path), _metric(report, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        regressed = worse and abs(new - old) > (0.0 if higher_is_better else _NOISE_FLOOR)
+        if regressed:
+            regressions.append(path)
+        print(f"{path:<48}{old:>12.2f}{new:>12.2f}{change * 100:>9.1f}%{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"requests: {report['requests']}, duration {report['duration_s']} s, throughput {report['throughput_rps']} plans/s")
+    print(f"{'latency (ms)':<32}{'avg':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    rows = [*report["latency_ms"].items(), *report["node_latency_ms"].items(), *report["tool_latency_ms"].items()]
+    for name, summary in rows:
+        print(f"{name:<32}" + "".join(f"{summary[key]:>10.1f}" for key in ("avg", "p50", "p95", "p99", "max")))
+    for worker in report["workers"]:
+        lag = worker["loop_lag_ms"]
+        print(f"worker {worker['port']} (pid {worker['pid']}): rss {worker['rss_mb']} MB (peak {worker['max_rss_mb']} MB), "
+              f"loop lag p50 {lag['p50']} ms, p99 {lag['p99']} ms, max {lag['max']} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="recorded plan requests")
+    parser.add_argument("--warmup", type=int, default=None, help="unrecorded plan requests first, defaults to --concurrency")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--workers", type=int, default=2, help="app worker processes")
+    parser.add_argument("--steps", type=int, default=3, help="steps of each mock plan")
+    parser.add_argument("--distinct-tasks", type=int, default=50, help="distinct user tasks, repeated in order")
+    parser.add_argument("--plan-cache", action="store_true", help="let the plans use the plan cache")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the mock LLM")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mean mock LLM latency in seconds")
+    parser.add_argument("--llm-distribution", default="lognormal", choices=["fixed", "uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--llm-spread", type=float, default=0.5, help="spread of the mock LLM latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="mock LLM streaming speed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of failing mock LLM calls")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="stand-in MCP tool latency in seconds")
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per plan in seconds")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra worker setting, repeatable")
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "benchmarks", "results", "plan_stream.json"), help="report file")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    processes: List[multiprocessing.process.BaseProcess] = []
+    with tempfile.TemporaryDirectory(prefix="bench_plan_stream_") as workdir:
+        try:
+            mcp_port = _free_port()
+            processes.append(context.Process(target=_serve_mcp, args=(mcp_port, args.tool_latency), daemon=True))
+            processes[-1].start()
+            _wait_for_port(mcp_port, processes[-1])
+
+            env = _worker_env(args, workdir, mcp_port)
+            ports = [_free_port() for _ in range(args.workers)]
+            for port in ports:
+                processes.append(context.Process(target=_serve_worker, args=(port, env, workdir), daemon=True))
+                processes[-1].start()
+            for port, process in zip(ports, processes[1:]):
+                _wait_for_port(port, process)
+            print(f"{args.workers} workers and the stand-in MCP server are up, logs in {workdir}")
+
+            warmup = args.concurrency if args.warmup is None else args.warmup
+            if warmup:
+                asyncio.run(_drive(ports, args, warmup))
+            asyncio.run(_worker_stats(ports, reset=True))
+            samples, duration = asyncio.run(_drive(ports, args, args.requests))
+            report = _report(args, samples, duration, asyncio.run(_worker_stats(ports)))
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(timeout=10)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    _print_report(report)
+    print(f"report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
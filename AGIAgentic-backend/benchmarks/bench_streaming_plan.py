@@ -0,0 +1,134 @@
+""" End-to-end latency of multi-step plans with and without streaming plan generation.
+
+The planner and the step agents are stand-in chat models that stream their answers with a
+fixed time to first token and a fixed delay per token, so the measurement isolates the
+overlap between plan generation and step execution. "batch" waits for the whole plan before
+executing (AGENT_STREAM_PLANNING=False), "stream" starts each step as soon as it is planned.
+
+Usage:
+    python -m benchmarks.bench_streaming_plan [--runs 3] [--steps 3 5] [--token-delay 0.02] [--step-latency 0.5]
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("MODEL_ZHIPU_API_KEY", "benchmark")
+
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.language_models.chat_models import BaseChatModel
+
+import services.llm as llm_service_module
+from main import app
+from conf.config import config_manager
+from llms.providers.zhipu import ZhipuProvider
+from graph.plan_graph import PlanExecutionGraph
+
+
+class StandInChatModel(BaseChatModel):
+    """ Chat model that streams a scripted answer with fixed first-token and per-token latency """
+
+    respond: Callable[[List[BaseMessage]], str]
+    first_token_latency: float = 0.3
+    token_delay: float = 0.02
+    # characters per streamed token
+    token_size: int = 4
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "StandInChatModel":
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError("the stand-in model is async only")
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        text = "".join([chunk.text async for chunk in self._astream(messages)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        text = self.respond(messages)
+        await asyncio.sleep(self.first_token_latency)
+        for index in range(0, len(text), self.token_size):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text[index:index + self.token_size]))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.token_delay)
+
+
+def _plan(steps: int) -> str:
+    """ A plan of `steps` steps, the second half depends on the first half """
+    half = max(1, steps // 2)
+    execution_plans = [
+        {
+            "step": number,
+            "description": f"查询第 {number} 项数据并整理为结构化结果",
+            "expected_result": f"第 {number} 项数据的结构化结果",
+            "requires_confirmation": False,
+            "uncertainty_reason": "",
+            "depends_on": [] if number <= half else [number - half],
+        }
+        for number in range(1, steps + 1)
+    ]
+    return json.dumps({"task_analysis": "基准测试任务", "execution_plans": execution_plans}, ensure_ascii=False, indent=2)
+
+
+def _graph(steps: int, token_delay: float, step_latency: float) -> PlanExecutionGraph:
+    graph = PlanExecutionGraph(provider_name="zhipu")
+    plan = _plan(steps)
+    graph.reason_llm = StandInChatModel( # type: ignore
+        respond=lambda messages: plan if "execution_plans" in str(messages[-1].content) else "总结：全部步骤已完成。",
+        token_delay=token_delay
+    )
+    graph.simple_llm = StandInChatModel(respond=lambda messages: "步骤已完成。", first_token_latency=step_latency, token_delay=0.0) # type: ignore
+    return graph
+
+
+async def _run_once(graph: PlanExecutionGraph) -> float:
+    start = time.perf_counter()
+    async for _ in graph.chat_with_planning_stream(thread_id="benchmark", user_task="基准测试任务", use_plan_cache=False):
+        pass
+    return time.perf_counter() - start
+
+
+async def _measure(stream: bool, runs: int, steps: int, token_delay: float, step_latency: float) -> Dict[str, float]:
+    config_manager.agent_config.STREAM_PLANNING = stream
+    durations: List[float] = []
+    for _ in range(runs):
+        durations.append(await _run_once(_graph(steps, token_delay, step_latency)))
+    return {"mean_s": round(statistics.mean(durations), 3), "min_s": round(min(durations), 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="runs per configuration")
+    parser.add_argument("--steps", type=int, nargs="+", default=[3, 5], help="plan sizes to measure")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="planner delay per token in seconds")
+    parser.add_argument("--step-latency", type=float, default=0.5, help="step agent latency in seconds")
+    args = parser.parse_args()
+
+    # Offline setup: a provider with a dummy key and no tools
+    llm_service_module._PROVIDERS["zhipu"] = ZhipuProvider()
+    app.state.local_tools = []
+    app.state.mcp_tools = []
+
+    for steps in args.steps:
+        batch = asyncio.run(_measure(False, args.runs, steps, args.token_delay, args.step_latency))
+        stream = asyncio.run(_measure(True, args.runs, steps, args.token_delay, args.step_latency))
+        saving = batch["mean_s"] - stream["mean_s"]
+        print(
+            f"steps={steps}: batch mean {batch['mean_s']:.3f} s | stream mean {stream['mean_s']:.3f} s | "
+            f"saved {saving:.3f} s ({saving / batch['mean_s'] * 100:.1f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
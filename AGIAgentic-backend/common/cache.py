@@ -0,0 +1,98 @@
+
+
+import time
+import threading
+
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+
+V = TypeVar("V")
+
+
+class LRUTTLCache(Generic[V]):
+  """ A thread-safe in-memory cache with LRU and TTL eviction and hit/miss counters. """
+
+  def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+    """ Initialize the cache
+    Args:
+        max_size (int): Maximum number of entries, the least recently used entry is evicted beyond it.
+        ttl (Optional[float]): Seconds an entry stays valid, None or <= 0 disables expiry.
+    """
+    self.max_size = max_size
+    self.ttl = ttl
+    self._data: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict()
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._expirations = 0
+
+  def _expired(self, stored_at: float, ttl: Optional[float]) -> bool:
+    return bool(ttl and ttl > 0 and time.monotonic() - stored_at > ttl)
+
+  def get(self, key: Hashable, ttl: Optional[float] = None) -> Optional[V]:
+    """ Get a cached value
+    Args:
+        key (Hashable): The cache key.
+        ttl (Optional[float]): Overrides the cache TTL for this lookup.
+    Returns:
+        Optional[V]: The cached value, or None on a miss.
+    """
+    with self._lock:
+      entry = self._data.get(key)
+      if entry is None:
+        self._misses += 1
+        return None
+      stored_at, value = entry
+      if self._expired(stored_at, self.ttl if ttl is None else ttl):
+        del self._data[key]
+        self._expirations += 1
+        self._misses += 1
+        return None
+      self._data.move_to_end(key)
+      self._hits += 1
+      return value
+
+  def set(self, key: Hashable, value: V) -> None:
+    """ Store a value, evicting the least recently used entries beyond `max_size`
+    Args:
+        key (Hashable): The cache key.
+        value (V): The value to cache.
+    """
+    with self._lock:
+      self._data[key] = (time.monotonic(), value)
+      self._data.move_to_end(key)
+      while len(self._data) > self.max_size:
+        self._data.popitem(last=False)
+        self._evictions += 1
+
+  def delete(self, key: Hashable) -> None:
+    """ Remove a cached value if present """
+    with self._lock:
+      self._data.pop(key, None)
+
+  def clear(self) -> None:
+    """ Remove every cached value """
+    with self._lock:
+      self._data.clear()
+
+  def __len__(self) -> int:
+    return len(self._data)
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get cache statistics
+    Returns:
+        Dict[str, Any]: Size, limits, hit/miss counters and the hit rate.
+    """
+    lookups = self._hits + self._misses
+    return {
+      "size": len(self._data),
+      "max_size": self.max_size,
+      "ttl": self.ttl,
+      "hits": self._hits,
+      "misses": self._misses,
+      "evictions": self._evictions,
+      "expirations": self._expirations,
+      "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+    }
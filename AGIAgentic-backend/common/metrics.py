@@ -0,0 +1,320 @@
+
+
+
+import re
+import time
+import threading
+
+from uuid import UUID
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.outputs import LLMResult
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets in seconds of graph nodes and LLM calls, which take up to minutes
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+# Buckets in seconds of tool calls
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label of a tool that does not come from an MCP service
+LOCAL_TOOL_SERVER = "local"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+  pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+  if extra:
+    pairs.append(extra)
+  return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+  if value == float("inf"):
+    return "+Inf"
+  return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+  """ A metric family with fixed label names, its samples are kept per label values """
+
+  type_name = "untyped"
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+    self.name = name
+    self.documentation = documentation
+    self.labelnames = tuple(labelnames)
+    self._lock = threading.Lock()
+
+  def _key(self, labels: Dict[str, Any]) -> Labels:
+    if set(labels) != set(self.labelnames):
+      raise ValueError(f"Metric '{self.name}' expects the labels {self.labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in self.labelnames)
+
+  def samples(self) -> List[str]:
+    raise NotImplementedError
+
+  def render(self) -> List[str]:
+    return [
+      f"# HELP {self.name} {self.documentation}",
+      f"# TYPE {self.name} {self.type_name}",
+      *self.samples(),
+    ]
+
+
+class Counter(_Metric):
+  """ A monotonically increasing count """
+
+  type_name = "counter"
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+    super().__init__(name, documentation, labelnames)
+    self._values: Dict[Labels, float] = {}
+
+  def inc(self, amount: float = 1.0, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = self._values.get(key, 0.0) + amount
+
+  def samples(self) -> List[str]:
+    with self._lock:
+      values = sorted(self._values.items())
+    return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+  """ A value that goes up and down """
+
+  type_name = "gauge"
+
+  def dec(self, amount: float = 1.0, **labels: Any) -> None:
+    self.inc(-amount, **labels)
+
+  def set(self, value: float, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      self._values[key] = value
+
+
+class Histogram(_Metric):
+  """ Observations counted in cumulative buckets, with their count and sum """
+
+  type_name = "histogram"
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = SLOW_BUCKETS) -> None:
+    super().__init__(name, documentation, labelnames)
+    self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+    # per label values: bucket counts, then the sum
+    self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+  def observe(self, value: float, **labels: Any) -> None:
+    key = self._key(labels)
+    with self._lock:
+      counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+      for index, bound in enumerate(self.buckets):
+        if value <= bound:
+          counts[index] += 1
+          break
+      total[0] += value
+
+  def samples(self) -> List[str]:
+    lines = []
+    with self._lock:
+      values = sorted((key, list(counts), total[0]) for key, (counts, total) in self._values.items())
+    for key, counts, total in values:
+      cumulative = 0
+      for bound, count in zip(self.buckets, counts):
+        cumulative += count
+        le = 'le="' + _format_value(bound) + '"'
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+      lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(round(total, 6))}")
+      lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+    return lines
+
+
+class CollectedMetric(_Metric):
+  """ A metric read from its source at every scrape, such as the counters of a cache """
+
+  def __init__(self, name: str, documentation: str, labelnames: Sequence[str], type_name: str, collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+    super().__init__(name, documentation, labelnames)
+    self.type_name = type_name
+    self._collect = collect
+
+  def samples(self) -> List[str]:
+    return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self._collect()]
+
+
+class MetricsRegistry:
+  """ Metrics of this worker, rendered in the Prometheus text format """
+
+  def __init__(self) -> None:
+    self._metrics: Dict[str, _Metric] = {}
+    self.started_at = time.time()
+
+  def _register(self, metric: Any) -> Any:
+    if metric.name in self._metrics:
+      raise ValueError(f"Metric '{metric.name}' is already registered")
+    self._metrics[metric.name] = metric
+    return metric
+
+  def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return self._register(Counter(name, documentation, labelnames))
+
+  def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return self._register(Gauge(name, documentation, labelnames))
+
+  def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = SLOW_BUCKETS) -> Histogram:
+    return self._register(Histogram(name, documentation, labelnames, buckets))
+
+  def collected(self, name: str, documentation: str, labelnames: Sequence[str], type_name: str, collect: Callable[[], Iterable[Tuple[Labels, float]]]) -> None:
+    """ Register a metric whose samples are read at every scrape
+    Args:
+        name (str): The metric name.
+        documentation (str): The help text.
+        labelnames (Sequence[str]): The label names.
+        type_name (str): "counter" or "gauge".
+        collect (Callable[[], Iterable[Tuple[Labels, float]]]): Returns (label values, value) pairs.
+    """
+    self._register(CollectedMetric(name, documentation, labelnames, type_name, collect))
+
+  def uptime(self) -> float:
+    """ Seconds since this worker started """
+    return time.time() - self.started_at
+
+  def render(self, extra: Iterable[_Metric] = ()) -> str:
+    """ Render every metric in the Prometheus text format
+    Args:
+        extra (Iterable[_Metric], optional): Metrics of this scrape only, e.g. read from the app state. Defaults to ().
+    Returns:
+        str: The exposition text.
+    """
+    lines: List[str] = []
+    for metric in [*self._metrics.values(), *extra]:
+      lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Global metrics registry instance
+metrics_registry = MetricsRegistry()
+
+graph_node_duration = metrics_registry.histogram(
+  "agiagentic_graph_node_duration_seconds", "Duration of graph node runs", ["node", "status"]
+)
+plan_operation_duration = metrics_registry.histogram(
+  "agiagentic_plan_operation_duration_seconds", "Durations recorded in the timing info of plans", ["operation"]
+)
+llm_call_duration = metrics_registry.histogram(
+  "agiagentic_llm_call_duration_seconds", "Duration of LLM calls", ["model", "status"]
+)
+llm_tokens = metrics_registry.counter(
+  "agiagentic_llm_tokens_total", "Tokens of LLM calls", ["model", "type"]
+)
+tool_call_duration = metrics_registry.histogram(
+  "agiagentic_tool_call_duration_seconds", "Duration of tool calls", ["tool", "server", "status"], FAST_BUCKETS
+)
+tool_call_errors = metrics_registry.counter(
+  "agiagentic_tool_call_errors_total", "Failed tool calls", ["tool", "server"]
+)
+active_streams = metrics_registry.gauge(
+  "agiagentic_active_streams", "Open plan event streams, queued or running"
+)
+metrics_registry.collected(
+  "agiagentic_process_start_time_seconds", "Start time of the worker since the Unix epoch", [], "gauge",
+  lambda: [((), round(metrics_registry.started_at, 3))]
+)
+
+
+# Step numbers are dropped from the operation names of the timing info, e.g. "execute_step_3"
+_STEP_NUMBER = re.compile(r"_\d+$")
+
+
+def observe_timing(operation_name: str, seconds: float) -> None:
+  """ Record a duration of the timing info of a plan
+  Args:
+      operation_name (str): The operation, e.g. "analyze_and_plan" or "execute_step_2".
+      seconds (float): The duration in seconds.
+  """
+  plan_operation_duration.observe(seconds, operation=_STEP_NUMBER.sub("", operation_name))
+
+
+def _usage(response: LLMResult) -> Tuple[int, int]:
+  """ Input and output tokens of an LLM result, 0 when the provider did not report them """
+  input_tokens = output_tokens = 0
+  for generations in response.generations:
+    for generation in generations:
+      usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+      if usage:
+        input_tokens += usage.get("input_tokens", 0)
+        output_tokens += usage.get("output_tokens", 0)
+  if not input_tokens and not output_tokens:
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    input_tokens = token_usage.get("prompt_tokens", 0) or 0
+    output_tokens = token_usage.get("completion_tokens", 0) or 0
+  return input_tokens, output_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+  """ Record the latency and tokens of every LLM call and the latency and errors of every tool call
+  of the runs it is passed to. A tool built from an MCP service carries its service in the
+  `mcp_server` metadata, other tools are labeled "local".
+  """
+
+  run_inline = True
+
+  def __init__(self) -> None:
+    self._llm_runs: Dict[UUID, Tuple[float, str]] = {}
+    self._tool_runs: Dict[UUID, Tuple[float, str, str]] = {}
+
+  def _llm_start(self, serialized: Optional[Dict[str, Any]], run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+    model = (metadata or {}).get("ls_model_name") or ((serialized or {}).get("kwargs") or {}).get("model_name") or "unknown"
+    self._llm_runs[run_id] = (time.monotonic(), str(model))
+
+  def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    self._llm_start(serialized, run_id, metadata)
+
+  def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    self._llm_start(serialized, run_id, metadata)
+
+  def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+    run = self._llm_runs.pop(run_id, None)
+    if run is None:
+      return
+    start_time, model = run
+    llm_call_duration.observe(time.monotonic() - start_time, model=model, status="ok")
+    input_tokens, output_tokens = _usage(response)
+    if input_tokens:
+      llm_tokens.inc(input_tokens, model=model, type="input")
+    if output_tokens:
+      llm_tokens.inc(output_tokens, model=model, type="output")
+
+  def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+    run = self._llm_runs.pop(run_id, None)
+    if run is not None:
+      llm_call_duration.observe(time.monotonic() - run[0], model=run[1], status="error")
+
+  def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    server = (metadata or {}).get("mcp_server") or LOCAL_TOOL_SERVER
+    self._tool_runs[run_id] = (time.monotonic(), str((serialized or {}).get("name") or kwargs.get("name") or "unknown"), str(server))
+
+  def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+    run = self._tool_runs.pop(run_id, None)
+    if run is not None:
+      tool_call_duration.observe(time.monotonic() - run[0], tool=run[1], server=run[2], status="ok")
+
+  def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+    run = self._tool_runs.pop(run_id, None)
+    if run is not None:
+      tool_call_duration.observe(time.monotonic() - run[0], tool=run[1], server=run[2], status="error")
+      tool_call_errors.inc(tool=run[1], server=run[2])
+
+
+# Global metrics callback instance, passed to the graph runs
+metrics_callback = MetricsCallbackHandler()
@@ -6,7 +6,7 @@ from pydantic_settings import BaseSettings
 from typing import Optional, Type, TypeVar, Any
 
 from .setting import (
-    MCPSettings, AgentSettings, ToolsSettings, ServerSettings, ModelSettings
+    MCPSettings, AgentSettings, ToolsSettings, ServerSettings, ModelSettings, CacheSettings
 )
 
 
@@ -29,6 +29,7 @@ class ConfigManager:
         self._agent_config: Optional[AgentSettings] = None
         self._tools_config: Optional[ToolsSettings] = None
         self._model_config: Optional[ModelSettings] = None
+        self._cache_config: Optional[CacheSettings] = None
 
     def _load_config(self, config_class: Type[T]) -> T:
         """ 动态加载配置类 
@@ -68,6 +69,12 @@ class ConfigManager:
         if self._model_config is None:
             self._model_config = self._load_config(ModelSettings)
         return self._model_config
+
+    @property
+    def cache_config(self) -> CacheSettings:
+        if self._cache_config is None:
+            self._cache_config = self._load_config(CacheSettings)
+        return self._cache_config
     
 
 def initialize_config_manager(env_file: Optional[str] = None) -> ConfigManager:
@@ -83,6 +90,7 @@ def initialize_config_manager(env_file: Optional[str] = None) -> ConfigManager:
     config_manager.agent_config   # 预加载Agent配置
     config_manager.tools_config   # 预加载工具配置
     config_manager.model_config   # 预加载模型配置
+    config_manager.cache_config   # 预加载缓存配置
     return config_manager
 
 
@@ -1,9 +1,25 @@
-from pydantic import Field
+from typing import Dict, List, Literal, Optional
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings
 
 class MCPSettings(BaseSettings):
     """ Settings for MCP integration """
-    GET_ALL_TOOLS_TIMEOUT: float = Field(10.0, description="Timeout in seconds for getting all tools from MCP services")
+    CONFIG_PATH: str = Field("mcp_config.json", description="JSON file of the MCP services")
+    GET_ALL_TOOLS_TIMEOUT: float = Field(10.0, description="Seconds startup waits for MCP services, later ones are merged in the background")
+    DISCOVERY_TIMEOUT: float = Field(5.0, description="Timeout in seconds of one tool discovery attempt per MCP service")
+    DISCOVERY_RETRIES: int = Field(1, description="Retries of a failed tool discovery per MCP service")
+    DISCOVERY_RETRY_BACKOFF: float = Field(0.5, description="Initial delay in seconds between tool discovery attempts, doubled each retry")
+    TOOL_CATALOG_PATH: str = Field("cache/mcp_tool_catalog.json", description="File caching the last known MCP tool catalog, empty to disable")
+    TOOL_CATALOG_REFRESH_INTERVAL: float = Field(300.0, description="Seconds between background MCP tool catalog refreshes, 0 to disable")
+    SESSION_POOL_ENABLED: bool = Field(True, description="Call MCP tools through pooled long-lived sessions instead of a new session per call")
+    SESSION_POOL_MAX_SIZE: int = Field(4, description="Maximum number of sessions per MCP server")
+    SESSION_IDLE_TIMEOUT: float = Field(300.0, description="Seconds an idle MCP session is kept open")
+    SESSION_REAP_INTERVAL: float = Field(30.0, description="Seconds between idle MCP session sweeps")
+    SESSION_HEALTH_CHECK_INTERVAL: float = Field(30.0, description="Seconds after which an unused MCP session is pinged before reuse")
+    SESSION_CONNECT_TIMEOUT: float = Field(10.0, description="Timeout in seconds for opening an MCP session or answering a ping")
+    SESSION_CONNECT_RETRIES: int = Field(3, description="Attempts to open an MCP session before failing the call")
+    SESSION_RECONNECT_BACKOFF: float = Field(0.5, description="Initial delay in seconds between MCP session open attempts, doubled each retry")
+    SESSION_RECONNECT_BACKOFF_MAX: float = Field(8.0, description="Maximum delay in seconds between MCP session open attempts")
 
     class Config:
         env_prefix = "MCP_"
@@ -13,7 +29,42 @@ class MCPSettings(BaseSettings):
 
 class AgentSettings(BaseSettings):
     """ Settings for Agent integration """
-    TIMEOUT: float = Field(10.0, description="Timeout in seconds for agent services")
+    TIMEOUT: float = Field(120.0, description="Default deadline in seconds of the LLM work of a plan node or step, 0 to disable")
+    NODE_TIMEOUTS: Dict[str, float] = Field(
+        default_factory=dict,
+        description='Deadlines overriding TIMEOUT by node, e.g. {"analyze_and_plan": 60, "execute_step": 90, "summary_response": 30}'
+    )
+    HEDGING_ENABLED: bool = Field(False, description="Send a slow planning or summary LLM call a second time and keep the first answer")
+    HEDGE_PERCENTILE: float = Field(0.95, description="Latency percentile of recent calls after which a call is hedged")
+    HEDGE_MIN_SAMPLES: int = Field(20, description="Recent calls needed before a call is hedged")
+    HEDGE_MIN_DELAY: float = Field(1.0, description="Minimum seconds before a call is hedged")
+    HEDGE_BUDGET: float = Field(0.1, description="Maximum share of LLM calls that may be hedged")
+    MAX_PARALLEL_STEPS: int = Field(4, description="Maximum number of plan steps executed concurrently")
+    STREAM_PLANNING: Optional[bool] = Field(None, description="Stream the plan and start executing each step as soon as it is planned. The steps then run inside the planning node, so resume and retry plan and execute the whole plan again. Defaults to on only when CHECKPOINTER is none")
+    PLANNING_MODE: Literal["prompt", "function_calling", "json_mode", "json_schema"] = Field(
+        "prompt", description="How the planner is asked for JSON: prompt only, a plan tool call, the JSON object or the JSON schema response format"
+    )
+    PLANNING_RETRIES: int = Field(1, description="Extra planning LLM calls when a plan is still invalid after local repair")
+    MAX_ACTIVE_PLANS: int = Field(8, description="Maximum number of plans executing concurrently in this worker")
+    MAX_QUEUED_PLANS: int = Field(32, description="Maximum number of plans waiting for a slot, further plans are rejected with 429")
+    PLAN_QUEUE_TIMEOUT: float = Field(120.0, description="Seconds a plan may wait in the queue, 0 to wait indefinitely")
+    PLAN_RETRY_AFTER: float = Field(10.0, description="Assumed plan duration in seconds for Retry-After until durations are measured")
+    READY_MAX_QUEUED_PLANS: int = Field(0, description="Readiness fails when every slot is busy and at least this many plans are queued")
+    STEP_RETRIES: int = Field(1, description="Times a failed plan step is run again before it is reported as failed")
+    STEP_RETRY_BACKOFF: float = Field(1.0, description="Initial delay in seconds before a failed step runs again, doubled each retry")
+    STEP_RETRY_BACKOFF_MAX: float = Field(10.0, description="Maximum delay in seconds before a failed step runs again")
+    CHECKPOINTER: Literal["none", "memory", "sqlite"] = Field("sqlite", description="Where plan executions are checkpointed after every node, so they can be resumed")
+    CHECKPOINT_PATH: str = Field("cache/plan_checkpoints.sqlite", description="SQLite database of the plan checkpoints")
+    CHECKPOINT_DURABILITY: Literal["sync", "async", "exit"] = Field(
+        "async", description="When checkpoints are written: before the next node starts, while it runs, or only when the run ends"
+    )
+
+    @model_validator(mode="after")
+    def _default_stream_planning(self) -> "AgentSettings":
+        # streamed steps are not checkpointed one by one, keep step-level resume when there are checkpoints
+        if self.STREAM_PLANNING is None:
+            self.STREAM_PLANNING = self.CHECKPOINTER == "none"
+        return self
 
     class Config:
         env_prefix = "AGENT_"
@@ -24,6 +75,9 @@ class AgentSettings(BaseSettings):
 class ToolsSettings(BaseSettings):
     """ Settings for tools """
     RETRY_LIMIT: float = Field(10.0, description="Retry limit for tools")
+    CACHE_ENABLED: bool = Field(True, description="Enable result caching for tools that opt in through their metadata")
+    CACHE_MAX_SIZE: int = Field(2048, description="Maximum number of cached tool results")
+    CACHE_DEFAULT_TTL: float = Field(60.0, description="Default seconds a cached tool result stays valid")
 
     class Config:
         env_prefix = "TOOLS_"
@@ -53,10 +107,77 @@ class ModelSettings(BaseSettings):
     REASON_LLM: str = Field("glm-4.6", description="Default reasoning-capable LLM model name")
     CODE_LLM: str = Field("glm-4-plus", description="Default code generation LLM model name")
     EMBEDDING_MODEL: str = Field("embedding-3", description="Default embedding model name")
-
-    
+    EMBEDDING_BATCH_SIZE: int = Field(64, description="Texts per embedding request in batch embedding")
+    EMBEDDING_CONCURRENCY: int = Field(4, description="Concurrent embedding requests in batch embedding")
+    CHAT_BATCH_CONCURRENCY: int = Field(8, description="Concurrent chat requests in batch chat completion")
+    CLIENT_CACHE_SIZE: int = Field(32, description="Maximum number of cached model clients per provider")
+    HTTP_MAX_CONNECTIONS: int = Field(100, description="Maximum number of HTTP connections per provider")
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, description="Maximum number of idle keep-alive HTTP connections per provider")
+    HTTP_KEEPALIVE_EXPIRY: float = Field(30.0, description="Seconds an idle keep-alive connection is kept open")
+    HTTP_TIMEOUT: float = Field(60.0, description="Timeout in seconds for HTTP requests to model providers")
+    LIMITER_ENABLED: bool = Field(True, description="Queue async model requests through the per-model concurrency and rate limiter, which also retries 429s, so the model clients get no SDK retries. Synchronous invoke and batch calls are not limited")
+    LIMIT_MAX_IN_FLIGHT: int = Field(8, description="Default maximum concurrent requests per model, 0 for unlimited")
+    LIMIT_RPM: float = Field(0.0, description="Default requests per minute per model, 0 for unlimited")
+    LIMIT_TPM: float = Field(0.0, description="Default tokens per minute per model, estimated when a request queues and corrected with the reported usage, 0 for unlimited")
+    LIMITS: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict,
+        description='Limit overrides by "provider" or "provider/model", e.g. {"zhipu/glm-4.6": {"max_in_flight": 4, "rpm": 60, "tpm": 120000}}'
+    )
+    RATE_LIMIT_RETRIES: int = Field(3, description="Times a request rejected with 429 queues again before the error is returned")
+    RATE_LIMIT_BACKOFF: float = Field(1.0, description="Initial pause in seconds after a 429 without Retry-After, doubled each retry")
+    RETRY_AFTER_MAX: float = Field(60.0, description="Maximum pause in seconds honoured from a Retry-After header")
+    DEFAULT_PROVIDER: str = Field("zhipu", description='Provider of the LLM service and the plan graph, "router" routes every role between providers')
+    ROUTES: Dict[str, List[str]] = Field(
+        default_factory=dict,
+        description='Router candidates by role ("simple", "reason", "code", "embedding") as "provider/model", e.g. {"reason": ["zhipu/glm-4.6", "mock/glm-4.6"]}; '
+                    'a role without route uses its configured model on every provider of ROUTER_PROVIDERS'
+    )
+    ROUTE_STRATEGIES: Dict[str, Literal["latency", "priority"]] = Field(
+        default_factory=dict,
+        description='Selection rule by role, "latency" picks the healthiest candidate, "priority" the first one in rotation in route order; '
+                    'defaults to "latency", and "priority" for "embedding"'
+    )
+    ROUTER_PROVIDERS: List[str] = Field(default_factory=lambda: ["zhipu"], description="Providers routed by default, for roles without route")
+    ROUTER_EWMA_ALPHA: float = Field(0.2, description="Weight of the latest call in the router latency and error rate averages")
+    ROUTER_FAILURE_THRESHOLD: int = Field(3, description="Failures in a row that take a router candidate out of rotation")
+    ROUTER_COOLDOWN: float = Field(30.0, description="Seconds a failing router candidate stays out of rotation before a trial call")
+    MOCK_SCRIPT_PATH: str = Field("", description="JSON file of mock provider response rules, empty to answer the plan graph prompts")
+    MOCK_SEED: int = Field(0, description="Seed of the mock provider latencies, errors and tool choices, a run replays identically")
+    MOCK_LATENCY: float = Field(0.2, description="Mean seconds until a mock model answers or sends its first chunk")
+    MOCK_LATENCY_DISTRIBUTION: Literal["fixed", "uniform", "normal", "lognormal", "exponential"] = Field(
+        "fixed", description="Distribution of the mock latency around MOCK_LATENCY"
+    )
+    MOCK_LATENCY_SPREAD: float = Field(0.0, description="Half-width (uniform), standard deviation (normal) or sigma (lognormal) of the mock latency")
+    MOCK_TOKENS_PER_SECOND: float = Field(0.0, description="Chunks per second a mock model generates after its first one, 0 for no delay")
+    MOCK_ERROR_RATE: float = Field(0.0, description="Share of mock provider calls that fail")
+    MOCK_ERROR_KINDS: List[Literal["error", "rate_limit", "timeout", "stream_cut"]] = Field(
+        default_factory=lambda: ["error"], description='Injected mock errors, picked at random; "stream_cut" fails halfway through the answer'
+    )
+    MOCK_PLAN_STEPS: int = Field(3, description="Steps of a mock execution plan")
+    MOCK_PLAN_SHAPE: Literal["parallel", "chain", "fan_in"] = Field(
+        "fan_in", description='Dependencies of mock plan steps, "fan_in" runs every step but the last one in parallel'
+    )
+    MOCK_TOOL_CALL_RATE: float = Field(1.0, description="Share of mock ReAct steps that call a tool before answering")
+    MOCK_TOOLS: List[str] = Field(default_factory=list, description="Tools mock ReAct steps may call, empty for any bound tool")
+    MOCK_EMBEDDING_DIM: int = Field(1024, description="Dimension of the mock provider embeddings")
 
     class Config:
         env_prefix = "MODEL_"
         case_sensitive = True
         extra = "ignore"
+
+
+class CacheSettings(BaseSettings):
+    """ Settings for caches """
+    PLAN_CACHE_ENABLED: bool = Field(True, description="Enable the exact-match plan cache")
+    PLAN_CACHE_MAX_SIZE: int = Field(1024, description="Maximum number of cached plans")
+    PLAN_CACHE_TTL: float = Field(3600.0, description="Seconds a cached plan stays valid, 0 disables expiry")
+    SEMANTIC_CACHE_ENABLED: bool = Field(False, description="Enable the semantic plan cache, which embeds every uncached task")
+    SEMANTIC_CACHE_CAPACITY: int = Field(4096, description="Maximum number of plans in the semantic plan cache")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(0.92, description="Minimum cosine similarity for a semantic plan cache hit")
+    SEMANTIC_CACHE_SNAPSHOT: str = Field("cache/semantic_plan_cache.npz", description="Snapshot file of the semantic plan cache, empty disables persistence")
+
+    class Config:
+        env_prefix = "CACHE_"
+        case_sensitive = True
+        extra = "ignore"
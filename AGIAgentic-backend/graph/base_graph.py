@@ -1,7 +1,8 @@
 
 
-from typing import Any, List
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from typing import Any, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 
 from services.llm import LLMService
 from services.tool import ToolService
@@ -11,7 +12,7 @@ from services.mcp import MCPService
 class BaseGraph:
   """ Base graph"""
 
-  def __init__(self, graph_name: str, provider_name: str="zhipu") -> None:
+  def __init__(self, graph_name: str, provider_name: Optional[str]=None) -> None:
     """ init"""
 
     # graph name
@@ -19,10 +20,10 @@ class BaseGraph:
 
     # llm
     llm_service = LLMService(provider_name)
-    self.simple_llm: ChatOpenAI = getattr(llm_service, "simple_llm")
-    self.reason_llm: ChatOpenAI = getattr(llm_service, "reason_llm")
-    self.code_llm: ChatOpenAI = getattr(llm_service, "code_llm")
-    self.embedding_llm: OpenAIEmbeddings = getattr(llm_service, "embedding_llm")
+    self.simple_llm: BaseChatModel = getattr(llm_service, "simple_llm")
+    self.reason_llm: BaseChatModel = getattr(llm_service, "reason_llm")
+    self.code_llm: BaseChatModel = getattr(llm_service, "code_llm")
+    self.embedding_llm: Embeddings = getattr(llm_service, "embedding_llm")
 
     # tools
     tool_service = ToolService()
@@ -32,6 +33,5 @@ class BaseGraph:
 
 
     # businese parameters
-    self.user_id: str = ""
-    self.provider_name: str = ""
+    self.provider_name: str = llm_service.llm_provider_name
 
@@ -0,0 +1,157 @@
+
+
+import os
+import time
+
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple # type: ignore
+from langgraph.checkpoint.memory import InMemorySaver # type: ignore
+
+from common.logger import logger
+from conf.config import config_manager
+from utils.stats_util import latency_summary
+
+
+# Number of recent checkpoint writes kept for the latency percentiles
+_WRITE_SAMPLES = 1024
+
+
+class TimedCheckpointer(BaseCheckpointSaver): # type: ignore
+  """ Checkpointer of plan executions, backed by the saver selected with `AGENT_CHECKPOINTER`
+  The backend saver is opened on first use, inside the event loop, and every checkpoint write
+  is timed. With `AGENT_CHECKPOINT_DURABILITY` "async" the graph writes a checkpoint while the
+  next node already runs, so the write latency reported here stays off the critical path.
+  """
+
+  def __init__(self, backend: str, path: str = "") -> None:
+    """ Initialize the checkpointer
+    Args:
+        backend (str): "memory" or "sqlite".
+        path (str, optional): SQLite database file. Defaults to "".
+    """
+    super().__init__()
+    self.backend = backend
+    self.path = path
+    self._saver: Optional[BaseCheckpointSaver] = None # type: ignore
+    self._puts: Deque[float] = deque(maxlen=_WRITE_SAMPLES)
+    self._put_writes: Deque[float] = deque(maxlen=_WRITE_SAMPLES)
+    self._put_count = 0
+    self._put_writes_count = 0
+    self._errors = 0
+
+  async def _ensure_saver(self) -> BaseCheckpointSaver: # type: ignore
+    if self._saver is None:
+      if self.backend == "sqlite":
+        import aiosqlite # type: ignore
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver # type: ignore
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        saver = AsyncSqliteSaver(aiosqlite.connect(self.path, check_same_thread=False))
+        await saver.setup()
+        if self._saver is not None:
+          # another coroutine opened the database meanwhile
+          await saver.conn.close()
+          return self._saver
+        logger.info(f"Plan checkpoints are stored in '{self.path}'")
+        self._saver = saver
+      else:
+        self._saver = InMemorySaver()
+    return self._saver # type: ignore
+
+  async def _timed(self, samples: Deque[float], operation: Any) -> Any:
+    start = time.perf_counter()
+    try:
+      return await operation
+    except Exception:
+      self._errors += 1
+      raise
+    finally:
+      samples.append(time.perf_counter() - start)
+
+  @property
+  def config_specs(self) -> list: # type: ignore
+    return self._saver.config_specs if self._saver is not None else super().config_specs
+
+  async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+    saver = await self._ensure_saver()
+    return await saver.aget_tuple(config)
+
+  async def alist(
+      self,
+      config: Optional[RunnableConfig],
+      *,
+      filter: Optional[Dict[str, Any]] = None,
+      before: Optional[RunnableConfig] = None,
+      limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+    saver = await self._ensure_saver()
+    async for checkpoint_tuple in saver.alist(config, filter=filter, before=before, limit=limit):
+      yield checkpoint_tuple
+
+  async def aput(
+      self,
+      config: RunnableConfig,
+      checkpoint: Checkpoint,
+      metadata: CheckpointMetadata,
+      new_versions: ChannelVersions
+    ) -> RunnableConfig:
+    saver = await self._ensure_saver()
+    self._put_count += 1
+    return await self._timed(self._puts, saver.aput(config, checkpoint, metadata, new_versions))
+
+  async def aput_writes(
+      self,
+      config: RunnableConfig,
+      writes: Sequence[Tuple[str, Any]],
+      task_id: str,
+      task_path: str = ""
+    ) -> None:
+    saver = await self._ensure_saver()
+    self._put_writes_count += 1
+    await self._timed(self._put_writes, saver.aput_writes(config, writes, task_id, task_path))
+
+  async def adelete_thread(self, thread_id: str) -> None:
+    saver = await self._ensure_saver()
+    await saver.adelete_thread(thread_id)
+
+  def get_next_version(self, current: Any, channel: None = None) -> Any:
+    # every write goes through an async method first, which opens the saver
+    if self._saver is not None:
+      return self._saver.get_next_version(current, channel)
+    return super().get_next_version(current, channel)
+
+  async def aclose(self) -> None:
+    """ Close the SQLite connection, pending checkpoints are written first """
+    saver, self._saver = self._saver, None
+    conn = getattr(saver, "conn", None)
+    if conn is not None:
+      await conn.close()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get checkpoint write statistics, latencies are in milliseconds """
+    return {
+      "backend": self.backend,
+      "durability": config_manager.agent_config.CHECKPOINT_DURABILITY,
+      "checkpoints": self._put_count,
+      "pending_writes": self._put_writes_count,
+      "errors": self._errors,
+      "checkpoint_write_ms": latency_summary(self._puts),
+      "pending_write_ms": latency_summary(self._put_writes),
+    }
+
+
+def create_checkpointer() -> Optional[TimedCheckpointer]:
+  """ Create the checkpointer selected with `AGENT_CHECKPOINTER`
+  Returns:
+      Optional[TimedCheckpointer]: The checkpointer, None when checkpointing is disabled.
+  """
+  agent_config = config_manager.agent_config
+  if agent_config.CHECKPOINTER == "none":
+    return None
+  return TimedCheckpointer(agent_config.CHECKPOINTER, agent_config.CHECKPOINT_PATH)
+
+
+# Global plan checkpointer instance, shared by every compiled plan graph
+plan_checkpointer = create_checkpointer()
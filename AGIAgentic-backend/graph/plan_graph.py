@@ -1,4 +1,5 @@
 
+import json
 import time
 import asyncio
 import traceback
@@ -6,24 +7,43 @@ import traceback
 from datetime import datetime
 
 from langgraph.graph import StateGraph # type: ignore
-from typing import Any, AsyncIterator, Dict, List
-from langgraph.prebuilt import create_react_agent # type: ignore
+from pydantic import ValidationError
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from langgraph.graph.state import CompiledStateGraph # type: ignore
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.runnables import Runnable
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
+from langchain_core.callbacks.manager import adispatch_custom_event
 
 
 from common.logger import logger
-from utils.json_util import json_match
+from common.metrics import graph_node_duration, metrics_callback, observe_timing
+from conf.config import config_manager
+from utils.json_util import json_match, StreamingArrayParser
+from utils.tool.tool_cache import TOOL_CACHE_HIT_EVENT
+from utils.plan.plan_util import normalize_execution_plans, StreamingPlanNormalizer
+from utils.plan.plan_parser import parse_execution_plan, planning_stats
 from graph.base_graph import BaseGraph
-from graph.states.plan_state import PlanExecutorState
-from prompts.plan_executor_prompt import planning_prompt, react_prompt, summary_response_prompt
+from graph.registry import graph_registry
+from graph.checkpoint import plan_checkpointer
+from llms.hedging import deadline, latency_tracker, llm_hedger
+from services.plan_cache import plan_cache
+from services.semantic_plan_cache import semantic_plan_cache
+from graph.states.plan_state import PlanExecutorState, ExecutionPlan, ExecutionPlanStep
+from prompts.plan_executor_prompt import planning_prompt, plan_feedback_prompt, react_prompt, summary_response_prompt
 
 
+# Name of the custom event used to stream chunks from inside a running node
+STREAMING_CHUNK_EVENT = "streaming_chunk"
+
+# SSE event carrying the summary response token by token, `seq` orders the deltas of one stream
+SUMMARY_RESPONSE_NODE = "summary_response"
+SUMMARY_DELTA_EVENT = "summary_delta"
+
 
 class PlanExecutionGraph(BaseGraph):
   """ A class to represent the plan execution graph. """
 
-  def __init__(self, provider_name: str = "zhipu") -> None:
+  def __init__(self, provider_name: Optional[str] = None) -> None:
     """ Init """
     super().__init__('PlanExecutionGraph', provider_name)
     self.graph = self.build_graph() # type: ignore
@@ -36,13 +56,13 @@ class PlanExecutionGraph(BaseGraph):
 
     # To add nodes
     # add analyze task and generate execution plan node
-    workflow.add_node('analyze_and_plan', self._analyze_and_plan) # type: ignore
+    workflow.add_node('analyze_and_plan', self._timed_node('analyze_and_plan', self._analyze_and_plan)) # type: ignore
 
     # add check and execute node
-    workflow.add_node('check_and_execute', self._check_and_execute_node) # type: ignore
+    workflow.add_node('check_and_execute', self._timed_node('check_and_execute', self._check_and_execute_node)) # type: ignore
 
     # add summary response node
-    workflow.add_node('summary_response', self._summary_response) # type: ignore
+    workflow.add_node(SUMMARY_RESPONSE_NODE, self._timed_node(SUMMARY_RESPONSE_NODE, self._summary_response)) # type: ignore
 
     # To define entry point
     workflow.set_entry_point('analyze_and_plan')
@@ -56,10 +76,44 @@ class PlanExecutionGraph(BaseGraph):
       path=self._jump_condictional,  # type: ignore
       path_map={
         "next_node": "check_and_execute",
-        "completed": "summary_response",
+        "completed": SUMMARY_RESPONSE_NODE,
       }
     )
-    return workflow.compile() # type: ignore
+    # Checkpoint the state after every node, so an interrupted plan can be resumed
+    return workflow.compile(checkpointer=plan_checkpointer) # type: ignore
+
+  def _timed_node(self, name: str, node: Callable[[PlanExecutorState], Awaitable[PlanExecutorState]]) -> Callable[[PlanExecutorState], Awaitable[PlanExecutorState]]:
+    """ Record the duration of every run of a node, for the per-node latency percentiles and histograms
+    With `STREAM_PLANNING` the steps run inside `analyze_and_plan`, their execution time is recorded
+    as `check_and_execute` then, so both nodes keep measuring the same work in both modes.
+    Args:
+        name (str): node name
+        node (Callable[[PlanExecutorState], Awaitable[PlanExecutorState]]): the node
+    Returns:
+        Callable[[PlanExecutorState], Awaitable[PlanExecutorState]]: the timed node
+    """
+    async def _run(state: PlanExecutorState) -> PlanExecutorState:
+      start_time = time.monotonic()
+      status = "error"
+      # a check_and_execute run after a streamed plan only takes over the results of its steps
+      results_only = name == "check_and_execute" and bool(state.get("steps_executed"))
+      try:
+        result = await node(state)
+        status = "failed" if result.get("status") == "failed" else "ok"
+        return result
+      finally:
+        durations = {name: time.monotonic() - start_time}
+        if name == "analyze_and_plan" and state.get("steps_executed"):
+          # a streamed plan ran its steps inside this node, they are recorded as step execution
+          executed = min(durations[name], state["timing_info"].get("check_and_execute_duration", 0.0))
+          durations = {name: durations[name] - executed, "check_and_execute": executed}
+        if results_only:
+          durations = {}
+        for node_name, duration in durations.items():
+          latency_tracker.record(node_name, duration)
+          graph_node_duration.observe(duration, node=node_name, status=status)
+
+    return _run
 
   def statistic_timing(self, start_time: float, operation_name: str) -> Dict[str, Any]:
     """ statistic timing info
@@ -70,6 +124,7 @@ class PlanExecutionGraph(BaseGraph):
         Dict[str, Any]: timing info
     """
     duration = time.time() - start_time
+    observe_timing(operation_name, duration)
     return {
         f"{operation_name}_duration": round(duration, 2),
         f"{operation_name}_timestamp": datetime.now().isoformat()
@@ -95,38 +150,65 @@ class PlanExecutionGraph(BaseGraph):
 
     
 
-  def _analyze_and_plan(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
+  async def _analyze_and_plan(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
     """ Analyze the task and generate plan"""
 
     logger.info("Starting Analyzing task and generating execution plan...")
     start_time = time.time()
+    user_task = state.get("user_task", "")
+    use_plan_cache = state.get("use_plan_cache", True)
     try:
-      # Generate execution plan
-      messages = [HumanMessage(content=planning_prompt.format(user_task=state.get("user_task", "")))]  # type: ignore
-      plan = self.reason_llm.invoke(messages)
-      json_plan = json_match(plan.content)  # type: ignore
-      logger.debug(f"Generated execution plan: {json_plan}")
-
-      # Validate the generated plan
-      if not json_plan or "execution_plans" not in json_plan:
-        state["status"] = "failed"
-        state["error"] = "Failed to generate valid execution plan."
-        return state
+      # Reuse the cached plan of an identical task, skipping the planning LLM
+      json_plan = plan_cache.get(user_task) if use_plan_cache else None
+      cache_type = "exact" if json_plan is not None else ""
+
+      # Fall back to the plan of a semantically similar task
+      task_vector = None
+      if json_plan is None and use_plan_cache:
+        json_plan, similarity, task_vector = await semantic_plan_cache.lookup(user_task, self.embedding_llm)
+        if json_plan is not None:
+          cache_type = "semantic"
+          # not promoted to the exact cache, a near match stays subject to the semantic checks
+          logger.debug(f"Semantic plan cache similarity: {similarity:.4f}")
+      cache_hit = json_plan is not None
+
+      if json_plan is None:
+        # Generate execution plan
+        messages = [HumanMessage(content=planning_prompt.format(user_task=user_task))]  # type: ignore
+        if config_manager.agent_config.STREAM_PLANNING:
+          json_plan, outcome = await self._stream_plan_and_execute(state, messages, start_time)
+        else:
+          json_plan, outcome = await self._generate_plan(messages)
+        logger.debug(f"Generated execution plan: {json_plan}")
+
+        # Validate the generated plan
+        if not json_plan or "execution_plans" not in json_plan:
+          state["status"] = "failed"
+          state["error"] = "Failed to generate valid execution plan."
+          return state
+
+        # a repaired plan may have lost the steps cut off with a truncated output
+        if use_plan_cache and outcome == "valid":
+          plan_cache.put(user_task, json_plan)
+          semantic_plan_cache.insert(user_task, task_vector, json_plan)
 
       # Update state with analysis and plan
       state["task_analysis"] = json_plan.get("task_analysis", "")
       state["execution_plans"] = json_plan.get("execution_plans", [])
       state["current_step"] = 0
-      state["timing_info"] = self.statistic_timing(start_time, "analyze_and_plan")
+      if "analyze_and_plan_duration" not in state["timing_info"]:
+        state["timing_info"].update(self.statistic_timing(start_time, "analyze_and_plan"))
 
       # Add streaming chunk
       self._add_streaming_chunk(
         state=state,
         step="analyze_and_plan",
-        message="✅ 任务分析和执行计划生成完成。",
+        message="✅ 任务分析和执行计划生成完成（命中计划缓存）。" if cache_hit else "✅ 任务分析和执行计划生成完成。",
         data={
             "task_analysis": state["task_analysis"],
-            "execution_plans": state["execution_plans"]
+            "execution_plans": state["execution_plans"],
+            "plan_cache_hit": cache_hit,
+            "plan_cache_type": cache_type
         }
       )
     except Exception as e:
@@ -135,76 +217,365 @@ class PlanExecutionGraph(BaseGraph):
       state["error"] = str(e)
     return state
   
-  def _check_and_execute_node(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
-    """ Check and execute task"""
+  def _planning_llm(self) -> Runnable[Any, Any]:
+    """ The reasoning model bound to the configured `PLANNING_MODE`
+    Returns:
+        Runnable[Any, Any]: the planner
+    """
+    match config_manager.agent_config.PLANNING_MODE:
+      case "function_calling":
+        # tool_choice stays "auto", OpenAI-compatible providers such as Zhipu reject a forced tool
+        return self.reason_llm.bind_tools([ExecutionPlan])
+      case "json_mode":
+        return self.reason_llm.bind(response_format={"type": "json_object"})
+      case "json_schema":
+        return self.reason_llm.bind(response_format={
+          "type": "json_schema",
+          "json_schema": {"name": ExecutionPlan.__name__, "schema": ExecutionPlan.model_json_schema()}
+        })
+      case _:
+        return self.reason_llm
 
-    # Get current step and execution plans
-    current_step = state.get("current_step")
-    execution_plans = state.get("execution_plans", [])
+  def _plan_text(self, message: Any) -> str:
+    """ The plan written by the planner, from its plan tool call or its text content
+    Args:
+        message (Any): planner message or message chunk
+    Returns:
+        str: the plan text
+    """
+    content = message.content if isinstance(message.content, str) else ""
+    if isinstance(message, AIMessageChunk):
+      # streamed chunks carry the tool call arguments as text fragments
+      return content + "".join(chunk.get("args") or "" for chunk in message.tool_call_chunks)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+      if tool_call.get("name") == ExecutionPlan.__name__:
+        return json.dumps(tool_call.get("args", {}), ensure_ascii=False)
+    for tool_call in getattr(message, "invalid_tool_calls", None) or []:
+      if tool_call.get("name") == ExecutionPlan.__name__ and tool_call.get("args"):
+        return tool_call["args"]
+    return content
+
+  def _plan_feedback(self, messages: List[Any], plan_text: str, error: str) -> List[Any]:
+    """ Planning messages followed by the invalid plan and the reason it was rejected """
+    return messages + [
+      AIMessage(content=plan_text),
+      HumanMessage(content=plan_feedback_prompt.format(error=error[:500]))
+    ]
+
+  async def _generate_plan(self, messages: List[Any], first_attempt: int = 0) -> Tuple[Dict[str, Any], str]:
+    """ Generate a plan, repairing invalid output locally before asking the planner again
+    Args:
+        messages (List[Any]): planning prompt messages
+        first_attempt (int, optional): attempts already made by the caller. Defaults to 0.
+    Returns:
+        Tuple[Dict[str, Any], str]: the validated plan, an empty dict when every attempt failed, and its parse outcome
+    """
+    mode = config_manager.agent_config.PLANNING_MODE
+    attempts = 1 + max(0, config_manager.agent_config.PLANNING_RETRIES)
+    planner = self._planning_llm()
+    for attempt in range(first_attempt, attempts):
+      if attempt > 0:
+        planning_stats.record_retry()
+      async with deadline("analyze_and_plan"):
+        message = await llm_hedger.invoke("planning_llm", lambda: planner.ainvoke(messages))
+      plan_text = self._plan_text(message)
+      json_plan, outcome, error = parse_execution_plan(plan_text)
+      planning_stats.record(mode, outcome)
+      if json_plan is not None:
+        return json_plan, outcome
+      logger.warning(f"Invalid execution plan (attempt {attempt + 1}/{attempts}): {error}")
+      messages = self._plan_feedback(messages, plan_text, error)
+    planning_stats.record_failed_plan()
+    return {}, "failed"
+
+  async def _stream_plan_and_execute(self, state: PlanExecutorState, messages: List[Any], start_time: float) -> Tuple[Dict[str, Any], str]:
+    """ Stream the plan and execute its steps while it is being written
+    Each `execution_plans` entry is streamed to the client and queued for execution as soon
+    as its object closes, the step results are stored in the state once every step finished.
+    Args:
+        state (PlanExecutorState): current state
+        messages (List[Any]): planning prompt messages
+        start_time (float): start time of the planning node
+    Returns:
+        Tuple[Dict[str, Any], str]: the parsed plan, an empty dict when the planner returned no valid plan,
+            and its parse outcome, "repaired" when only the steps that streamed as valid objects were kept
+    """
+    parser = StreamingArrayParser("execution_plans")
+    normalizer = StreamingPlanNormalizer()
+    steps: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    scheduler = asyncio.create_task(self._schedule_steps(steps, {}))
 
-    logger.info(f"current_step: {current_step}, total_steps: {len(execution_plans)}")
+    async def queue_step(raw_step: Any) -> None:
+      try:
+        raw_step = ExecutionPlanStep.model_validate(raw_step).model_dump()
+      except ValidationError as e:
+        logger.warning(f"Skipping invalid streamed plan step: {e}")
+        return
+      step = normalizer.add(raw_step)
+      if step is None:
+        return
+      steps.put_nowait(step)
+      await adispatch_custom_event(STREAMING_CHUNK_EVENT, {
+          "step": "plan_step",
+          "message": f"📝 计划步骤 {step['step']}: {step.get('description', '')}",
+          "data": {
+              "plan_step": step
+          }
+      })
+
+    mode = config_manager.agent_config.PLANNING_MODE
+    try:
+      async with deadline("analyze_and_plan"):
+        async for chunk in llm_hedger.stream("planning_llm_first_chunk", lambda: self._planning_llm().astream(messages)):
+          for raw_step in parser.feed(self._plan_text(chunk)):
+            await queue_step(raw_step)
+      json_plan, outcome, error = parse_execution_plan(parser.text)
+      if json_plan is None and normalizer.steps:
+        # Keep the steps that streamed as valid objects, they may already be running
+        json_plan, outcome = {"task_analysis": "", "execution_plans": list(normalizer.steps)}, "repaired"
+      planning_stats.record(mode, outcome)
+      if json_plan is None:
+        # Ask again without streaming, the retry has no steps to overlap with
+        logger.warning(f"Invalid streamed execution plan: {error}")
+        json_plan, outcome = await self._generate_plan(self._plan_feedback(messages, parser.text, error), first_attempt=1)
+
+      # Queue the steps the incremental parser could not extract
+      raw_steps = json_plan.get("execution_plans") if json_plan else None
+      if isinstance(raw_steps, list):
+        for raw_step in raw_steps[len(normalizer.steps):]:  # type: ignore
+          await queue_step(raw_step)
+      steps.put_nowait(None)
+      state["timing_info"].update(self.statistic_timing(start_time, "analyze_and_plan"))
+
+      execute_start_time = time.time()
+      results = await scheduler
+    except BaseException:
+      scheduler.cancel()
+      raise
+
+    if not json_plan or "execution_plans" not in json_plan:
+      return {}, outcome
+    json_plan["execution_plans"] = normalizer.finalize()
+    state["step_results"] = [results[number] for number in sorted(results)]
+    state["steps_executed"] = True
+    state["timing_info"].update(self.statistic_timing(execute_start_time, "check_and_execute"))
+    return json_plan, outcome
+
+  async def _check_and_execute_node(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
+    """ Schedule and execute plan steps by their dependencies
+    Every step whose dependencies have completed is started right away, up to
+    `MAX_PARALLEL_STEPS` steps run concurrently, and each result is streamed as it finishes.
+    When the plan was streamed, its steps already ran while it was being generated.
+    """
 
-    # If all steps are completed 
-    if current_step >= len(execution_plans):
+    start_time = time.time()
+    execution_plans = normalize_execution_plans(state.get("execution_plans", []))  # type: ignore
+    state["execution_plans"] = execution_plans  # type: ignore
+
+    if state.get("steps_executed"):
+      results: Dict[int, Dict[str, Any]] = {result["step"]: result for result in state.get("step_results", [])}
+    else:
+      # Results of steps that are already completed are kept as they are
+      results = {
+        result["step"]: result for result in state.get("step_results", []) if result.get("status") == "completed"
+      }
+      steps: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+      for step in execution_plans:
+        steps.put_nowait(step)  # type: ignore
+      steps.put_nowait(None)
+      results = await self._schedule_steps(steps, results)
+      state["timing_info"].update(self.statistic_timing(start_time, "check_and_execute"))
+    state["steps_executed"] = False
+
+    # Keep step results ordered by step number
+    state["step_results"] = [results[number] for number in sorted(results)]
+    state["current_step"] = len([r for r in state["step_results"] if r.get("status") == "completed"])
+
+    failed_steps = [r["step"] for r in state["step_results"] if r.get("status") == "failed"]
+    if failed_steps:
+      state["status"] = "failed"
+      state["error"] = f"Steps {failed_steps} failed."
+      message = f"❌ 执行结束，失败步骤: {failed_steps}"
+    else:
       state["status"] = "completed"
-      return state
-    
-    # Get the current node to execute
-    current_node = execution_plans[current_step]
-    logger.debug(f"Executing step {current_step + 1}: {current_node}")
-
-    # Execute the current step
-    execution_result = self._do_execute(current_node, current_step)
+      message = f"✅ 全部 {len(state['step_results'])} 个步骤执行完成。"
+    self._add_streaming_chunk(
+      state=state,
+      step="check_and_execute",
+      message=message,
+      data={
+          "step_results": state["step_results"]
+      }
+    )
+    return state
 
-    state["step_results"].append(execution_result)
-    # Modify state for next step
-    state["current_step"] += 1
+  async def _schedule_steps(
+      self,
+      steps: "asyncio.Queue[Optional[Dict[str, Any]]]",
+      results: Dict[int, Dict[str, Any]]
+    ) -> Dict[int, Dict[str, Any]]:
+    """ Run plan steps as their dependencies complete
+    Steps are read from a queue, so execution can start while the planner is still writing
+    the plan; None marks the end of the plan. A step waits for dependencies that have not
+    arrived yet, references still unknown at the end of the plan are dropped. A step whose
+    number was already planned is ignored.
+    Args:
+        steps (asyncio.Queue[Optional[Dict[str, Any]]]): normalized steps, followed by None
+        results (Dict[int, Dict[str, Any]]): results of steps that must not run again
+    Returns:
+        Dict[int, Dict[str, Any]]: results by step number
+    """
+    results = dict(results)
+    pending: Dict[int, Dict[str, Any]] = {}
+    running: Dict["asyncio.Task[Dict[str, Any]]", int] = {}
+    planned: Set[int] = set()
+    semaphore = asyncio.Semaphore(max(1, config_manager.agent_config.MAX_PARALLEL_STEPS))
+    next_step: "Optional[asyncio.Task[Optional[Dict[str, Any]]]]" = asyncio.create_task(steps.get())
 
-    return self._process_execution_result(state, execution_result, current_step)
-  
+    try:
+      while next_step is not None or pending or running:
+        # Skip steps whose dependencies failed or were skipped, repeat until no more steps are affected
+        skipped = True
+        while skipped:
+          skipped = False
+          for step_number, step in list(pending.items()):
+            blocked_by = [dep for dep in step["depends_on"] if results.get(dep, {}).get("status") in ("failed", "skipped")]
+            if blocked_by:
+              del pending[step_number]
+              results[step_number] = self._skipped_result(step_number, f"依赖的步骤 {blocked_by} 未成功完成，已跳过。")
+              skipped = True
+
+        # Start every step whose dependencies are completed
+        for step_number, step in list(pending.items()):
+          if all(results.get(dep, {}).get("status") == "completed" for dep in step["depends_on"]):
+            del pending[step_number]
+            dependency_results = [results[dep] for dep in step["depends_on"]]
+            task = asyncio.create_task(self._execute_with_limit(semaphore, step, dependency_results))
+            running[task] = step_number
+
+        if not running and next_step is None:
+          # Nothing can make progress, the remaining steps form a dependency cycle
+          for step_number in list(pending):
+            del pending[step_number]
+            results[step_number] = self._skipped_result(step_number, "步骤存在循环依赖，无法执行。", status="failed")
+          break
+
+        # Wake up on the next finished step or the next planned step
+        waiting: Set["asyncio.Task[Any]"] = set(running.keys())
+        if next_step is not None:
+          waiting.add(next_step)
+        done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          if task is next_step:
+            step = next_step.result()
+            if step is None:
+              # The plan is complete, forget references to steps that never arrived
+              next_step = None
+              known = set(pending) | set(results) | set(running.values())
+              for pending_step in pending.values():
+                pending_step["depends_on"] = [dep for dep in pending_step["depends_on"] if dep in known]
+            else:
+              # A step number that was already planned is ignored, its dependents keep the first step
+              if step["step"] in planned:
+                logger.warning(f"Ignoring duplicate plan step {step['step']}: {step}")
+              elif step["step"] not in results:
+                pending[step["step"]] = step
+              planned.add(step["step"])
+              next_step = asyncio.create_task(steps.get())
+            continue
+          # Stream each result as soon as it finishes
+          step_number = running.pop(task)
+          execution_result = task.result()
+          results[step_number] = execution_result
+          await self._process_execution_result(execution_result)
+    finally:
+      if next_step is not None:
+        next_step.cancel()
+      for task in running:
+        task.cancel()
+    return results
+
+  async def _execute_with_limit(self, semaphore: asyncio.Semaphore, step: Dict[str, Any], dependency_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """ execute a step once a concurrency slot is free, retrying it when it fails
+    A failed step runs again up to `STEP_RETRIES` times after a backoff doubled each retry,
+    the concurrency slot is free while it waits.
+    Args:
+        semaphore (asyncio.Semaphore): limits the number of concurrently running steps
+        step (Dict[str, Any]): step info
+        dependency_results (List[Dict[str, Any]]): results of the steps this step depends on
+    Returns:
+        Dict[str, Any]: execution result of the last attempt, with the number of attempts
+    """
+    agent_config = config_manager.agent_config
+    retries = max(0, agent_config.STEP_RETRIES)
+    attempt = 0
+    while True:
+      async with semaphore:
+        step_start = time.monotonic()
+        execution_result = await self._do_execute(step, dependency_results)
+        latency_tracker.record("execute_step", time.monotonic() - step_start)
+      attempt += 1
+      if execution_result.get("status") != "failed" or attempt > retries:
+        break
+      delay = min(agent_config.STEP_RETRY_BACKOFF * 2 ** (attempt - 1), agent_config.STEP_RETRY_BACKOFF_MAX)
+      logger.warning(f"Step {step.get('step')} failed (attempt {attempt}/{retries + 1}), retrying in {delay:.1f}s")
+      await adispatch_custom_event(STREAMING_CHUNK_EVENT, {
+          "step": f"step_{step.get('step')}_retry",
+          "message": f"🔁 步骤 {step.get('step')} 执行失败，{delay:.1f} 秒后重试（{attempt}/{retries}）。",
+          "data": {
+              "execution_result": execution_result,
+              "attempt": attempt,
+              "delay": delay
+          }
+      })
+      await asyncio.sleep(delay)
+    execution_result["attempts"] = attempt
+    return execution_result
+
+  def _skipped_result(self, step_number: int, reason: str, status: str = "skipped") -> Dict[str, Any]:
+    """ build the result of a step that was not executed
+    Args:
+        step_number (int): step number
+        reason (str): why the step was not executed
+        status (str, optional): result status. Defaults to "skipped".
+    Returns:
+        Dict[str, Any]: execution result
+    """
+    return {
+        "step": step_number,
+        "execution_result": reason,
+        "status": status,
+        "timing": {}
+    }
 
-  def _process_execution_result(self, state: PlanExecutorState, execution_result: Dict[str, Any], current_step: int) -> PlanExecutorState:
-    """ process execution result
+  async def _process_execution_result(self, execution_result: Dict[str, Any]) -> None:
+    """ stream an execution result as soon as the step finishes
     Args:
-        state (PlanExecutorState): current state
         execution_result (Dict[str, Any]): execution result
-        current_step (int): current step index
-    Returns:
-        PlanExecutorState: updated state
     """
 
-    # Add streaming chunk for execution result
+    step_number = execution_result.get("step")
     # Failed execution
     if execution_result.get("status") == "failed":
-      self._add_streaming_chunk(
-        state=state,
-        step=f"step_{current_step + 1}",
-        message=f"❌ 步骤 {current_step + 1} 执行失败，错误信息: {execution_result.get('execution_result')}",
-        data={
+      message = f"❌ 步骤 {step_number} 执行失败，错误信息: {execution_result.get('execution_result')}"
+    # Successful execution
+    else:
+      message = f"✅ 步骤 {step_number} 执行完成。"
+    await adispatch_custom_event(STREAMING_CHUNK_EVENT, {
+        "step": f"step_{step_number}",
+        "message": message,
+        "data": {
             "execution_result": execution_result
         }
-      )
-      state["status"] = "failed"
-      return state
-    
-    # Successful execution
-    self._add_streaming_chunk(
-      state=state,
-      step=f"step_{current_step + 1}",
-      message=f"✅ 步骤 {current_step + 1} 执行完成。",
-      data={
-          "execution_result": execution_result
-      }
-    )
-    return state
+    })
     
 
-  def _summary_response(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
+  async def _summary_response(self, state: PlanExecutorState) -> PlanExecutorState: # type: ignore
     """ summary result"""
 
     start_time = time.time()
     task_analysis = state.get("task_analysis")
-    execution_plan = state.get("execution_plan")
+    execution_plan = state.get("execution_plans")
     step_results = state.get("step_results")
 
     # assemble execution plan text
@@ -230,7 +601,14 @@ class PlanExecutionGraph(BaseGraph):
 
     try:
       logger.info("Start generating summary response...")
-      summary = self.reason_llm.invoke(messages)
+      # Stream the summary, the tokens reach the client as `summary_delta` events
+      summary_parts: List[str] = []
+      async with deadline(SUMMARY_RESPONSE_NODE):
+        async for chunk in llm_hedger.stream("summary_llm_first_chunk", lambda: self.reason_llm.astream(messages)):
+          if not summary_parts:
+            state["timing_info"].update(self.statistic_timing(start_time, "response_first_token"))
+          summary_parts.append(chunk.content if isinstance(chunk.content, str) else "") # type: ignore
+      summary_text = "".join(summary_parts)
     except Exception as e:
       logger.error(f"Error in _summary_response: {e}")
       state["status"] = "failed"
@@ -244,24 +622,25 @@ class PlanExecutionGraph(BaseGraph):
     # Calculate total duration
     total_duration = (
         state["timing_info"].get("analyze_and_plan_duration", 0) +
+        state["timing_info"].get("check_and_execute_duration", 0) +
         state["timing_info"].get("response_generation_duration", 0)
     )
 
     # Add final streaming chunk with summary
-    state["streaming_chunks"].append({
+    state["streaming_chunks"] = [{
         "step": "completed",
         "message": f"🎉 任务完成！总耗时: {total_duration:.2f}秒", # type: ignore
         "data": {
-            "response": summary.content, # type: ignore
+            "response": summary_text,
             "step": "summary_response",
             "message": f"🎉 任务完成！总耗时: {total_duration:.2f}秒",
             "timing_info": state["timing_info"],
-            "total_nodes": len(state.get("execution_plan", [])),
-            "completed_nodes": len(state.get("step_results", [])),
+            "total_nodes": len(state.get("execution_plans", [])),
+            "completed_nodes": len([r for r in state.get("step_results", []) if r.get("status") == "completed"]),
             "step_results": state.get("step_results", []),
-            "execution_plan": state.get("execution_plan", [])
+            "execution_plan": state.get("execution_plans", [])
         }
-    })
+    }]
     logger.info(f"End generating summary response...")
     return state
   
@@ -331,15 +710,16 @@ class PlanExecutionGraph(BaseGraph):
       return execution_result   # type: ignore
   
 
-  def _do_execute(self, step: Dict[str, Any], current_step: int) -> Dict[str, Any]:
+  async def _do_execute(self, step: Dict[str, Any], dependency_results: List[Dict[str, Any]] = []) -> Dict[str, Any]: # type: ignore
     """ do execute step
     Args:
         step (Dict[str, Any]): step info
-        current_step (int): current step index      
+        dependency_results (List[Dict[str, Any]], optional): results of the steps this step depends on. Defaults to [].
     Returns:  
         Dict[str, Any]: execution result
     """
-    logger.info(f"Executing step {current_step + 1}: {step}")
+    step_number = step.get("step")
+    logger.info(f"Executing step {step_number}: {step}")
     
     start_time = time.time()
 
@@ -347,11 +727,8 @@ class PlanExecutionGraph(BaseGraph):
       # Combine all tools
       all_tools = self.local_tools + self.mcp_tools
 
-      # Create React agent
-      agent = create_react_agent( # type: ignore
-        model=self.simple_llm,
-        tools=all_tools
-      ) 
+      # Get the shared React agent
+      agent = graph_registry.get_react_agent(self.provider_name, self.simple_llm, all_tools)
 
       all_tools_formatted = self._format_tools_list(all_tools)
 
@@ -360,46 +737,123 @@ class PlanExecutionGraph(BaseGraph):
         description=step.get("description", ""),
         user_feedback="",
         expected_result=step.get("expected_result", ""),
+        dependency_results="\n".join(
+          f"步骤{result.get('step')}: {result.get('execution_result')}" for result in dependency_results
+        ) or "无",
         tools="\n".join(all_tools_formatted),
       )
-      logger.debug(f"React prompt for step {current_step + 1}")
+      logger.debug(f"React prompt for step {step_number}")
 
       # Execute with agent
       messages = {"messages": [{"role": "user", "content": react_prompt_filled}]}
-      if hasattr(agent, 'ainvoke'): # type: ignore
-          new_loop = asyncio.new_event_loop()
-          asyncio.set_event_loop(new_loop)
-          result = new_loop.run_until_complete(agent.ainvoke(messages)) # type: ignore
-      else:
-          result = agent.invoke(messages) # type: ignore
+      # Steps are not hedged, a duplicate agent run would repeat its tool calls
+      async with deadline("execute_step"):
+        result = await agent.ainvoke(messages) # type: ignore
       result = self._extract_execution_result(result) # type: ignore
-      timing_info = self.statistic_timing(start_time, f"execute_step_{current_step + 1}")
-      logger.debug(f"Step {current_step + 1} execution result: {result}")
+      timing_info = self.statistic_timing(start_time, f"execute_step_{step_number}")
+      logger.debug(f"Step {step_number} execution result: {result}")
       
       return {
-          "step": current_step + 1,
+          "step": step_number,
           "execution_result": result,
           "status": "completed",
           "timing": timing_info
       }
     except Exception as e:
-      logger.error(f"Error executing step {current_step + 1}: {e}")
-      timing_info = self.statistic_timing(start_time, f"execute_step_{current_step + 1}")
+      logger.error(f"Error executing step {step_number}: {e}")
+      timing_info = self.statistic_timing(start_time, f"execute_step_{step_number}")
       return {
-          "step": current_step + 1,
+          "step": step_number,
           "execution_result": str(e),
           "status": "failed",
           "timing": timing_info
       }
 
 
+  async def get_thread_state(self, thread_id: str) -> Optional[Any]:
+    """ The last checkpoint of a thread
+    Args:
+        thread_id (str): thread id of the run
+    Returns:
+        Optional[Any]: the state snapshot, its `next` nodes are empty once the run finished;
+            None when checkpointing is disabled or the thread has no checkpoint
+    """
+    if plan_checkpointer is None:
+      return None
+    snapshot = await self.graph.aget_state({"configurable": {"thread_id": thread_id}})  # type: ignore
+    return snapshot if snapshot.created_at else None
+
+  async def reset_failed_steps(self, thread_id: str) -> List[int]:
+    """ Prepare a finished thread to run only the steps that did not complete
+    The plan and the completed step results stay in the thread, the next resume runs
+    `check_and_execute` again, which keeps the completed results, re-executes the failed
+    and skipped steps and writes a new summary.
+    Args:
+        thread_id (str): thread id of the run
+    Returns:
+        List[int]: the step numbers that run again, empty when there is nothing to retry
+    """
+    snapshot = await self.get_thread_state(thread_id)
+    if snapshot is None or not snapshot.values.get("execution_plans"):
+      return []
+    completed = [result for result in snapshot.values.get("step_results", []) if result.get("status") == "completed"]
+    completed_steps = {result["step"] for result in completed}
+    retry_steps = [step["step"] for step in snapshot.values["execution_plans"] if step.get("step") not in completed_steps]
+    if retry_steps:
+      await self.graph.aupdate_state(  # type: ignore
+        {"configurable": {"thread_id": thread_id}},
+        {
+          "status": "initialized",
+          "error": "",
+          "step_results": completed,
+          "steps_executed": False,
+          "streaming_chunks": []
+        },
+        as_node="analyze_and_plan"
+      )
+    return retry_steps
+
   # Call to execute the graph
-  async def chat_with_planning_stream(self, thread_id: str, user_task: str = "") -> AsyncIterator[Any]:
-    """ chat with planning"""
-    init_data = PlanExecutorState(
-      user_id=thread_id,
-      session_id=thread_id,
-      request_id=thread_id,
+  async def chat_with_planning_stream(
+      self,
+      thread_id: str,
+      user_task: str = "",
+      user_id: str = "",
+      session_id: str = "",
+      request_id: str = "",
+      use_plan_cache: bool = True,
+      resume: bool = False
+    ) -> AsyncIterator[Any]:
+    """ chat with planning
+    The graph instance is shared across requests, everything specific to a request
+    lives in the state built here, or in the checkpoints of its thread.
+    Args:
+        thread_id (str): thread id of the run, the key of its checkpoints
+        user_task (str, optional): the user task. Defaults to "".
+        user_id (str, optional): user id, defaults to the thread id.
+        session_id (str, optional): session id, defaults to the thread id.
+        request_id (str, optional): request id, defaults to the thread id.
+        use_plan_cache (bool, optional): whether the plan cache may be used. Defaults to True.
+        resume (bool, optional): continue the thread from its last checkpoint instead of
+            starting a new run, the other arguments are ignored then. Defaults to False.
+    """
+    yield {
+        "data": {
+          "step": "thread",
+          "message": f"🧵 {'恢复执行' if resume else '开始执行'}，线程: {thread_id}",
+          "data": {
+              "thread_id": thread_id,
+              "resumable": plan_checkpointer is not None,
+              "resumed": resume
+          },
+          "node": "checkpoint"
+      },
+      "event": "thread"
+    }
+    init_data = None if resume else PlanExecutorState(
+      user_id=user_id or thread_id,
+      session_id=session_id or thread_id,
+      request_id=request_id or thread_id,
       messages=[HumanMessage(content=user_task)],  # type: ignore
       streaming_chunks=[],
       status="initialized",
@@ -410,8 +864,18 @@ class PlanExecutionGraph(BaseGraph):
       execution_plans=[],
       current_step=0,
       step_results=[],
+      steps_executed=False,
+      use_plan_cache=use_plan_cache,
     )
-    async for event in self.graph.astream_events(init_data):  # type: ignore
+    cached_tool_runs: Set[Any] = set()
+    summary_seq = 0
+    # a hedged summary runs twice for a moment, only the run that streamed first is forwarded
+    summary_run_id = None
+    run_config: Dict[str, Any] = {"configurable": {"thread_id": thread_id}, "callbacks": [metrics_callback]}
+    run_options: Dict[str, Any] = {}
+    if plan_checkpointer is not None:
+      run_options["durability"] = config_manager.agent_config.CHECKPOINT_DURABILITY
+    async for event in self.graph.astream_events(init_data, run_config, **run_options):  # type: ignore
         # Event types to handle:
           # 'on_chain_start'
           # 'on_tool_end' 
@@ -422,10 +886,32 @@ class PlanExecutionGraph(BaseGraph):
           # 'on_chat_model_stream'
           # 'on_chain_stream'
 
-        ## on_chat_model event is not necessary to handle, as the Autonomy plan focuses on tool and chain execution.
-        ## Model-related events are intermediate processing steps.
-
-        if event["event"] == "on_chain_stream":
+        ## on_chat_model events are intermediate processing steps, except the tokens of the summary
+        ## response which are forwarded as `summary_delta` events.
+
+        if event["event"] == "on_chat_model_stream":
+            if event.get("metadata", {}).get("langgraph_node") != SUMMARY_RESPONSE_NODE:
+                continue
+            delta = getattr(event.get("data", {}).get("chunk"), "content", "")
+            if not isinstance(delta, str) or not delta:
+                continue
+            summary_run_id = summary_run_id or event.get("run_id")
+            if event.get("run_id") != summary_run_id:
+                continue
+            yield {
+                "data": {
+                  "step": SUMMARY_DELTA_EVENT,
+                  "message": "",
+                  "data": {
+                      "delta": delta,
+                      "seq": summary_seq
+                  },
+                  "node": SUMMARY_RESPONSE_NODE
+              },
+              "event": SUMMARY_DELTA_EVENT
+            }
+            summary_seq += 1
+        elif event["event"] == "on_chain_stream":
             chunk = event.get("data", {}).get("chunk", {})
             if isinstance(chunk, dict) and "streaming_chunks" in chunk:
                 for streaming_chunk in chunk["streaming_chunks"]: # type: ignore
@@ -451,6 +937,21 @@ class PlanExecutionGraph(BaseGraph):
                   "event": "on_chain_stream"
                 }
                 return
+        elif event["event"] == "on_custom_event" and event.get("name") == STREAMING_CHUNK_EVENT:
+            # Chunks streamed from inside a running node, e.g. step results as they finish
+            streaming_chunk = event.get("data", {})
+            yield {
+                "data": {
+                  "step": streaming_chunk.get("step"), # type: ignore
+                  "message": streaming_chunk.get("message"), # type: ignore
+                  "data": streaming_chunk.get("data"), # type: ignore
+                  "node": event.get("metadata", {}).get("langgraph_node", "unknown")
+              },
+              "event": "on_chain_stream"
+            }
+        elif event["event"] == "on_custom_event" and event.get("name") == TOOL_CACHE_HIT_EVENT:
+            # Remember the tool runs that were served from the tool cache
+            cached_tool_runs.add(event.get("run_id"))
         elif event["event"] == "on_chain_start":
             # Agent start run
             yield {
@@ -497,7 +998,8 @@ class PlanExecutionGraph(BaseGraph):
                   "step": "tool_complete",
                   "message": f"✅ 工具 {event.get('name', 'unknown')} 执行完成",
                   "data": {
-                      "tool": event.get("name", "unknown")
+                      "tool": event.get("name", "unknown"),
+                      "cache_hit": event.get("run_id") in cached_tool_runs
                   },
                   "node": "tool_execution"
                 },
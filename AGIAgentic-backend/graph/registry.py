@@ -0,0 +1,127 @@
+
+
+import threading
+
+from typing_extensions import Self
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+from langgraph.prebuilt import create_react_agent # type: ignore
+
+from common.logger import logger
+from conf.config import config_manager
+from services.tool import tool_catalog_version
+
+
+G = TypeVar("G")
+
+
+class GraphRegistry:
+  """ Process-wide registry of compiled graphs and ReAct agents
+  Graphs are keyed by graph class, provider, configured models and tool catalog version,
+  ReAct agents by provider, model and tool catalog version. Every cached entry is dropped
+  as soon as the tool catalog version changes.
+  """
+
+  _instance = None
+
+  def __new__(cls, *args: Any, **kwargs: Any) -> Self:
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self) -> None:
+    """ Initialize the registry once """
+    if getattr(self, "_initialized", False):
+      return
+    self._graphs: Dict[Tuple[Any, ...], Any] = {}
+    self._agents: Dict[Tuple[Any, ...], Any] = {}
+    self._tools_version = tool_catalog_version()
+    self._lock = threading.RLock()
+    self._hits = 0
+    self._misses = 0
+    self._initialized = True
+
+  def _check_tools_version(self) -> str:
+    """ Drop every cached entry when the tool catalog changed
+    Returns:
+        str: The current tool catalog version.
+    """
+    tools_version = tool_catalog_version()
+    if tools_version != self._tools_version:
+      logger.info(f"Tool catalog changed ({self._tools_version} -> {tools_version}), invalidating graph registry.")
+      self._graphs.clear()
+      self._agents.clear()
+      self._tools_version = tools_version
+    return tools_version
+
+  def get_graph(self, graph_class: Type[G], provider_name: Optional[str] = None) -> G:
+    """ Get a compiled graph, building it on first use
+    Args:
+        graph_class (Type[G]): The graph class to build.
+        provider_name (Optional[str]): The LLM provider used by the graph, defaults to `MODEL_DEFAULT_PROVIDER`.
+    Returns:
+        G: The shared graph instance.
+    """
+    provider_name = provider_name or config_manager.model_config.DEFAULT_PROVIDER
+    with self._lock:
+      tools_version = self._check_tools_version()
+      model_config = config_manager.model_config
+      key = (
+        graph_class.__name__, provider_name,
+        model_config.SIMPLE_LLM, model_config.REASON_LLM, model_config.CODE_LLM, model_config.EMBEDDING_MODEL,
+        tools_version
+      )
+      graph = self._graphs.get(key)
+      if graph is None:
+        self._misses += 1
+        logger.info(f"Building graph {graph_class.__name__} for provider '{provider_name}', tools version {tools_version}")
+        graph = graph_class(provider_name=provider_name) # type: ignore
+        self._graphs[key] = graph
+      else:
+        self._hits += 1
+      return graph # type: ignore
+
+  def get_react_agent(self, provider_name: str, model: Any, tools: List[Any]) -> Any:
+    """ Get a ReAct agent, creating it on first use
+    Args:
+        provider_name (str): The LLM provider of the model.
+        model (Any): The chat model driving the agent.
+        tools (List[Any]): The tools available to the agent.
+    Returns:
+        Any: The shared compiled ReAct agent.
+    """
+    with self._lock:
+      tools_version = self._check_tools_version()
+      model_name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+      key = (provider_name, model_name, tools_version, tuple(getattr(t, "name", str(t)) for t in tools))
+      agent = self._agents.get(key)
+      if agent is None:
+        self._misses += 1
+        logger.info(f"Creating ReAct agent for model '{model_name}' of provider '{provider_name}', tools version {tools_version}")
+        agent = create_react_agent(model=model, tools=tools) # type: ignore
+        self._agents[key] = agent
+      else:
+        self._hits += 1
+      return agent
+
+  def invalidate(self) -> None:
+    """ Drop every cached graph and agent """
+    with self._lock:
+      self._graphs.clear()
+      self._agents.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get registry statistics
+    Returns:
+        Dict[str, Any]: Cached entry counts, hit/miss counters and the current tool catalog version.
+    """
+    return {
+      "graphs": len(self._graphs),
+      "agents": len(self._agents),
+      "hits": self._hits,
+      "misses": self._misses,
+      "tools_version": self._tools_version,
+    }
+
+
+# Global graph registry instance
+graph_registry = GraphRegistry()
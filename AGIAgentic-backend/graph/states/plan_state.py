@@ -1,11 +1,57 @@
 
 
-from typing import Any, Dict, List
-
+from typing import Any, Dict, List, Optional, TypedDict
+from pydantic import BaseModel, Field, field_validator
 
 from graph.states.base_state import BaseState
 
 
+class PlanStep(TypedDict, total=False):
+    """ A single step of the execution plan. """
+
+    # step number, starting from 1
+    step: int
+    # executable description of the step
+    description: str
+    # verifiable output of the step
+    expected_result: str
+    # whether the step needs user confirmation
+    requires_confirmation: bool
+    # reason for the confirmation
+    uncertainty_reason: str
+    # step numbers this step depends on, empty when it can start immediately
+    depends_on: List[int]
+
+
+class ExecutionPlanStep(BaseModel):
+    """ Schema of a plan step as returned by the planner, see `PlanStep` """
+
+    step: Optional[int] = Field(None, description="从 1 开始的步骤编号")
+    description: str = Field(..., min_length=1, description="可直接执行的操作说明（具体、明确）")
+    expected_result: str = Field("", description="此步骤完成后的可验证输出")
+    requires_confirmation: bool = Field(False, description="是否需要用户确认")
+    uncertainty_reason: str = Field("", description="若需要确认，简要说明原因；否则空字符串")
+    depends_on: Optional[List[int]] = Field(None, description="本步骤依赖的前置步骤编号；无依赖则为空数组 []")
+
+    @field_validator("expected_result", "uncertainty_reason", mode="before")
+    @classmethod
+    def _none_to_empty(cls, value: Any) -> Any:
+        return "" if value is None else value
+
+    @field_validator("depends_on", mode="before")
+    @classmethod
+    def _scalar_to_list(cls, value: Any) -> Any:
+        # a single dependency written as a bare number
+        return [value] if isinstance(value, (int, str)) and not isinstance(value, bool) else value
+
+
+class ExecutionPlan(BaseModel):
+    """ Task analysis and the executable step plan. """
+
+    task_analysis: str = Field("", description="任务的简要分析（最多 200 字）")
+    execution_plans: List[ExecutionPlanStep] = Field(..., min_length=1, description="至少包含 1 个步骤")
+
+
 class PlanExecutorState(BaseState):
     """ A graph structure to represent the execution plan of tasks. """
 
@@ -15,8 +61,14 @@ class PlanExecutorState(BaseState):
     # task analysis
     task_analysis: str
     # execution plan
-    execution_plans: List[Dict[str, Any]]
+    execution_plans: List[PlanStep]
     # current step
     current_step: int
-    # step result
-    step_results: List[Dict[str, Any]]
\ No newline at end of file
+    # step result, ordered by step number
+    step_results: List[Dict[str, Any]]
+    # whether the steps already ran while the plan was streamed
+    steps_executed: bool
+
+    # Request options
+    # whether the plan cache may be used for this request
+    use_plan_cache: bool
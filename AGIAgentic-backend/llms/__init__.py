@@ -1,31 +1,37 @@
 
 
-import pkgutil
-import inspect
+import importlib
 
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 from common.logger import logger
-from llms.providers import LLMProvider
+
+
+# Registered model providers, as "module.Class" so a provider module is imported only when collected.
+# A provider is registered under the name of its module, see `LLMProvider.name`.
+PROVIDERS: Tuple[str, ...] = (
+  "llms.providers.zhipu.ZhipuProvider",
+  "llms.providers.mock.MockProvider",
+  "llms.providers.router.RouterProvider",
+)
 
 
 def initialize_model_manager() -> Dict[str, Any]:
-  """ Auto collect and initialize all available models
+  """ Initialize every registered model provider
   Returns:
-      List[Any]: A list of initialized model instances.
+      Dict[str, Any]: The provider instances by name.
   """
 
   provider_models: Dict[str, Any] = dict()
 
-  _package = f"{__package__}.providers" or "llms.providers"
-  _path = f"{__path__[0]}/providers"  # type: ignore
-  logger.info(f"Collecting model providers from package: {_package}, path: {_path}")
-  for _, module_name, _ in pkgutil.iter_modules([_path]):
-      logger.debug(f"Importing module: {_package}.{module_name}")
-      module = __import__(f"{_package}.{module_name}", fromlist=[''])
-      for _, obj in inspect.getmembers(module):
-          if inspect.isclass(obj) and issubclass(obj, LLMProvider) and obj is not LLMProvider:
-              provider_instance = obj()
-              provider_models[module_name] = provider_instance
-              logger.info(f"Collected model provider: {module_name} with instance: {provider_instance}")
-  return provider_models
\ No newline at end of file
+  for path in PROVIDERS:
+      module_name, _, class_name = path.rpartition(".")
+      logger.debug(f"Importing module: {module_name}")
+      provider_instance = getattr(importlib.import_module(module_name), class_name)()
+      if provider_instance.name in provider_models:
+          raise ValueError(f"Model provider '{provider_instance.name}' is registered twice")
+      provider_models[provider_instance.name] = provider_instance
+      logger.info(f"Collected model provider: {provider_instance.name} with instance: {provider_instance}")
+  for provider_instance in provider_models.values():
+      provider_instance.bind_providers(provider_models)
+  return provider_models
@@ -0,0 +1,288 @@
+
+
+import time
+import asyncio
+
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from common.logger import logger
+from conf.config import config_manager
+from utils.stats_util import latency_summary, percentile
+
+
+T = TypeVar("T")
+
+# Number of recent latencies kept per name for the percentiles
+_LATENCY_SAMPLES = 1024
+
+# Queued by a hedged stream after its last chunk
+_STREAM_END = object()
+
+
+def node_timeout(node: str) -> Optional[float]:
+  """ Deadline of the LLM work of a plan node
+  Args:
+      node (str): "analyze_and_plan", "execute_step" or "summary_response".
+  Returns:
+      Optional[float]: Seconds from `AGENT_NODE_TIMEOUTS`, then `AGENT_TIMEOUT`; None when disabled.
+  """
+  agent_config = config_manager.agent_config
+  timeout = agent_config.NODE_TIMEOUTS.get(node, agent_config.TIMEOUT)
+  return timeout if timeout > 0 else None
+
+
+@asynccontextmanager
+async def deadline(node: str) -> AsyncIterator[None]:
+  """ Apply the deadline of a node to the LLM work inside the block
+  Args:
+      node (str): The node, see `node_timeout`.
+  Raises:
+      TimeoutError: Naming the node and its deadline, once the deadline passed.
+  """
+  timeout = node_timeout(node)
+  try:
+    async with asyncio.timeout(timeout):
+      yield
+  except TimeoutError:
+    latency_tracker.record_timeout(node)
+    raise TimeoutError(f"'{node}' did not finish within its {timeout:g}s deadline") from None
+
+
+class LatencyTracker:
+  """ Recent latencies and deadline misses of plan nodes and LLM calls, by name """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize LatencyTracker """
+    if getattr(self, "_initialized", False):
+      return
+    self._latencies: Dict[str, Deque[float]] = {}
+    self._counts: Dict[str, int] = {}
+    self._timeouts: Dict[str, int] = {}
+    self._initialized = True
+
+  def record(self, name: str, seconds: float) -> None:
+    """ Record one latency
+    Args:
+        name (str): The node or LLM call.
+        seconds (float): The latency in seconds.
+    """
+    self._latencies.setdefault(name, deque(maxlen=_LATENCY_SAMPLES)).append(seconds)
+    self._counts[name] = self._counts.get(name, 0) + 1
+
+  def record_timeout(self, name: str) -> None:
+    """ Record a missed deadline """
+    self._timeouts[name] = self._timeouts.get(name, 0) + 1
+
+  def samples(self, name: str) -> int:
+    return len(self._latencies.get(name, ()))
+
+  def percentile(self, name: str, q: float) -> float:
+    """ Percentile of the recent latencies of a name, in seconds """
+    return percentile(sorted(self._latencies.get(name, ())), q)
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get count, deadline misses and latency percentiles in milliseconds, by name """
+    return {
+      name: {
+        "count": self._counts.get(name, 0),
+        "timeouts": self._timeouts.get(name, 0),
+        "latency_ms": latency_summary(self._latencies.get(name, ())),
+      }
+      for name in sorted(set(self._latencies) | set(self._timeouts))
+    }
+
+
+class LLMHedger:
+  """ Hedged LLM calls
+  With `AGENT_HEDGING_ENABLED`, a call that has not answered (or, for a stream, sent its first
+  chunk) after the `AGENT_HEDGE_PERCENTILE` latency of its recent calls is sent a second time
+  and the first answer wins, the other call is cancelled. At most `AGENT_HEDGE_BUDGET` of the
+  calls may be hedged, so a slow provider is not sent twice the load. A hedged stream is read
+  in a task of its own and its chunks reach the caller through a queue.
+  """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize LLMHedger """
+    if getattr(self, "_initialized", False):
+      return
+    self._calls = 0
+    self._hedges = 0
+    self._hedge_wins = 0
+    self._over_budget = 0
+    self._initialized = True
+
+  def _hedge_delay(self, name: str) -> Optional[float]:
+    """ Seconds after which a call is hedged, None when it is not """
+    agent_config = config_manager.agent_config
+    if not agent_config.HEDGING_ENABLED or latency_tracker.samples(name) < agent_config.HEDGE_MIN_SAMPLES:
+      return None
+    return max(agent_config.HEDGE_MIN_DELAY, latency_tracker.percentile(name, agent_config.HEDGE_PERCENTILE))
+
+  def _take_hedge(self, name: str, delay: float) -> bool:
+    """ Whether the hedge budget allows one more hedge """
+    if self._hedges + 1 > config_manager.agent_config.HEDGE_BUDGET * self._calls:
+      self._over_budget += 1
+      return False
+    self._hedges += 1
+    logger.debug(f"Hedging '{name}' after {delay:.2f}s")
+    return True
+
+  async def _race(self, name: str, delay: float, attempt: Callable[[], Awaitable[T]], tasks: List["asyncio.Task[T]"]) -> int:
+    """ Run an attempt, and a second one when the first has not finished after `delay`
+    Args:
+        name (str): The call name.
+        delay (float): Seconds after which the call is hedged.
+        attempt (Callable[[], Awaitable[T]]): Starts one attempt.
+        tasks (List[asyncio.Task[T]]): Receives the attempts, the caller cancels them when done.
+    Returns:
+        int: The index of the first successful attempt.
+    Raises:
+        Exception: The error of the first attempt when every attempt failed.
+    """
+    tasks.append(asyncio.ensure_future(attempt()))
+    starts = [time.monotonic()]
+    done, _ = await asyncio.wait(tasks, timeout=delay)
+    if not done and self._take_hedge(name, delay):
+      tasks.append(asyncio.ensure_future(attempt()))
+      starts.append(time.monotonic())
+    pending = set(tasks)
+    while pending:
+      done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+      for index, task in enumerate(tasks):
+        if task in done and task.exception() is None:
+          latency_tracker.record(name, time.monotonic() - starts[index])
+          self._hedge_wins += int(index > 0)
+          return index
+    raise tasks[0].exception() # type: ignore
+
+  async def invoke(self, name: str, call: Callable[[], Awaitable[T]]) -> T:
+    """ Await an LLM call, hedged when it is slow
+    Args:
+        name (str): The call name, its latencies decide when to hedge.
+        call (Callable[[], Awaitable[T]]): Starts the call, e.g. `lambda: llm.ainvoke(messages)`.
+    Returns:
+        T: The first successful answer.
+    """
+    self._calls += 1
+    delay = self._hedge_delay(name)
+    if delay is None:
+      start = time.monotonic()
+      result = await call()
+      latency_tracker.record(name, time.monotonic() - start)
+      return result
+
+    tasks: List["asyncio.Task[T]"] = []
+    try:
+      index = await self._race(name, delay, call, tasks)
+      return tasks[index].result()
+    finally:
+      for task in tasks:
+        task.cancel()
+
+  async def stream(self, name: str, call: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+    """ Iterate an LLM stream, hedged when its first chunk is slow
+    Args:
+        name (str): The call name, its time to first chunk decides when to hedge.
+        call (Callable[[], AsyncIterator[T]]): Starts the stream, e.g. `lambda: llm.astream(messages)`.
+    Yields:
+        T: The chunks of the stream that sent its first chunk first.
+    """
+    self._calls += 1
+    delay = self._hedge_delay(name)
+    if delay is None:
+      # nothing to race, the stream is read in the calling task
+      start: Optional[float] = time.monotonic()
+      async for chunk in call():
+        if start is not None:
+          latency_tracker.record(name, time.monotonic() - start)
+          start = None
+        yield chunk
+      return
+
+    queues: List["asyncio.Queue[Any]"] = []
+    pumps: List["asyncio.Task[None]"] = []
+
+    async def _first_chunk() -> Any:
+      # the whole stream is read in its own task, callbacks and context variables stay in one task
+      queue: "asyncio.Queue[Any]" = asyncio.Queue()
+      queues.append(queue)
+      pumps.append(asyncio.ensure_future(self._pump(call, queue)))
+      return await self._next_chunk(queue)
+
+    tasks: List["asyncio.Task[Any]"] = []
+    try:
+      index = await self._race(name, delay, _first_chunk, tasks)
+      for other, pump in enumerate(pumps):
+        if other != index:
+          pump.cancel()
+      chunk = tasks[index].result()
+      while chunk is not _STREAM_END:
+        yield chunk
+        chunk = await self._next_chunk(queues[index])
+    finally:
+      for task in tasks + pumps:
+        task.cancel()
+      await asyncio.gather(*tasks, *pumps, return_exceptions=True)
+
+  @staticmethod
+  async def _pump(call: Callable[[], AsyncIterator[Any]], queue: "asyncio.Queue[Any]") -> None:
+    """ Read a stream to its end into a queue, followed by `_STREAM_END` or the error that ended it """
+    stream = call()
+    try:
+      async for chunk in stream:
+        queue.put_nowait(chunk)
+      queue.put_nowait(_STREAM_END)
+    except Exception as e:
+      queue.put_nowait(e)
+    finally:
+      aclose = getattr(stream, "aclose", None)
+      if aclose is not None:
+        await aclose()
+
+  @staticmethod
+  async def _next_chunk(queue: "asyncio.Queue[Any]") -> Any:
+    """ The next chunk of a pumped stream, `_STREAM_END` after the last one
+    Raises:
+        Exception: The error that ended the stream.
+    """
+    chunk = await queue.get()
+    if isinstance(chunk, Exception):
+      raise chunk
+    return chunk
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get hedging statistics """
+    agent_config = config_manager.agent_config
+    return {
+      "enabled": agent_config.HEDGING_ENABLED,
+      "percentile": agent_config.HEDGE_PERCENTILE,
+      "budget": agent_config.HEDGE_BUDGET,
+      "calls": self._calls,
+      "hedges": self._hedges,
+      "hedge_wins": self._hedge_wins,
+      "over_budget": self._over_budget,
+      "hedge_rate": round(self._hedges / self._calls, 4) if self._calls else 0.0,
+    }
+
+
+# Global latency tracker instance
+latency_tracker = LatencyTracker()
+
+# Global LLM hedger instance
+llm_hedger = LLMHedger()
@@ -0,0 +1,369 @@
+
+
+import re
+import json
+import time
+import httpx
+import asyncio
+
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from common.logger import logger
+from conf.config import config_manager
+from utils.stats_util import percentile
+
+
+# Rough request size of one token, the limiter only needs an estimate
+_BYTES_PER_TOKEN = 3
+
+# Number of recent queue waits kept for the wait-time percentiles
+_WAIT_SAMPLES = 1024
+
+# Response bytes kept to find the `usage` object, which OpenAI-compatible APIs send last
+_USAGE_TAIL_BYTES = 4096
+_USAGE = re.compile(rb'"usage"\s*:\s*(\{[^{}]*\})')
+
+
+class _TokenBucket:
+  """ Token bucket refilled continuously up to a per-minute capacity, 0 means unlimited """
+
+  def __init__(self, per_minute: float) -> None:
+    self.capacity = max(0.0, per_minute)
+    self.level = self.capacity
+    self._updated = time.monotonic()
+
+  def _refill(self, now: float) -> None:
+    self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+    self._updated = now
+
+  def wait_time(self, amount: float, now: float) -> float:
+    """ Seconds until `amount` can be taken, requests larger than the bucket wait for a full bucket """
+    if not self.capacity:
+      return 0.0
+    self._refill(now)
+    missing = min(amount, self.capacity) - self.level
+    return max(0.0, missing * 60.0 / self.capacity)
+
+  def take(self, amount: float) -> None:
+    if self.capacity:
+      self.level -= amount
+
+  def give_back(self, amount: float) -> None:
+    """ Return tokens taken in excess, a negative amount takes more """
+    if self.capacity:
+      self.level = min(self.capacity, self.level + amount)
+
+
+class ModelLimiter:
+  """ Concurrency and rate limiter of one model
+  Callers queue in arrival order and the head of the queue is admitted once a concurrency slot is
+  free, both token buckets (requests and tokens per minute) allow it and no Retry-After pause is
+  pending. A large request is never overtaken by smaller ones behind it.
+  """
+
+  def __init__(self, name: str, max_in_flight: int, rpm: float, tpm: float) -> None:
+    """ Initialize the limiter
+    Args:
+        name (str): "provider/model".
+        max_in_flight (int): Maximum concurrent requests, 0 means unlimited.
+        rpm (float): Requests per minute, 0 means unlimited.
+        tpm (float): Tokens per minute, 0 means unlimited.
+    """
+    self.name = name
+    self.max_in_flight = max(0, int(max_in_flight))
+    self._requests = _TokenBucket(rpm)
+    self._tokens = _TokenBucket(tpm)
+    self._waiters: Deque[Tuple["asyncio.Future[None]", int]] = deque()
+    self._timer: Optional[asyncio.TimerHandle] = None
+    self._paused_until = 0.0
+    self._in_flight = 0
+    self._granted = 0
+    self._max_queue_depth = 0
+    self._rate_limited = 0
+    self._retries = 0
+    self._usage_reports = 0
+    self._estimate_error = 0.0
+    self._total_wait = 0.0
+    self._max_wait = 0.0
+    self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+  def _dispatch(self) -> None:
+    """ Admit queued callers in order for as long as the limits allow """
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    now = time.monotonic()
+    while self._waiters:
+      future, tokens = self._waiters[0]
+      if future.done():
+        # cancelled while queued
+        self._waiters.popleft()
+        continue
+      if self.max_in_flight and self._in_flight >= self.max_in_flight:
+        # a release dispatches again
+        return
+      wait = max(self._paused_until - now, self._requests.wait_time(1, now), self._tokens.wait_time(tokens, now))
+      if wait > 0:
+        self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+        return
+      self._waiters.popleft()
+      self._in_flight += 1
+      self._granted += 1
+      self._requests.take(1)
+      self._tokens.take(tokens)
+      future.set_result(None)
+
+  async def acquire(self, tokens: int) -> float:
+    """ Wait for the turn of a request
+    Args:
+        tokens (int): Estimated tokens of the request.
+    Returns:
+        float: Seconds spent in the queue.
+    """
+    start = time.monotonic()
+    future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+    self._waiters.append((future, tokens))
+    self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+    self._dispatch()
+    try:
+      await future
+    except asyncio.CancelledError:
+      if future.done() and not future.cancelled():
+        # admitted right before the cancellation, give the slot back
+        self.release()
+      else:
+        self._dispatch()
+      raise
+    waited = time.monotonic() - start
+    self._total_wait += waited
+    self._max_wait = max(self._max_wait, waited)
+    self._waits.append(waited)
+    return waited
+
+  def release(self, retry: bool = False) -> None:
+    """ Free the concurrency slot of a finished request
+    Args:
+        retry (bool, optional): Whether the request queues again after a 429. Defaults to False.
+    """
+    self._in_flight = max(0, self._in_flight - 1)
+    self._retries += int(retry)
+    self._dispatch()
+
+  def settle(self, estimated: int, used: int) -> None:
+    """ Correct the tokens per minute bucket with the usage reported by the provider
+    Args:
+        estimated (int): Tokens taken for the request when it was admitted.
+        used (int): Tokens the provider counted, 0 for a request it rejected.
+    """
+    if used:
+      self._usage_reports += 1
+      self._estimate_error += estimated - used
+    self._tokens.give_back(estimated - used)
+    self._dispatch()
+
+  def pause(self, seconds: float) -> None:
+    """ Hold every queued request for `seconds`, as asked by a 429 Retry-After """
+    self._rate_limited += 1
+    self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+    logger.warning(f"Rate limited by '{self.name}', pausing requests for {seconds:.2f}s")
+    self._dispatch()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get limiter statistics, waits are in milliseconds """
+    waits = sorted(self._waits)
+    return {
+      "limits": {
+        "max_in_flight": self.max_in_flight,
+        "rpm": self._requests.capacity,
+        "tpm": self._tokens.capacity,
+      },
+      "in_flight": self._in_flight,
+      "queue_depth": len([1 for future, _ in self._waiters if not future.done()]),
+      "max_queue_depth": self._max_queue_depth,
+      "granted": self._granted,
+      "rate_limited": self._rate_limited,
+      "retries": self._retries,
+      "usage_reports": self._usage_reports,
+      "overestimated_tokens": round(self._estimate_error),
+      "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+      "wait_ms": {
+        "avg": round(self._total_wait / self._granted * 1000, 2) if self._granted else 0.0,
+        "p50": round(percentile(waits, 0.5) * 1000, 2),
+        "p95": round(percentile(waits, 0.95) * 1000, 2),
+        "max": round(self._max_wait * 1000, 2),
+      },
+    }
+
+
+class ProviderLimiter:
+  """ Model limiters of one provider, created on first use from the model settings
+  Limits resolve from `MODEL_LIMIT_*`, then `MODEL_LIMITS["<provider>"]`, then
+  `MODEL_LIMITS["<provider>/<model>"]`; every model gets its own limiter.
+  """
+
+  def __init__(self, provider_name: str) -> None:
+    self.provider_name = provider_name
+    self._models: Dict[str, ModelLimiter] = {}
+
+  def for_model(self, model_name: str) -> ModelLimiter:
+    """ Get the limiter of a model
+    Args:
+        model_name (str): The model name sent to the provider.
+    Returns:
+        ModelLimiter: The model limiter.
+    """
+    limiter = self._models.get(model_name)
+    if limiter is None:
+      model_config = config_manager.model_config
+      limits: Dict[str, float] = {
+        "max_in_flight": model_config.LIMIT_MAX_IN_FLIGHT,
+        "rpm": model_config.LIMIT_RPM,
+        "tpm": model_config.LIMIT_TPM,
+      }
+      limits.update(model_config.LIMITS.get(self.provider_name, {}))
+      limits.update(model_config.LIMITS.get(f"{self.provider_name}/{model_name}", {}))
+      limiter = ModelLimiter(
+        f"{self.provider_name}/{model_name}",
+        max_in_flight=int(limits["max_in_flight"]),
+        rpm=limits["rpm"],
+        tpm=limits["tpm"]
+      )
+      self._models[model_name] = limiter
+    return limiter
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get the statistics of every model limiter """
+    return {model_name: limiter.stats() for model_name, limiter in self._models.items()}
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+  """ Read the delay a provider asked for
+  Args:
+      headers (httpx.Headers): Response headers.
+  Returns:
+      Optional[float]: Seconds from `retry-after-ms` or `retry-after` (seconds or HTTP date), None when absent.
+  """
+  try:
+    if "retry-after-ms" in headers:
+      return max(0.0, float(headers["retry-after-ms"]) / 1000)
+    value = headers.get("retry-after")
+    if value is None:
+      return None
+    if value.strip().replace(".", "", 1).isdigit():
+      return float(value)
+    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+  except (TypeError, ValueError):
+    return None
+
+
+def _estimate_tokens(request: httpx.Request) -> Tuple[Optional[str], int]:
+  """ Model name and estimated tokens of an OpenAI-compatible request: body size plus `max_tokens` """
+  try:
+    payload = json.loads(request.content)
+  except (ValueError, UnicodeDecodeError, httpx.RequestNotRead):
+    return None, 0
+  if not isinstance(payload, dict) or not payload.get("model"):
+    return None, 0
+  completion_tokens = payload.get("max_tokens") or payload.get("max_completion_tokens") or 0
+  return str(payload["model"]), len(request.content) // _BYTES_PER_TOKEN + int(completion_tokens)
+
+
+def reported_tokens(tail: bytes) -> int:
+  """ Tokens counted by the provider, from the last `usage` object of a JSON or SSE response
+  Args:
+      tail (bytes): The end of the response body.
+  Returns:
+      int: `total_tokens`, or prompt plus completion tokens, 0 when the response reports no usage.
+  """
+  for match in reversed(list(_USAGE.finditer(tail))):
+    try:
+      usage = json.loads(match.group(1))
+    except ValueError:
+      continue
+    if isinstance(usage, dict):
+      total = usage.get("total_tokens") or (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+      if isinstance(total, int) and total > 0:
+        return total
+  return 0
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+  """ Response stream that frees the limiter slot when the response is closed
+  The end of the body is kept to settle the tokens taken for the request with its reported usage.
+  """
+
+  def __init__(self, stream: httpx.AsyncByteStream, limiter: ModelLimiter, tokens: int) -> None:
+    self._stream = stream
+    self._limiter: Optional[ModelLimiter] = limiter
+    self._tokens = tokens
+    self._tail = b""
+
+  async def __aiter__(self) -> Any:
+    async for chunk in self._stream:
+      self._tail = (self._tail + chunk)[-_USAGE_TAIL_BYTES:]
+      yield chunk
+
+  async def aclose(self) -> None:
+    try:
+      await self._stream.aclose()
+    finally:
+      if self._limiter is not None:
+        used = reported_tokens(self._tail)
+        if used:
+          self._limiter.settle(self._tokens, used)
+        self._limiter.release()
+        self._limiter = None
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+  """ HTTP transport that sends model requests through the provider limiter
+  A request holds its concurrency slot until the response, streamed or not, is closed. Its tokens are
+  estimated when it queues and settled with the `usage` of the response. A 429 pauses the model
+  limiter for the Retry-After delay and the request queues again, up to `MODEL_RATE_LIMIT_RETRIES`
+  times, so the model clients are created without SDK retries.
+  """
+
+  def __init__(self, transport: httpx.AsyncBaseTransport, limiter: ProviderLimiter) -> None:
+    self.transport = transport
+    self.limiter = limiter
+
+  async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+    model_name, tokens = _estimate_tokens(request)
+    if model_name is None:
+      return await self.transport.handle_async_request(request)
+    model_limiter = self.limiter.for_model(model_name)
+    model_config = config_manager.model_config
+    retries = max(0, model_config.RATE_LIMIT_RETRIES)
+
+    for attempt in range(retries + 1):
+      await model_limiter.acquire(tokens)
+      try:
+        response = await self.transport.handle_async_request(request)
+      except BaseException:
+        model_limiter.release()
+        raise
+      if response.status_code != 429:
+        break
+      delay = parse_retry_after(response.headers)
+      if delay is None:
+        delay = model_config.RATE_LIMIT_BACKOFF * 2 ** attempt
+      model_limiter.pause(min(delay, model_config.RETRY_AFTER_MAX))
+      if attempt == retries:
+        break
+      await response.aclose()
+      # a rejected request did not use the tokens taken for it
+      model_limiter.settle(tokens, 0)
+      model_limiter.release(retry=True)
+
+    return httpx.Response(
+      status_code=response.status_code,
+      headers=response.headers,
+      stream=_ReleasingStream(response.stream, model_limiter, tokens), # type: ignore
+      extensions=response.extensions,
+      request=request
+    )
+
+  async def aclose(self) -> None:
+    await self.transport.aclose()
@@ -1,16 +1,42 @@
 
 
-from typing import Union
+import httpx
+import threading
+
+from collections import OrderedDict
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+from conf.config import config_manager
+from llms.limiter import ProviderLimiter, RateLimitedTransport
+
 
 class LLMProvider(ABC):
   """ Abstract base class for LLM providers.
+  Model clients are cached per provider and share one size-bounded keep-alive connection pool.
+  Async requests go through the provider limiter, see `llms.limiter`, synchronous ones are not limited.
   """
 
+  def __init__(self) -> None:
+    self._clients: "OrderedDict[Hashable, Any]" = OrderedDict()
+    self._clients_lock = threading.Lock()
+    self._http_client: Optional[httpx.Client] = None
+    self._http_async_client: Optional[httpx.AsyncClient] = None
+    self._client_hits = 0
+    self._client_misses = 0
+    self._http_requests = 0
+    self.limiter = ProviderLimiter(self.name)
+
+  @property
+  def name(self) -> str:
+    """ Provider name, the name of its module, see `llms.PROVIDERS` """
+    return type(self).__module__.rsplit(".", 1)[-1]
+
   @abstractmethod
-  def get_llm(self, model_name: str, model_type: str = "chat") -> Union[ChatOpenAI, OpenAIEmbeddings]:
+  def get_llm(self, model_name: str, model_type: str = "chat", **kwargs: Any) -> Union[BaseChatModel, Embeddings]:
     """Retrieve an LLM instance by model name.
     """
     match model_type:
@@ -21,6 +47,124 @@ class LLMProvider(ABC):
         case _:
             return ChatOpenAI()
 
+  def get_role_llm(self, role: str, model_name: str, model_type: str = "chat") -> Union[BaseChatModel, Embeddings]:
+    """ Retrieve the LLM of a role of the LLM service
+    Args:
+        role (str): "simple", "reason", "code" or "embedding".
+        model_name (str): The model configured for the role.
+        model_type (str, optional): "chat" or "embedding". Defaults to "chat".
+    Returns:
+        Union[BaseChatModel, Embeddings]: The model, `get_llm(model_name)` unless the provider routes by role.
+    """
+    return self.get_llm(model_name, model_type=model_type)
+
+  def bind_providers(self, providers: Dict[str, "LLMProvider"]) -> None:
+    """ Receive every collected provider, once `initialize_model_manager` collected them all
+    Args:
+        providers (Dict[str, LLMProvider]): The providers by name, this one included.
+    """
+
+  def _get_or_create_client(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+    """ Get a cached model client or create it with `factory`
+    Args:
+        key (Hashable): Cache key, usually (model name, model type, parameters).
+        factory (Callable[[], Any]): Builds the client on a cache miss.
+    Returns:
+        Any: The cached model client.
+    """
+    with self._clients_lock:
+      client = self._clients.get(key)
+      if client is not None:
+        self._clients.move_to_end(key)
+        self._client_hits += 1
+        return client
+      self._client_misses += 1
+      client = factory()
+      self._clients[key] = client
+      # Evict the least recently used client beyond the configured size
+      while len(self._clients) > config_manager.model_config.CLIENT_CACHE_SIZE:
+        self._clients.popitem(last=False)
+      return client
+
+  def _http_limits(self) -> Tuple[httpx.Limits, httpx.Timeout]:
+    """ Build the connection pool limits and timeout from the model settings """
+    model_config = config_manager.model_config
+    limits = httpx.Limits(
+      max_connections=model_config.HTTP_MAX_CONNECTIONS,
+      max_keepalive_connections=model_config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+      keepalive_expiry=model_config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    return limits, httpx.Timeout(model_config.HTTP_TIMEOUT)
+
+  def _count_request(self, request: httpx.Request) -> None:
+    self._http_requests += 1
+
+  async def _acount_request(self, request: httpx.Request) -> None:
+    self._http_requests += 1
+
+  @property
+  def http_client(self) -> httpx.Client:
+    """ Shared synchronous HTTP client of this provider """
+    if self._http_client is None:
+      limits, timeout = self._http_limits()
+      self._http_client = httpx.Client(limits=limits, timeout=timeout, event_hooks={"request": [self._count_request]})
+    return self._http_client
+
+  @property
+  def http_async_client(self) -> httpx.AsyncClient:
+    """ Shared asynchronous HTTP client of this provider """
+    if self._http_async_client is None:
+      limits, timeout = self._http_limits()
+      transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits)
+      if config_manager.model_config.LIMITER_ENABLED:
+        transport = RateLimitedTransport(transport, self.limiter)
+      self._http_async_client = httpx.AsyncClient(transport=transport, timeout=timeout, event_hooks={"request": [self._acount_request]})
+    return self._http_async_client
+
+  def pool_stats(self) -> Dict[str, Any]:
+    """ Get client cache and connection pool statistics
+    Returns:
+        Dict[str, Any]: Cached clients, cache hits/misses, pool limits and open connections.
+    """
+    model_config = config_manager.model_config
+
+    def _connections(client: Union[httpx.Client, httpx.AsyncClient, None]) -> Dict[str, int]:
+      # httpcore does not expose pool stats publicly, read them defensively
+      transport = getattr(client, "_transport", None)
+      pool = getattr(getattr(transport, "transport", transport), "_pool", None)
+      connections = list(getattr(pool, "connections", []) or [])
+      idle = len([c for c in connections if getattr(c, "is_idle", lambda: False)()])
+      return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    return {
+      "cached_clients": len(self._clients),
+      "client_cache_size": model_config.CLIENT_CACHE_SIZE,
+      "client_hits": self._client_hits,
+      "client_misses": self._client_misses,
+      "http_requests": self._http_requests,
+      "limits": {
+        "max_connections": model_config.HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": model_config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry": model_config.HTTP_KEEPALIVE_EXPIRY,
+      },
+      "sync_pool": _connections(self._http_client),
+      "async_pool": _connections(self._http_async_client),
+    }
 
+  def limiter_stats(self) -> Dict[str, Any]:
+    """ Get the queue depth, wait times and rate limit counters of every model of this provider """
+    return {
+      "enabled": config_manager.model_config.LIMITER_ENABLED,
+      "models": self.limiter.stats(),
+    }
 
-    
+  async def aclose(self) -> None:
+    """ Close the shared HTTP clients and drop cached model clients """
+    with self._clients_lock:
+      self._clients.clear()
+    if self._http_async_client is not None:
+      await self._http_async_client.aclose()
+      self._http_async_client = None
+    if self._http_client is not None:
+      self._http_client.close()
+      self._http_client = None
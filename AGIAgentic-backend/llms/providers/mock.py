@@ -0,0 +1,448 @@
+
+
+import re
+import json
+import time
+import httpx
+import random
+import asyncio
+import hashlib
+import openai
+
+import numpy as np
+
+from collections import OrderedDict
+from pydantic import PrivateAttr
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+from langchain_core.embeddings import Embeddings
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from common.logger import logger
+from llms.providers import LLMProvider
+from conf.config import config_manager
+
+
+# Characters per streamed chunk, about one token
+_CHUNK_SIZE = 4
+
+# Rough size of one token, as estimated by the request limiter
+_BYTES_PER_TOKEN = 3
+
+# Conversations whose call count is kept, so a retried call draws new latency and errors
+_ATTEMPT_ENTRIES = 4096
+
+# Name of the plan tool bound by the planner in the "function_calling" planning mode
+_PLAN_TOOL = "ExecutionPlan"
+
+# Rules used without `MODEL_MOCK_SCRIPT_PATH`, they answer the prompts of the plan graph
+DEFAULT_MOCK_RULES: List[Dict[str, Any]] = [
+  {
+    "name": "planning",
+    "match": r"任务规划助手[\s\S]*?任务描述: (?P<task>[\s\S]*?)，输出一个结构化",
+    "kind": "plan",
+  },
+  {
+    "name": "step",
+    "match": r"智能执行器[\s\S]*?任务目标：(?P<description>[\s\S]*?)。",
+    "kind": "react",
+    "template": "{description}：已完成。{tool_result}",
+  },
+  {
+    "name": "summary",
+    "match": r"智能总结助手[\s\S]*?原始任务：(?P<task>[^\n]*)",
+    "kind": "text",
+    "template": "任务「{task}」已按计划执行完成。各步骤依次完成了任务分析、信息获取与结果整理，"
+                "关键结果已在步骤输出中给出，整体流程没有出现需要人工介入的异常。以上为本地模拟模型生成的总结。",
+  },
+  {
+    "name": "default",
+    "match": "",
+    "kind": "text",
+    "template": "[{model}] 这是本地模拟模型的回复。",
+  },
+]
+
+
+class MockLLMError(RuntimeError):
+  """ Error injected by the mock provider """
+
+
+class _SafeFields(dict):
+  """ Template fields, a missing field is left empty """
+
+  def __missing__(self, key: str) -> str:
+    return ""
+
+
+def _call_rng(attempts: "OrderedDict[str, int]", name: str, payload: str) -> random.Random:
+  """ Random source of a call, from `MODEL_MOCK_SEED`, the model, the payload and how often it was sent
+  Args:
+      attempts (OrderedDict[str, int]): Call counts of the recent payloads of the model.
+      name (str): The model name.
+      payload (str): The conversation or the texts to embed.
+  Returns:
+      random.Random: The random source, the same for the same call of a replayed run.
+  """
+  key = hashlib.sha256(f"{name}\x00{payload}".encode("utf-8")).hexdigest()
+  attempt = attempts.pop(key, 0)
+  attempts[key] = attempt + 1
+  while len(attempts) > _ATTEMPT_ENTRIES:
+    attempts.popitem(last=False)
+  return random.Random(f"{config_manager.model_config.MOCK_SEED}:{key}:{attempt}")
+
+
+def _estimate_tokens(text: str) -> int:
+  return max(1, len(text.encode("utf-8")) // _BYTES_PER_TOKEN)
+
+
+def load_mock_rules(path: str) -> List[Dict[str, Any]]:
+  """ Load the response rules of the mock provider
+  A script is a JSON file {"rules": [...]}, each rule has:
+      match (str): regular expression searched in the conversation, its named groups are template fields.
+      kind (str): "text" answers the template, "plan" an execution plan, "react" a tool call and then the template.
+      template (str, optional): the answer, with the fields, `{model}` and `{tool_result}` (react).
+      latency (float, optional): mean latency of the rule, overriding `MODEL_MOCK_LATENCY`.
+      steps, shape (optional): size and dependency shape of a plan, overriding `MODEL_MOCK_PLAN_*`.
+  The first matching rule answers.
+  Args:
+      path (str): The script file, empty for the default rules.
+  Returns:
+      List[Dict[str, Any]]: The rules.
+  """
+  if not path:
+    return DEFAULT_MOCK_RULES
+  with open(path, "r", encoding="utf-8") as f:
+    rules = json.load(f)["rules"]
+  logger.info(f"Loaded {len(rules)} mock response rules from '{path}'")
+  return rules
+
+
+def sample_latency(rng: random.Random, mean: float) -> float:
+  """ Draw a latency from `MODEL_MOCK_LATENCY_DISTRIBUTION`
+  Args:
+      rng (random.Random): The random source of the call.
+      mean (float): Mean latency in seconds.
+  Returns:
+      float: The latency in seconds, never negative.
+  """
+  model_config = config_manager.model_config
+  spread = model_config.MOCK_LATENCY_SPREAD
+  match model_config.MOCK_LATENCY_DISTRIBUTION:
+    case "uniform":
+      latency = rng.uniform(mean - spread, mean + spread)
+    case "normal":
+      latency = rng.gauss(mean, spread)
+    case "lognormal":
+      # the mean stays `mean`, `spread` is the sigma of the underlying normal distribution
+      latency = mean * rng.lognormvariate(-spread * spread / 2, spread)
+    case "exponential":
+      latency = rng.expovariate(1 / mean) if mean > 0 else 0.0
+    case _:
+      latency = mean
+  return max(0.0, latency)
+
+
+def _injected_error(kind: str, model_name: str) -> Exception:
+  request = httpx.Request("POST", f"mock://{model_name}/chat/completions")
+  match kind:
+    case "rate_limit":
+      response = httpx.Response(429, request=request, headers={"retry-after": "1"})
+      return openai.RateLimitError(f"Injected rate limit of mock model '{model_name}'", response=response, body=None)
+    case "timeout":
+      return openai.APITimeoutError(request=request)
+    case _:
+      return MockLLMError(f"Injected error of mock model '{model_name}'")
+
+
+class _Call:
+  """ The scripted outcome of one mock call """
+
+  def __init__(self, message: AIMessage, latency: float, chunk_delay: float, error: Optional[str]) -> None:
+    self.message = message
+    self.latency = latency
+    self.chunk_delay = chunk_delay
+    self.error = error
+
+  def chunks(self) -> List[AIMessageChunk]:
+    """ The message as stream chunks, tool call arguments are streamed as text fragments """
+    chunks: List[AIMessageChunk] = []
+    text = str(self.message.content)
+    for start in range(0, len(text), _CHUNK_SIZE):
+      chunks.append(AIMessageChunk(content=text[start:start + _CHUNK_SIZE]))
+    for index, tool_call in enumerate(self.message.tool_calls):
+      args = json.dumps(tool_call["args"], ensure_ascii=False)
+      chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+        {"name": tool_call["name"], "args": "", "id": tool_call["id"], "index": index}
+      ]))
+      for start in range(0, len(args), _CHUNK_SIZE):
+        chunks.append(AIMessageChunk(content="", tool_call_chunks=[
+          {"name": None, "args": args[start:start + _CHUNK_SIZE], "id": None, "index": index}
+        ]))
+    if not chunks:
+      chunks.append(AIMessageChunk(content=""))
+    chunks[-1].usage_metadata = self.message.usage_metadata
+    return chunks
+
+  @property
+  def generation_time(self) -> float:
+    return self.latency + self.chunk_delay * max(0, len(self.chunks()) - 1)
+
+
+class MockChatModel(BaseChatModel):
+  """ Deterministic local chat model
+  Answers are scripted by rules (see `load_mock_rules`): execution plans for the planner, a tool
+  call and then an answer for ReAct steps, and templated text for summaries and anything else.
+  Latency, streaming speed and injected errors follow the `MODEL_MOCK_*` settings, drawn from a
+  random source seeded by `MODEL_MOCK_SEED`, the conversation and how often it was sent, so a run
+  replays identically whatever the concurrency.
+  """
+
+  model_name: str
+  rules: List[Dict[str, Any]]
+  latency: float = 0.0
+  error_rate: float = 0.0
+
+  _attempts: "OrderedDict[str, int]" = PrivateAttr(default_factory=OrderedDict)
+
+  @property
+  def _llm_type(self) -> str:
+    return "mock"
+
+  @property
+  def _identifying_params(self) -> Dict[str, Any]:
+    return {"model_name": self.model_name}
+
+  def bind_tools(self, tools: Any, **kwargs: Any) -> Any:
+    """ Bind tools in the OpenAI format, the mock calls them in ReAct steps """
+    return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+  def _match(self, conversation: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    for rule in self.rules:
+      found = re.search(rule.get("match", ""), conversation)
+      if found:
+        return rule, {name: (value or "").strip() for name, value in found.groupdict().items()}
+    return {"kind": "text", "template": "[{model}]"}, {}
+
+  def _plan(self, rule: Dict[str, Any], task: str) -> Dict[str, Any]:
+    """ An execution plan of `MODEL_MOCK_PLAN_STEPS` steps, "fan_in" runs every step but the last in parallel """
+    model_config = config_manager.model_config
+    steps = max(1, int(rule.get("steps", model_config.MOCK_PLAN_STEPS)))
+    shape = rule.get("shape", model_config.MOCK_PLAN_SHAPE)
+    plans = []
+    for step in range(1, steps + 1):
+      match shape:
+        case "chain":
+          depends_on = [step - 1] if step > 1 else []
+        case "fan_in":
+          depends_on = list(range(1, steps)) if step == steps and steps > 1 else []
+        case _:
+          depends_on = []
+      plans.append({
+        "step": step,
+        "description": f"模拟步骤 {step}：处理「{task}」的第 {step} 部分",
+        "expected_result": f"第 {step} 部分的处理结果",
+        "requires_confirmation": False,
+        "uncertainty_reason": "",
+        "depends_on": depends_on,
+      })
+    return {"task_analysis": f"本地模拟模型将任务「{task}」分解为 {steps} 个步骤。", "execution_plans": plans}
+
+  @staticmethod
+  def _tool_args(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """ Arguments for a tool call: the schema defaults, else placeholder values by type """
+    parameters = tool.get("function", {}).get("parameters", {})
+    placeholders = {"string": "mock", "integer": 1, "number": 1.0, "boolean": False, "array": [], "object": {}}
+    args = {}
+    for name, schema in (parameters.get("properties") or {}).items():
+      if "default" in schema:
+        args[name] = schema["default"]
+      elif schema.get("enum"):
+        args[name] = schema["enum"][0]
+      else:
+        args[name] = placeholders.get(schema.get("type", "string"), "mock")
+    return args
+
+  def _respond(self, messages: List[BaseMessage], kwargs: Dict[str, Any], rng: random.Random, rule: Dict[str, Any], fields: Dict[str, str]) -> AIMessage:
+    model_config = config_manager.model_config
+    tools = {tool.get("function", {}).get("name"): tool for tool in kwargs.get("tools") or []}
+    template_fields = _SafeFields(fields, model=self.model_name)
+    match rule.get("kind", "text"):
+      case "plan":
+        plan = self._plan(rule, fields.get("task", ""))
+        if _PLAN_TOOL in tools:
+          return AIMessage(content="", tool_calls=[{"name": _PLAN_TOOL, "args": plan, "id": f"call_{rng.getrandbits(48):012x}"}])
+        return AIMessage(content=json.dumps(plan, ensure_ascii=False))
+      case "react" if messages and isinstance(messages[-1], ToolMessage):
+        template_fields["tool_result"] = str(messages[-1].content)
+      case "react":
+        callable_tools = [name for name in tools if not model_config.MOCK_TOOLS or name in model_config.MOCK_TOOLS]
+        if callable_tools and rng.random() < model_config.MOCK_TOOL_CALL_RATE:
+          name = rng.choice(sorted(callable_tools))
+          return AIMessage(content="", tool_calls=[{"name": name, "args": self._tool_args(tools[name]), "id": f"call_{rng.getrandbits(48):012x}"}])
+    return AIMessage(content=rule.get("template", "[{model}]").format_map(template_fields))
+
+  def _script(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> _Call:
+    """ Decide the answer, latency and error of a call """
+    model_config = config_manager.model_config
+    conversation = "\n".join(str(message.content) for message in messages)
+    rng = _call_rng(self._attempts, self.model_name, conversation)
+    rule, fields = self._match(conversation)
+    message = self._respond(messages, kwargs, rng, rule, fields)
+    output = str(message.content) + "".join(json.dumps(call["args"], ensure_ascii=False) for call in message.tool_calls)
+    input_tokens, output_tokens = _estimate_tokens(conversation), _estimate_tokens(output)
+    message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+    latency = sample_latency(rng, float(rule.get("latency", self.latency)))
+    tokens_per_second = model_config.MOCK_TOKENS_PER_SECOND
+    error = None
+    if self.error_rate and rng.random() < self.error_rate:
+      error = rng.choice(model_config.MOCK_ERROR_KINDS or ["error"])
+    return _Call(message, latency, 1 / tokens_per_second if tokens_per_second > 0 else 0.0, error)
+
+  def _raise_before_answer(self, call: _Call) -> None:
+    if call.error is not None and call.error != "stream_cut":
+      raise _injected_error(call.error, self.model_name)
+
+  def _generate(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[CallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> ChatResult:
+    call = self._script(messages, kwargs)
+    time.sleep(call.latency)
+    self._raise_before_answer(call)
+    time.sleep(call.generation_time - call.latency)
+    if call.error is not None:
+      raise _injected_error("error", self.model_name)
+    return ChatResult(generations=[ChatGeneration(message=call.message)])
+
+  async def _agenerate(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> ChatResult:
+    call = self._script(messages, kwargs)
+    await asyncio.sleep(call.latency)
+    self._raise_before_answer(call)
+    await asyncio.sleep(call.generation_time - call.latency)
+    if call.error is not None:
+      raise _injected_error("error", self.model_name)
+    return ChatResult(generations=[ChatGeneration(message=call.message)])
+
+  def _stream(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[CallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+    call = self._script(messages, kwargs)
+    time.sleep(call.latency)
+    self._raise_before_answer(call)
+    chunks = call.chunks()
+    for index, chunk in enumerate(chunks):
+      if index:
+        time.sleep(call.chunk_delay)
+      if call.error is not None and index == len(chunks) // 2:
+        raise _injected_error("error", self.model_name)
+      yield ChatGenerationChunk(message=chunk)
+
+  async def _astream(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+    call = self._script(messages, kwargs)
+    await asyncio.sleep(call.latency)
+    self._raise_before_answer(call)
+    chunks = call.chunks()
+    for index, chunk in enumerate(chunks):
+      if index:
+        await asyncio.sleep(call.chunk_delay)
+      if call.error is not None and index == len(chunks) // 2:
+        # "stream_cut": the connection drops halfway through the answer
+        raise _injected_error("error", self.model_name)
+      yield ChatGenerationChunk(message=chunk)
+
+
+class MockEmbeddings(Embeddings):
+  """ Deterministic local embeddings, the same text always gets the same unit vector """
+
+  def __init__(self, model_name: str, dim: int, latency: float = 0.0, error_rate: float = 0.0) -> None:
+    self.model_name = model_name
+    self.dim = dim
+    self.latency = latency
+    self.error_rate = error_rate
+    self._attempts: "OrderedDict[str, int]" = OrderedDict()
+
+  def _vector(self, text: str) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(f"{self.model_name}:{text}".encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(self.dim)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+  def _script(self, texts: List[str]) -> Tuple[float, Optional[str]]:
+    """ Latency and injected error of a call, drawn like those of `MockChatModel` """
+    model_config = config_manager.model_config
+    rng = _call_rng(self._attempts, self.model_name, "\x00".join(texts))
+    error = None
+    if self.error_rate and rng.random() < self.error_rate:
+      error = rng.choice([kind for kind in model_config.MOCK_ERROR_KINDS if kind != "stream_cut"] or ["error"])
+    return sample_latency(rng, self.latency), error
+
+  def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    latency, error = self._script(texts)
+    time.sleep(latency)
+    if error is not None:
+      raise _injected_error(error, self.model_name)
+    return [self._vector(text) for text in texts]
+
+  def embed_query(self, text: str) -> List[float]:
+    return self.embed_documents([text])[0]
+
+  async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+    latency, error = self._script(texts)
+    await asyncio.sleep(latency)
+    if error is not None:
+      raise _injected_error(error, self.model_name)
+    return [self._vector(text) for text in texts]
+
+  async def aembed_query(self, text: str) -> List[float]:
+    return (await self.aembed_documents([text]))[0]
+
+  def __repr__(self) -> str:
+    return f"MockEmbeddings(model_name={self.model_name!r}, dim={self.dim})"
+
+
+class MockProvider(LLMProvider):
+  """ Local mock provider, serves any model name without network access.
+  Its answers follow the rules of `MODEL_MOCK_SCRIPT_PATH` (the plan graph prompts by default), so
+  the whole plan pipeline can be load tested offline, e.g. with `MODEL_DEFAULT_PROVIDER=mock`.
+  """
+
+  def get_llm(self, model_name: str, model_type: str = "chat", **kwargs: Any) -> Union[BaseChatModel, Embeddings]:
+    """ Retrieve a mock model, cached by (model name, model type) """
+    if model_type not in ("chat", "embedding"):
+      logger.warning(f"Unknown model type '{model_type}', defaulting to 'chat'.")
+      model_type = "chat"
+    return self._get_or_create_client((model_name, model_type), lambda: self._create_llm(model_name, model_type))
+
+  def _create_llm(self, model_name: str, model_type: str) -> Union[BaseChatModel, Embeddings]:
+    model_config = config_manager.model_config
+    logger.info(f"Mock {model_type} instance for model: {model_name}")
+    if model_type == "embedding":
+      return MockEmbeddings(model_name, model_config.MOCK_EMBEDDING_DIM, model_config.MOCK_LATENCY, model_config.MOCK_ERROR_RATE)
+    return MockChatModel(
+      model_name=model_name,
+      rules=load_mock_rules(model_config.MOCK_SCRIPT_PATH),
+      latency=model_config.MOCK_LATENCY,
+      error_rate=model_config.MOCK_ERROR_RATE,
+    )
@@ -0,0 +1,88 @@
+
+
+from typing import Any, Dict, List, Tuple, Union
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+
+from common.logger import logger
+from llms.providers import LLMProvider
+from llms.routing import RouteSelector, RoutedChatModel, RoutedEmbeddings
+from conf.config import config_manager
+
+
+class RouterProvider(LLMProvider):
+  """ Routing provider over the other registered providers
+  Each role of the LLM service is served by the candidates of its `MODEL_ROUTES` entry, or by its
+  configured model on every provider of `MODEL_ROUTER_PROVIDERS`. Every call goes to the healthiest
+  candidate by moving average latency and error rate (see `llms.routing`) and fails over to the
+  next one when it fails. Select it with `MODEL_DEFAULT_PROVIDER=router`.
+  """
+
+  def __init__(self) -> None:
+    super().__init__()
+    self._providers: Dict[str, LLMProvider] = {}
+    self.selector = RouteSelector()
+
+  def bind_providers(self, providers: Dict[str, LLMProvider]) -> None:
+    self._providers = {name: provider for name, provider in providers.items() if provider is not self}
+
+  def _route(self, role: str, model_name: str) -> List[str]:
+    """ The "provider/model" candidates of a role, in route order """
+    route = config_manager.model_config.ROUTES.get(role)
+    if route:
+      return list(route)
+    return [f"{provider_name}/{model_name}" for provider_name in config_manager.model_config.ROUTER_PROVIDERS]
+
+  def _candidates(self, route: List[str], model_type: str) -> List[Tuple[str, Any]]:
+    candidates = []
+    for key in route:
+      provider_name, _, model_name = key.partition("/")
+      provider = self._providers.get(provider_name)
+      if provider is None or not model_name:
+        logger.warning(f"Skipping route candidate '{key}', expected a registered \"provider/model\"")
+        continue
+      candidates.append((key, provider.get_llm(model_name, model_type=model_type)))
+    return candidates
+
+  def _routed(self, role: str, model_name: str, model_type: str) -> Union[BaseChatModel, Embeddings]:
+    route = self._route(role, model_name)
+    key = (role, model_type, tuple(route))
+    return self._get_or_create_client(key, lambda: self._create_llm(role, route, model_type))
+
+  def _create_llm(self, role: str, route: List[str], model_type: str) -> Union[BaseChatModel, Embeddings]:
+    candidates = self._candidates(route, model_type)
+    if not candidates:
+      raise ValueError(f"Route '{role}' has no registered candidate in {route}")
+    logger.info(f"Routing '{role}' ({self.selector.strategy(role)}) between {[key for key, _ in candidates]}")
+    if model_type == "embedding":
+      return RoutedEmbeddings(model_name=f"router:{role}", role=role, candidates=candidates, selector=self.selector)
+    return RoutedChatModel(model_name=f"router:{role}", role=role, candidates=candidates, selector=self.selector)
+
+  def get_llm(self, model_name: str, model_type: str = "chat", **kwargs: Any) -> Union[BaseChatModel, Embeddings]:
+    """ Route a model name: a name with a `MODEL_ROUTES` entry, such as a role, uses that route,
+    any other model is routed over `MODEL_ROUTER_PROVIDERS`.
+    """
+    if model_type not in ("chat", "embedding"):
+      logger.warning(f"Unknown model type '{model_type}', defaulting to 'chat'.")
+      model_type = "chat"
+    return self._routed(model_name, model_name, model_type)
+
+  def get_role_llm(self, role: str, model_name: str, model_type: str = "chat") -> Union[BaseChatModel, Embeddings]:
+    return self._routed(role, model_name, model_type)
+
+  def route_stats(self) -> Dict[str, Any]:
+    """ Get the routes, their selection rule and the health of every candidate """
+    model_config = config_manager.model_config
+    role_models = {
+      "simple": model_config.SIMPLE_LLM,
+      "reason": model_config.REASON_LLM,
+      "code": model_config.CODE_LLM,
+      "embedding": model_config.EMBEDDING_MODEL,
+    }
+    return {
+      "routes": {
+        role: {"strategy": self.selector.strategy(role), "candidates": self._route(role, model_name)}
+        for role, model_name in role_models.items()
+      },
+      **self.selector.stats(),
+    }
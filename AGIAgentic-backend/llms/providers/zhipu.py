@@ -1,7 +1,10 @@
 
 
+import copy
+import json
+
 from pydantic import SecretStr
-from typing import Union
+from typing import Any, Union
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 from common.logger import logger
@@ -13,10 +16,30 @@ class ZhipuProvider(LLMProvider):
     """ Zhipu LLM provider implementation.
     """
 
-    def get_llm(self, model_name: str, model_type: str = "chat") -> Union[ChatOpenAI, OpenAIEmbeddings]:
+    def get_llm(self, model_name: str, model_type: str = "chat", **kwargs: Any) -> Union[ChatOpenAI, OpenAIEmbeddings]:
         """Retrieve a Zhipu LLM instance by model name.
+        Instances are cached by (model name, model type, parameters) and share the provider's connection pool.
+        """
+        if model_type not in ("chat", "embedding"):
+            logger.warning(f"Unknown model type '{model_type}', defaulting to 'chat'.")
+            model_type = "chat"
+        if model_type == "chat":
+            kwargs.setdefault("temperature", 0.7)
+        else:
+            # send the texts as they are, the tiktoken pre-tokenization only applies to OpenAI models
+            kwargs.setdefault("check_embedding_ctx_length", False)
+        if config_manager.model_config.LIMITER_ENABLED:
+            # the limiter retries 429s after their Retry-After, SDK retries would multiply the requests
+            kwargs.setdefault("max_retries", 0)
+        # parameters such as model_kwargs, stop or default_headers are not hashable, key on their JSON form
+        key = (model_name, model_type, json.dumps(kwargs, sort_keys=True, default=str))
+        # the client moves entries out of model_kwargs, the caller's parameters must keep their key
+        kwargs = {name: copy.copy(value) if isinstance(value, (dict, list)) else value for name, value in kwargs.items()}
+        return self._get_or_create_client(key, lambda: self._create_llm(model_name, model_type, **kwargs))
+
+    def _create_llm(self, model_name: str, model_type: str, **kwargs: Any) -> Union[ChatOpenAI, OpenAIEmbeddings]:
+        """Create a new Zhipu LLM instance bound to the shared HTTP clients.
         """
-        # Placeholder for actual Zhipu LLM retrieval logic
         logger.info(f"Zhipu LLM instance for model: {model_name}")
         model_config = config_manager.model_config
         logger.debug(f"Using configuration: {model_config}")
@@ -27,29 +50,26 @@ class ZhipuProvider(LLMProvider):
                     model=model_name,
                     api_key=SecretStr(model_config.ZHIPU_API_KEY),
                     base_url=model_config.ZHIPU_BASE_URL,
-                )
-            case "chat":
-                logger.debug(f"Creating ChatOpenAI with model: {model_name}, base_url: {model_config.ZHIPU_BASE_URL}")
-                llm = ChatOpenAI(
-                    model=model_name,
-                    api_key=SecretStr(model_config.ZHIPU_API_KEY),
-                    base_url=model_config.ZHIPU_BASE_URL,
-                    temperature=0.7
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client,
+                    **kwargs
                 )
             case _:
-                logger.warning(f"Unknown model type '{model_type}', defaulting to 'chat'.")
+                logger.debug(f"Creating ChatOpenAI with model: {model_name}, base_url: {model_config.ZHIPU_BASE_URL}")
                 llm = ChatOpenAI(
                     model=model_name,
                     api_key=SecretStr(model_config.ZHIPU_API_KEY),
                     base_url=model_config.ZHIPU_BASE_URL,
-                    temperature=0.7
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client,
+                    **kwargs
                 )
-                
+
         logger.info(f"Successfully created {model_type} LLM instance: {model_name}")
         return llm
-    
+
 
 if __name__ == "__main__":
     provider = ZhipuProvider()
     llm_instance = provider.get_llm("glm-4-plus")
-    print(llm_instance)
\ No newline at end of file
+    print(llm_instance)
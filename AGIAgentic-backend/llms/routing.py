@@ -0,0 +1,318 @@
+
+
+import json
+import time
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+from langchain_core.embeddings import Embeddings
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from common.logger import logger
+from conf.config import config_manager
+
+
+T = TypeVar("T")
+
+# Lowest share of successful calls used in the score, so a failing candidate still has a finite score
+_MIN_SUCCESS_RATE = 0.05
+
+
+class RouteHealth:
+  """ Moving averages of the latency and error rate of one "provider/model" candidate
+  After `MODEL_ROUTER_FAILURE_THRESHOLD` failures in a row the candidate is out of rotation for
+  `MODEL_ROUTER_COOLDOWN` seconds, then it gets one trial call and a single failure takes it out again.
+  """
+
+  def __init__(self, key: str) -> None:
+    self.key = key
+    self.latency: Optional[float] = None
+    self.error_rate = 0.0
+    self.consecutive_failures = 0
+    self.open_until = 0.0
+    self.calls = 0
+    self.failures = 0
+
+  def available(self, now: float) -> bool:
+    return now >= self.open_until
+
+  def score(self) -> float:
+    """ Expected seconds per successful call, 0.0 until the first call so a new candidate is tried """
+    if self.latency is None:
+      return 0.0
+    return self.latency / max(_MIN_SUCCESS_RATE, 1.0 - self.error_rate)
+
+  def _update(self, seconds: float, failed: bool) -> None:
+    alpha = config_manager.model_config.ROUTER_EWMA_ALPHA
+    self.calls += 1
+    self.error_rate = alpha * float(failed) + (1 - alpha) * self.error_rate
+    # a failure often comes back fast, only successes tell how slow a candidate is
+    if not failed:
+      self.latency = seconds if self.latency is None else alpha * seconds + (1 - alpha) * self.latency
+
+  def record_success(self, seconds: float) -> None:
+    self._update(seconds, False)
+    self.consecutive_failures = 0
+    self.open_until = 0.0
+
+  def record_failure(self, seconds: float) -> None:
+    self._update(seconds, True)
+    self.failures += 1
+    self.consecutive_failures += 1
+    model_config = config_manager.model_config
+    if self.consecutive_failures >= model_config.ROUTER_FAILURE_THRESHOLD:
+      if self.available(time.monotonic()):
+        logger.warning(f"Route candidate '{self.key}' failed {self.consecutive_failures} times in a row, out of rotation for {model_config.ROUTER_COOLDOWN:g}s")
+      self.open_until = time.monotonic() + model_config.ROUTER_COOLDOWN
+
+  def stats(self) -> Dict[str, Any]:
+    return {
+      "available": self.available(time.monotonic()),
+      "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+      "error_rate": round(self.error_rate, 4),
+      "consecutive_failures": self.consecutive_failures,
+      "calls": self.calls,
+      "failures": self.failures,
+    }
+
+
+class RouteSelector:
+  """ Health of every route candidate and the order in which a call tries them """
+
+  def __init__(self) -> None:
+    self._health: Dict[str, RouteHealth] = {}
+    self._failovers = 0
+
+  def health(self, key: str) -> RouteHealth:
+    health = self._health.get(key)
+    if health is None:
+      health = self._health[key] = RouteHealth(key)
+    return health
+
+  @staticmethod
+  def strategy(role: str) -> str:
+    """ Selection rule of a role from `MODEL_ROUTE_STRATEGIES`
+    Args:
+        role (str): "simple", "reason", "code", "embedding" or a model name.
+    Returns:
+        str: "latency" or "priority", "priority" by default for embeddings, whose vectors must stay in one space.
+    """
+    return config_manager.model_config.ROUTE_STRATEGIES.get(role, "priority" if role == "embedding" else "latency")
+
+  def order(self, role: str, keys: List[str]) -> List[str]:
+    """ Order the candidates of a call
+    Args:
+        role (str): The routed role.
+        keys (List[str]): The "provider/model" candidates in route order.
+    Returns:
+        List[str]: Candidates in rotation first, by score with "latency" or in route order with
+            "priority", then the ones out of rotation as a last resort.
+    """
+    now = time.monotonic()
+    available = [key for key in keys if self.health(key).available(now)]
+    if self.strategy(role) == "latency":
+      # sorted() is stable, untried candidates keep the route order
+      available.sort(key=lambda key: self.health(key).score())
+    resting = sorted((key for key in keys if key not in available), key=lambda key: self.health(key).open_until)
+    return available + resting
+
+  async def acall(self, role: str, candidates: List[Tuple[str, Any]], call: Callable[[Any], Awaitable[T]], record_success: bool = True) -> T:
+    """ Call the candidates in order until one succeeds
+    Args:
+        role (str): The routed role.
+        candidates (List[Tuple[str, Any]]): "provider/model" and model of every candidate.
+        call (Callable[[Any], Awaitable[T]]): Makes the call on one model.
+        record_success (bool, optional): Record the success of the answering candidate. Defaults to True,
+            False when the call only starts the work and its outcome is recorded later with `record`.
+    Returns:
+        T: The result of the first successful candidate.
+    Raises:
+        Exception: The error of the last candidate when every candidate failed.
+    """
+    models = dict(candidates)
+    last_error: Optional[Exception] = None
+    for key in self.order(role, list(models)):
+      start = time.perf_counter()
+      try:
+        result = await call(models[key])
+      except Exception as e:
+        self.record(role, key, time.perf_counter() - start, e)
+        last_error = e
+        continue
+      if last_error is not None:
+        self._failovers += 1
+      if record_success:
+        self.record(role, key, time.perf_counter() - start)
+      return result
+    raise last_error if last_error is not None else ValueError(f"Route '{role}' has no candidates")
+
+  def call(self, role: str, candidates: List[Tuple[str, Any]], call: Callable[[Any], T]) -> T:
+    """ Synchronous `acall` """
+    models = dict(candidates)
+    last_error: Optional[Exception] = None
+    for key in self.order(role, list(models)):
+      start = time.perf_counter()
+      try:
+        result = call(models[key])
+      except Exception as e:
+        self.record(role, key, time.perf_counter() - start, e)
+        last_error = e
+        continue
+      if last_error is not None:
+        self._failovers += 1
+      self.record(role, key, time.perf_counter() - start)
+      return result
+    raise last_error if last_error is not None else ValueError(f"Route '{role}' has no candidates")
+
+  def record(self, role: str, key: str, seconds: float, error: Optional[Exception] = None) -> None:
+    """ Record the outcome of one call of a candidate
+    Args:
+        role (str): The routed role.
+        key (str): The "provider/model" candidate.
+        seconds (float): Duration of the call.
+        error (Optional[Exception], optional): The error of a failed call. Defaults to None for a success.
+    """
+    if error is None:
+      self.health(key).record_success(seconds)
+      return
+    self.health(key).record_failure(seconds)
+    logger.warning(f"Route '{role}' candidate '{key}' failed: {type(error).__name__}: {error}")
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get the calls answered by a later candidate and the health of every candidate, by "provider/model" """
+    return {
+      "failovers": self._failovers,
+      "candidates": {key: health.stats() for key, health in sorted(self._health.items())},
+    }
+
+
+def _has_stream(model: BaseChatModel) -> bool:
+  return type(model)._astream is not BaseChatModel._astream
+
+
+class RoutedChatModel(BaseChatModel):
+  """ Chat model that sends each call to the healthiest candidate of its route
+  A call that fails moves on to the next candidate. A stream fails over until its first chunk,
+  after that an error is returned to the caller. The outcome of a stream is recorded once, when it ends.
+  """
+
+  model_name: str
+  role: str
+  candidates: List[Tuple[str, Any]]
+  selector: Any
+
+  @property
+  def _llm_type(self) -> str:
+    return "router"
+
+  @property
+  def _identifying_params(self) -> Dict[str, Any]:
+    return {"model_name": self.model_name, "candidates": [key for key, _ in self.candidates]}
+
+  def bind_tools(self, tools: Any, *, tool_choice: Optional[str] = None, **kwargs: Any) -> Any:
+    """ Bind tools in the OpenAI format, which every candidate receives as call arguments """
+    if tool_choice:
+      if tool_choice == "any":
+        tool_choice = "required"
+      if tool_choice not in ("auto", "none", "required"):
+        kwargs["tool_choice"] = {"type": "function", "function": {"name": tool_choice}}
+      else:
+        kwargs["tool_choice"] = tool_choice
+    return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+  def _generate(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[CallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> ChatResult:
+    return self.selector.call(self.role, self.candidates, lambda model: model._generate(messages, stop=stop, **kwargs))
+
+  async def _agenerate(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> ChatResult:
+    return await self.selector.acall(self.role, self.candidates, lambda model: model._agenerate(messages, stop=stop, **kwargs))
+
+  async def _astream(
+      self,
+      messages: List[BaseMessage],
+      stop: Optional[List[str]] = None,
+      run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+      **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+    served: Dict[str, Any] = {}
+
+    # the chunks are reported to the callbacks by `astream`, the candidates get no run manager
+    async def _first_chunk(model: BaseChatModel) -> Tuple[Optional[ChatGenerationChunk], AsyncIterator[ChatGenerationChunk]]:
+      served["key"] = next(key for key, candidate in self.candidates if candidate is model)
+      served["start"] = time.perf_counter()
+      if _has_stream(model):
+        stream = model._astream(messages, stop=stop, **kwargs)
+      else:
+        stream = _generation_as_stream(await model._agenerate(messages, stop=stop, **kwargs))
+      try:
+        return await anext(stream), stream # type: ignore
+      except StopAsyncIteration:
+        return None, stream
+
+    # a failure before the first chunk is recorded by `acall`, which then fails over
+    first, stream = await self.selector.acall(self.role, self.candidates, _first_chunk, record_success=False)
+    error: Optional[Exception] = None
+    try:
+      if first is None:
+        return
+      yield first
+      async for chunk in stream:
+        yield chunk
+    except Exception as e:
+      # too late to fail over, but a candidate that drops streams must lose its score
+      error = e
+      raise
+    finally:
+      self.selector.record(self.role, served["key"], time.perf_counter() - served["start"], error)
+
+
+async def _generation_as_stream(result: ChatResult) -> AsyncIterator[ChatGenerationChunk]:
+  """ Stream the answer of a candidate that cannot stream, as a single chunk """
+  message = result.generations[0].message
+  yield ChatGenerationChunk(message=AIMessageChunk(
+    content=message.content,
+    additional_kwargs=message.additional_kwargs,
+    tool_call_chunks=[
+      {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+      for index, call in enumerate(getattr(message, "tool_calls", []) or [])
+    ],
+  ))
+
+
+class RoutedEmbeddings(Embeddings):
+  """ Embeddings sent to the first healthy candidate of their route, in route order by default """
+
+  def __init__(self, model_name: str, role: str, candidates: List[Tuple[str, Embeddings]], selector: RouteSelector) -> None:
+    self.model_name = model_name
+    self.role = role
+    self.candidates = candidates
+    self.selector = selector
+
+  def embed_documents(self, texts: List[str]) -> List[List[float]]:
+    return self.selector.call(self.role, self.candidates, lambda model: model.embed_documents(texts))
+
+  def embed_query(self, text: str) -> List[float]:
+    return self.selector.call(self.role, self.candidates, lambda model: model.embed_query(text))
+
+  async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+    return await self.selector.acall(self.role, self.candidates, lambda model: model.aembed_documents(texts))
+
+  async def aembed_query(self, text: str) -> List[float]:
+    return await self.selector.acall(self.role, self.candidates, lambda model: model.aembed_query(text))
+
+  def __repr__(self) -> str:
+    return f"RoutedEmbeddings(model_name={self.model_name!r}, candidates={[key for key, _ in self.candidates]!r})"
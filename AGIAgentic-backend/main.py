@@ -10,6 +10,9 @@ from tools import nitialize_tool_manager
 from llms import initialize_model_manager
 from common.logger import initialize_logger
 from _mcp.manager import initialize_mcp_manager
+from services.mcp import MCPService
+from services.semantic_plan_cache import semantic_plan_cache
+from graph.checkpoint import plan_checkpointer
 from conf.config import config_manager, ConfigManager
 
 
@@ -17,14 +20,27 @@ from conf.config import config_manager, ConfigManager
 
 def init_mcp(app: FastAPI) -> List[Any]:
     """Initialize MCP configuration."""
-    mcp_tools: List[Any] = initialize_mcp_manager()
+    mcp_manager, mcp_tools = initialize_mcp_manager()
     logger.info("🔗 Fetching tools from MCP services...")
     logger.info(f"✅ Retrieved {len(mcp_tools)} tools from MCP services.")
     logger.debug("MCP Tools List:\n" + "\n".join([f"  - {tool}" for tool in mcp_tools]))
     logger.info("-" * 60)
+    app.state.mcp_manager = mcp_manager
     app.state.mcp_tools = mcp_tools
     return mcp_tools
 
+def update_mcp_tools(app: FastAPI, mcp_tools: List[Any]) -> None:
+    """Swap in a refreshed MCP tool catalog."""
+    app.state.mcp_tools = mcp_tools
+    version = MCPService().update_mcp_tools(mcp_tools)
+    logger.info(f"🔄 MCP tool catalog updated to version {version}, {len(mcp_tools)} tools.")
+
+def start_mcp_refresh(app: FastAPI) -> None:
+    """Reconcile the MCP tool catalog in the background."""
+    mcp_manager = getattr(app.state, "mcp_manager", None)
+    if mcp_manager is not None:
+      mcp_manager.start_refresh(lambda mcp_tools: update_mcp_tools(app, mcp_tools))
+
 def init_tools(app: FastAPI) -> List[Any]:
     """Initialize tools from the local tools package."""
     tools: List[Any] = nitialize_tool_manager()
@@ -52,6 +68,13 @@ def init_models(app: FastAPI) -> Dict[str, Any]:
     return llm_providers
 
 
+def init_caches(app: FastAPI) -> None:
+    """Load persisted cache snapshots."""
+    if config_manager.cache_config.SEMANTIC_CACHE_ENABLED:
+      loaded = semantic_plan_cache.load_snapshot()
+      logger.info(f"🗂️  Loaded {loaded} semantic plan cache entries.")
+
+
 def initialize_config_manager(app: FastAPI) -> ConfigManager:
     """ Initialize the global configuration manager """
     app.state.config_manager = config_manager
@@ -76,19 +99,53 @@ def init(app: FastAPI = None) -> None: # type: ignore
     # Initialize the model providers and LLMs
     init_models(app)
 
-def clear() -> None:
+    # Load persisted cache snapshots
+    init_caches(app)
+
+async def clear(app: FastAPI) -> None:
     """ Clear the application state and resources."""
     logger.info("🧹 Clearing application state and resources...")
-    # Placeholder for actual clearing logic
+
+    # Persist the semantic plan cache
+    if config_manager.cache_config.SEMANTIC_CACHE_ENABLED:
+      try:
+        semantic_plan_cache.save_snapshot()
+      except Exception as e:
+        logger.error(f"Error saving semantic plan cache snapshot: {str(e)}")
+
+    # Stop the MCP catalog refresh and close the MCP sessions
+    mcp_manager = getattr(app.state, "mcp_manager", None)
+    if mcp_manager is not None:
+      try:
+        await mcp_manager.stop_refresh()
+        await mcp_manager.client_manager.close_client()
+      except Exception as e:
+        logger.error(f"Error closing MCP client: {str(e)}")
+
+    # Close the plan checkpoint database
+    if plan_checkpointer is not None:
+      try:
+        await plan_checkpointer.aclose()
+      except Exception as e:
+        logger.error(f"Error closing plan checkpointer: {str(e)}")
+
+    # Close the connection pools of the model providers
+    for provider_name, provider_instance in getattr(app.state, "llm_providers", {}).items():
+      try:
+        await provider_instance.aclose()
+      except Exception as e:
+        logger.error(f"Error closing model provider '{provider_name}': {str(e)}")
     logger.info("✅ Application state cleared.")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize the application components
     init(app)
+    # Background tasks run on the serving event loop
+    start_mcp_refresh(app)
     yield
     # Clean up the ML models and release the resources
-    clear()
+    await clear(app)
 
 def create_app() -> FastAPI:
     """Create and configure the main application."""
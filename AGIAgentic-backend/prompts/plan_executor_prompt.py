@@ -1,3 +1,5 @@
+import hashlib
+
 from langchain_core.prompts import PromptTemplate
 
 planning_prompt = PromptTemplate.from_template("""
@@ -13,7 +15,8 @@ planning_prompt = PromptTemplate.from_template("""
       "description": string,            // 可直接执行的操作说明（具体、明确）
       "expected_result": string,        // 此步骤完成后的可验证输出
       "requires_confirmation": bool,    // 是否需要用户确认
-      "uncertainty_reason": string      // 若需要确认，简要说明原因；否则空字符串
+      "uncertainty_reason": string,     // 若需要确认，简要说明原因；否则空字符串
+      "depends_on": [int]               // 本步骤依赖的前置步骤编号；无依赖则为空数组 []
     }}
   ]
 }}
@@ -23,6 +26,7 @@ planning_prompt = PromptTemplate.from_template("""
 - 若步骤依赖外部信息（路径、账号、时间窗口、权限、目标资源等），将 requires_confirmation 设为 true，并在 uncertainty_reason 中说明所需信息或风险。
 - 对于危险或不可逆操作（删除、修改生产数据、权限变更等），强制 requires_confirmation = true 并在 uncertainty_reason 中写明风险点。
 - task_analysis 要指出关键假设与需要额外信息的项（如果有），并简要说明分解依据。
+- depends_on 只列出真正需要其输出的前置步骤；相互独立的步骤（如两个互不相关的查询）不要互相依赖，以便并行执行；禁止循环依赖。
 - 严格只输出 JSON，禁止任何前后缀、多余换行、代码块或自然语言说明。
 
 # 示例（请仅参考格式与风格，严格不要在最终输出中包含示例文字）：
@@ -38,7 +42,8 @@ planning_prompt = PromptTemplate.from_template("""
       "description": "读取系统当前时间并按本地时区格式化返回",
       "expected_result": "返回当前本地时间字符串（例如：2025-12-02 09:30）",
       "requires_confirmation": false,
-      "uncertainty_reason": ""
+      "uncertainty_reason": "",
+      "depends_on": []
     }}
   ]
 }}
@@ -54,7 +59,8 @@ planning_prompt = PromptTemplate.from_template("""
       "description": "确认要删除的服务器标识、目标日志文件路径与是否已备份",
       "expected_result": "获得明确的服务器与文件路径，以及是否需要先备份",
       "requires_confirmation": true,
-      "uncertainty_reason": "未提供服务器与文件路径，删除为不可逆操作，需用户确认"
+      "uncertainty_reason": "未提供服务器与文件路径，删除为不可逆操作，需用户确认",
+      "depends_on": []
     }}
   ]
 }}
@@ -70,21 +76,57 @@ planning_prompt = PromptTemplate.from_template("""
       "description": "确认参会人员名单与时区，查询日历可用性",
       "expected_result": "获得参会人员与合适的时区与时间段",
       "requires_confirmation": true,
-      "uncertainty_reason": "未提供参会人员名单与时区"
+      "uncertainty_reason": "未提供参会人员名单与时区",
+      "depends_on": []
     }},
     {{
       "step": 2,
       "description": "在日历系统创建会议并生成线上会议链接，填写初步议程",
       "expected_result": "创建会议并生成邀请链接与议程草案",
       "requires_confirmation": false,
-      "uncertainty_reason": ""
+      "uncertainty_reason": "",
+      "depends_on": [1]
     }},
     {{
       "step": 3,
       "description": "向参会人员发送日历邀请并请求确认",
       "expected_result": "参会人员收到邀请并开始确认/拒绝",
       "requires_confirmation": false,
-      "uncertainty_reason": ""
+      "uncertainty_reason": "",
+      "depends_on": [2]
+    }}
+  ]
+}}
+
+示例 D — 可并行的独立步骤
+输入: "分别查询北京和纽约现在的时间，并比较两地时差"
+输出:
+{{
+  "task_analysis": "两地时间查询相互独立，可并行执行；比较时差依赖两次查询的结果。",
+  "execution_plans": [
+    {{
+      "step": 1,
+      "description": "查询北京（Asia/Shanghai）当前时间",
+      "expected_result": "北京当前时间字符串",
+      "requires_confirmation": false,
+      "uncertainty_reason": "",
+      "depends_on": []
+    }},
+    {{
+      "step": 2,
+      "description": "查询纽约（America/New_York）当前时间",
+      "expected_result": "纽约当前时间字符串",
+      "requires_confirmation": false,
+      "uncertainty_reason": "",
+      "depends_on": []
+    }},
+    {{
+      "step": 3,
+      "description": "比较步骤 1 与步骤 2 的时间并计算时差",
+      "expected_result": "两地时差（小时）",
+      "requires_confirmation": false,
+      "uncertainty_reason": "",
+      "depends_on": [1, 2]
     }}
   ]
 }}
@@ -92,11 +134,23 @@ planning_prompt = PromptTemplate.from_template("""
 现在，请基于: {user_task} 生成一个满足上述结构与规则的 JSON 计划（务必只输出纯 JSON）。
 """)  # type: ignore
 
+# Version of the planning prompt, changes whenever the template changes
+PLANNING_PROMPT_VERSION = hashlib.sha256(planning_prompt.template.encode("utf-8")).hexdigest()[:12]
+
+# Follow-up sent when a plan is still invalid after local repair
+plan_feedback_prompt = PromptTemplate.from_template("""上面输出的执行计划无法解析或不符合要求的结构，错误信息：
+{error}
+
+请重新输出完整的执行计划，严格只输出满足上述结构的 JSON。""")
+
 react_prompt = PromptTemplate.from_template("""你是一个智能执行器，需要完成用户给定的任务。
 
 任务目标：{description}。{user_feedback}
 预期结果：{expected_result}
 
+前置步骤结果：
+{dependency_results}
+
 你可以使用以下工具：
 {tools}
 
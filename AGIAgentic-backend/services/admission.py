@@ -0,0 +1,170 @@
+
+
+import math
+import time
+import asyncio
+
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from conf.config import config_manager
+
+
+# Weight of the latest plan duration in the moving average used for Retry-After
+_DURATION_EWMA_ALPHA = 0.2
+
+
+class PlanTicket:
+  """ A plan request holding or waiting for an execution slot """
+
+  def __init__(self) -> None:
+    self.enqueued_at = time.monotonic()
+    self.started_at: Optional[float] = None
+    self._changed = asyncio.Event()
+
+  @property
+  def admitted(self) -> bool:
+    return self.started_at is not None
+
+
+class PlanAdmission:
+  """ Admission control of plan executions in this worker
+  At most `AGENT_MAX_ACTIVE_PLANS` plans execute at once, up to `AGENT_MAX_QUEUED_PLANS` more wait
+  in arrival order and any further plan is rejected right away, with a Retry-After estimated from
+  recent plan durations.
+  """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize PlanAdmission """
+    if getattr(self, "_initialized", False):
+      return
+    self._queue: Deque[PlanTicket] = deque()
+    self._active = 0
+    self._admitted = 0
+    self._rejected = 0
+    self._timeouts = 0
+    self._total_wait = 0.0
+    self._max_wait = 0.0
+    self._avg_duration: Optional[float] = None
+    self._initialized = True
+
+  @property
+  def max_active(self) -> int:
+    return max(1, config_manager.agent_config.MAX_ACTIVE_PLANS)
+
+  @property
+  def max_queued(self) -> int:
+    return max(0, config_manager.agent_config.MAX_QUEUED_PLANS)
+
+  def _admit(self, ticket: PlanTicket) -> None:
+    ticket.started_at = time.monotonic()
+    waited = ticket.started_at - ticket.enqueued_at
+    self._active += 1
+    self._admitted += 1
+    self._total_wait += waited
+    self._max_wait = max(self._max_wait, waited)
+    ticket._changed.set()
+
+  def _admit_waiting(self) -> None:
+    while self._queue and self._active < self.max_active:
+      self._admit(self._queue.popleft())
+    # every waiting plan moved up in the queue
+    for ticket in self._queue:
+      ticket._changed.set()
+
+  def try_enter(self) -> Optional[PlanTicket]:
+    """ Take an execution slot, or a place in the queue
+    Returns:
+        Optional[PlanTicket]: The ticket, None when the queue is full and the plan must be rejected.
+    """
+    ticket = PlanTicket()
+    if not self._queue and self._active < self.max_active:
+      self._admit(ticket)
+    elif len(self._queue) < self.max_queued:
+      self._queue.append(ticket)
+    else:
+      self._rejected += 1
+      return None
+    return ticket
+
+  def position(self, ticket: PlanTicket) -> int:
+    """ Position of a ticket in the queue, starting at 1, 0 once admitted """
+    return 0 if ticket.admitted else self._queue.index(ticket) + 1
+
+  async def wait_turn(self, ticket: PlanTicket) -> AsyncIterator[int]:
+    """ Wait for an execution slot
+    Args:
+        ticket (PlanTicket): A ticket from `try_enter`.
+    Yields:
+        int: The queue position, initially and whenever it changes.
+    Raises:
+        asyncio.TimeoutError: When the plan waited longer than `AGENT_PLAN_QUEUE_TIMEOUT`.
+    """
+    timeout = config_manager.agent_config.PLAN_QUEUE_TIMEOUT
+    deadline = ticket.enqueued_at + timeout if timeout > 0 else None
+    while not ticket.admitted:
+      # clear before yielding, a slot given while the consumer handles the position must not be lost
+      ticket._changed.clear()
+      yield self.position(ticket)
+      if ticket.admitted:
+        break
+      try:
+        await asyncio.wait_for(ticket._changed.wait(), None if deadline is None else max(0.0, deadline - time.monotonic()))
+      except asyncio.TimeoutError:
+        if ticket.admitted:
+          break
+        self._timeouts += 1
+        raise
+
+  def leave(self, ticket: PlanTicket) -> None:
+    """ Give back the slot of a finished plan, or the queue place of an abandoned one
+    Args:
+        ticket (PlanTicket): A ticket from `try_enter`.
+    """
+    if ticket.admitted:
+      self._active -= 1
+      duration = time.monotonic() - ticket.started_at # type: ignore
+      self._avg_duration = duration if self._avg_duration is None else (
+        _DURATION_EWMA_ALPHA * duration + (1 - _DURATION_EWMA_ALPHA) * self._avg_duration
+      )
+    elif ticket in self._queue:
+      self._queue.remove(ticket)
+    self._admit_waiting()
+
+  def retry_after(self) -> int:
+    """ Seconds a rejected client should wait, the time for the current queue to drain """
+    avg_duration = self._avg_duration if self._avg_duration is not None else config_manager.agent_config.PLAN_RETRY_AFTER
+    return max(1, math.ceil(avg_duration * (len(self._queue) + 1) / self.max_active))
+
+  @property
+  def saturated(self) -> bool:
+    """ Whether every slot is busy and `AGENT_READY_MAX_QUEUED_PLANS` plans wait, readiness fails then """
+    threshold = min(max(0, config_manager.agent_config.READY_MAX_QUEUED_PLANS), self.max_queued)
+    return self._active >= self.max_active and len(self._queue) >= threshold
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get admission statistics, waits and durations are in seconds """
+    return {
+      "active": self._active,
+      "queued": len(self._queue),
+      "max_active": self.max_active,
+      "max_queued": self.max_queued,
+      "saturated": self.saturated,
+      "admitted": self._admitted,
+      "rejected": self._rejected,
+      "queue_timeouts": self._timeouts,
+      "avg_wait": round(self._total_wait / self._admitted, 3) if self._admitted else 0.0,
+      "max_wait": round(self._max_wait, 3),
+      "avg_plan_duration": round(self._avg_duration, 3) if self._avg_duration is not None else None,
+    }
+
+
+# Global plan admission instance
+plan_admission = PlanAdmission()
@@ -1,8 +1,17 @@
 
 
+import time
+import asyncio
+
+import numpy as np
+
 from typing_extensions import Self
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from typing import Optional, Type, TypeVar, cast, Dict, Any
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import OpenAIEmbeddings
+from typing import AsyncIterator, List, Optional, Tuple, Type, TypeVar, Union, cast, Dict, Any
 
 from common.logger import logger
 from llms.providers import LLMProvider
@@ -11,6 +20,9 @@ from conf.config import config_manager
 
 T = TypeVar("T", bound=object)
 
+# A batch chat item: the reply or the error of the prompt, and its latency in seconds
+ChatBatchItem = Tuple[Union[BaseMessage, Exception], float]
+
 
 # Global provider storage
 
@@ -18,25 +30,31 @@ _PROVIDERS: Dict[str, LLMProvider] = {}
 
 
 class LLMService:
-    """Service class for managing LLM interactions."""
+    """Service class for managing LLM interactions.
+    There is one instance per provider, so its model handles stay stable for the life of the process.
+    An instance is kept only once its provider is found, an unknown name leaves nothing behind.
+    """
 
-    _instance = None
+    _instances: Dict[str, "LLMService"] = {}
 
-    def __new__(cls, *args: Any, **kwargs: Any) -> Self:
-        if not cls._instance:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def __new__(cls, llm_provider_name: Optional[str] = None, *args: Any, **kwargs: Any) -> Self:
+        llm_provider_name = llm_provider_name or config_manager.model_config.DEFAULT_PROVIDER
+        instance = cls._instances.get(llm_provider_name)
+        return instance if instance is not None else super().__new__(cls) # type: ignore
 
-    def __init__(self, llm_provider_name: str = "zhipu"):
+    def __init__(self, llm_provider_name: Optional[str] = None):
         """ Initialize the LLM service with a specific provider.
         Args:
-            llm_provider (LLMProvider): The name of the LLM provider to use.
+            llm_provider (LLMProvider): The name of the LLM provider to use, defaults to `MODEL_DEFAULT_PROVIDER`.
         """
-        self.llm_provider_name = llm_provider_name
-        self._simple_llm: Optional[ChatOpenAI] = None
-        self._reason_llm: Optional[ChatOpenAI] = None
-        self._code_llm: Optional[ChatOpenAI] = None
-        self._embedding_model: Optional[OpenAIEmbeddings] = None
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self.llm_provider_name = llm_provider_name or config_manager.model_config.DEFAULT_PROVIDER
+        self._simple_llm: Optional[BaseChatModel] = None
+        self._reason_llm: Optional[BaseChatModel] = None
+        self._code_llm: Optional[BaseChatModel] = None
+        self._embedding_model: Optional[Embeddings] = None
         self.model_config = config_manager.model_config
 
     def _ensure_provider(self) -> LLMProvider:
@@ -48,14 +66,18 @@ class LLMService:
                 logger.error(f"LLM provider '{self.llm_provider_name}' not found.")
                 raise ValueError(f"LLM provider '{self.llm_provider_name}' not found.")
             _PROVIDERS[self.llm_provider_name] = _provider
+        LLMService._instances.setdefault(self.llm_provider_name, self)
         return _PROVIDERS[self.llm_provider_name]
 
     def _get_and_validate(self, config_attr: str, expected_type: Type[T], model_type: str = "chat") -> T:
-        """Generic helper to fetch a model name from model_config, request the provider and validate type."""
+        """Generic helper to fetch a model name from model_config, request the provider and validate type.
+        The role ("simple" for SIMPLE_LLM, "embedding" for EMBEDDING_MODEL) lets a routing provider pick its route.
+        """
         provider = self._ensure_provider()
         model_name = getattr(self.model_config, config_attr)
-        logger.debug(f"Requesting model '{model_name}' (type={model_type}) from provider '{self.llm_provider_name}'")
-        inst = provider.get_llm(model_name, model_type=model_type)
+        role = config_attr.split("_", 1)[0].lower()
+        logger.debug(f"Requesting model '{model_name}' (role={role}, type={model_type}) from provider '{self.llm_provider_name}'")
+        inst = provider.get_role_llm(role, model_name, model_type=model_type)
         # Validate the type of the returned instance
         if not isinstance(inst, expected_type):
             logger.error(f"{config_attr} must be an instance of {expected_type.__name__}, got {type(inst).__name__}")
@@ -64,32 +86,134 @@ class LLMService:
         return cast(T, inst)
     
     @property
-    def simple_llm(self) -> ChatOpenAI:
-        """Get a simple chat LLM (ChatOpenAI)."""
+    def simple_llm(self) -> BaseChatModel:
+        """Get a simple chat LLM."""
         if self._simple_llm is None:
-            self._simple_llm = self._get_and_validate("SIMPLE_LLM", ChatOpenAI, model_type="chat")
+            self._simple_llm = self._get_and_validate("SIMPLE_LLM", BaseChatModel, model_type="chat")
         return self._simple_llm
 
     @property
-    def reason_llm(self) -> ChatOpenAI:
-        """Get a reasoning-capable ChatOpenAI instance."""
+    def reason_llm(self) -> BaseChatModel:
+        """Get a reasoning-capable chat LLM."""
         if self._reason_llm is None:
-            self._reason_llm = self._get_and_validate("REASON_LLM", ChatOpenAI, model_type="chat")
+            self._reason_llm = self._get_and_validate("REASON_LLM", BaseChatModel, model_type="chat")
         return self._reason_llm
 
     @property
-    def code_llm(self) -> ChatOpenAI:
-        """Get a code-generation ChatOpenAI instance."""
+    def code_llm(self) -> BaseChatModel:
+        """Get a code-generation chat LLM."""
         if self._code_llm is None:
-            self._code_llm = self._get_and_validate("CODE_LLM", ChatOpenAI, model_type="chat")
+            self._code_llm = self._get_and_validate("CODE_LLM", BaseChatModel, model_type="chat")
         return self._code_llm
 
     @property
-    def embedding_llm(self) -> OpenAIEmbeddings:
-        """Get an embedding model (OpenAIEmbeddings)."""
+    def embedding_llm(self) -> Embeddings:
+        """Get an embedding model."""
         if self._embedding_model is None:
-            self._embedding_model = self._get_and_validate("EMBEDDING_MODEL", OpenAIEmbeddings, model_type="embedding")
+            self._embedding_model = self._get_and_validate("EMBEDDING_MODEL", Embeddings, model_type="embedding")
         return self._embedding_model
 
+    async def aiter_embedding_batches(
+            self,
+            texts: List[str],
+            batch_size: Optional[int] = None,
+            concurrency: Optional[int] = None
+        ) -> AsyncIterator[Tuple[int, np.ndarray]]:
+        """Embed a large list of texts in provider-sized batches, yielding each batch as it finishes.
+        Up to `concurrency` batches are in flight at once; the provider request limiter still applies.
+        Args:
+            texts (List[str]): The texts to embed.
+            batch_size (Optional[int]): Texts per request, defaults to `MODEL_EMBEDDING_BATCH_SIZE`.
+            concurrency (Optional[int]): Concurrent requests, defaults to `MODEL_EMBEDDING_CONCURRENCY`.
+        Yields:
+            Tuple[int, np.ndarray]: The index of the first text of the batch and its float32 vectors, in completion order.
+        """
+        batch_size = max(1, batch_size or self.model_config.EMBEDDING_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.model_config.EMBEDDING_CONCURRENCY))
+        embedding_llm = self.embedding_llm
+
+        async def _embed(start: int) -> Tuple[int, np.ndarray]:
+            async with semaphore:
+                batch = texts[start:start + batch_size]
+                if isinstance(embedding_llm, OpenAIEmbeddings):
+                    vectors = await embedding_llm.aembed_documents(batch, chunk_size=len(batch))
+                else:
+                    vectors = await embedding_llm.aembed_documents(batch)
+                return start, np.asarray(vectors, dtype=np.float32)
+
+        tasks = [asyncio.create_task(_embed(start)) for start in range(0, len(texts), batch_size)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def aembed_documents(
+            self,
+            texts: List[str],
+            batch_size: Optional[int] = None,
+            concurrency: Optional[int] = None
+        ) -> np.ndarray:
+        """Embed a large list of texts, see `aiter_embedding_batches`.
+        Returns:
+            np.ndarray: A float32 matrix with one row per text, in input order.
+        """
+        vectors: Optional[np.ndarray] = None
+        async for start, batch in self.aiter_embedding_batches(texts, batch_size, concurrency):
+            if vectors is None:
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[start:start + len(batch)] = batch
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    @staticmethod
+    def _timed_chat(chat_llm: BaseChatModel) -> Runnable[str, ChatBatchItem]:
+        """Wrap a chat model so each prompt returns its reply or error together with its own latency."""
+        async def _invoke(prompt: str) -> ChatBatchItem:
+            start = time.perf_counter()
+            try:
+                return await chat_llm.ainvoke(prompt), time.perf_counter() - start
+            except Exception as e:
+                return e, time.perf_counter() - start
+
+        return RunnableLambda(_invoke)
+
+    async def abatch_chat(
+            self,
+            chat_llm: BaseChatModel,
+            prompts: List[str],
+            concurrency: Optional[int] = None
+        ) -> List[ChatBatchItem]:
+        """Run a list of prompts through `abatch` with bounded concurrency.
+        A failed prompt does not fail the batch, its item holds the exception instead.
+        Args:
+            chat_llm (BaseChatModel): The chat model.
+            prompts (List[str]): The prompts.
+            concurrency (Optional[int]): Concurrent requests, defaults to `MODEL_CHAT_BATCH_CONCURRENCY`.
+        Returns:
+            List[ChatBatchItem]: The reply or error and the latency of each prompt, in input order.
+        """
+        max_concurrency = max(1, concurrency or self.model_config.CHAT_BATCH_CONCURRENCY)
+        return await self._timed_chat(chat_llm).abatch(prompts, config={"max_concurrency": max_concurrency})
+
+    async def aiter_chat_batch(
+            self,
+            chat_llm: BaseChatModel,
+            prompts: List[str],
+            concurrency: Optional[int] = None
+        ) -> AsyncIterator[Tuple[int, ChatBatchItem]]:
+        """Like `abatch_chat`, but yield each prompt as soon as its reply arrives.
+        Yields:
+            Tuple[int, ChatBatchItem]: The index of the prompt and its reply or error and latency, in completion order.
+        """
+        max_concurrency = max(1, concurrency or self.model_config.CHAT_BATCH_CONCURRENCY)
+        async for index, item in self._timed_chat(chat_llm).abatch_as_completed(prompts, config={"max_concurrency": max_concurrency}):
+            yield index, item
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Get the client cache and connection pool statistics of the provider."""
+        return self._ensure_provider().pool_stats()
 
-    
\ No newline at end of file
+    def limiter_stats(self) -> Dict[str, Any]:
+        """Get the request limiter statistics of the provider."""
+        return self._ensure_provider().limiter_stats()
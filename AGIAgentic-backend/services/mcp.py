@@ -1,6 +1,6 @@
 
 
-from typing import Any
+from typing import Any, List
 
 
 class MCPService:
@@ -16,7 +16,12 @@ class MCPService:
 
   def __init__(self):
     """ Initialize MCPService """
+    if getattr(self, "_initialized", False):
+      return
     self._mcp_tools = None
+    # bumped every time the MCP tool catalog changes
+    self._version = 0
+    self._initialized = True
 
   @property
   def mcp_tools(self) -> list[Any]:
@@ -24,4 +29,20 @@ class MCPService:
     if self._mcp_tools is None:
       from main import app  # delayed import to avoid circular import at module load
       self._mcp_tools = getattr(app.state, "mcp_tools", [])
-    return self._mcp_tools
\ No newline at end of file
+    return self._mcp_tools
+
+  @property
+  def version(self) -> int:
+    """ Get the MCP tool catalog version """
+    return self._version
+
+  def update_mcp_tools(self, mcp_tools: List[Any]) -> int:
+    """ Replace the MCP tool catalog and bump its version
+    Args:
+        mcp_tools (List[Any]): The new MCP tools.
+    Returns:
+        int: The new catalog version.
+    """
+    self._mcp_tools = list(mcp_tools)
+    self._version += 1
+    return self._version
@@ -0,0 +1,104 @@
+
+
+import re
+import copy
+import unicodedata
+
+from typing import Any, Dict, Optional, Tuple
+
+from common.cache import LRUTTLCache
+from common.logger import logger
+from conf.config import config_manager
+from services.tool import tool_catalog_version
+from prompts.plan_executor_prompt import PLANNING_PROMPT_VERSION
+
+
+# trailing punctuation that does not change the meaning of a task
+_TRAILING_PUNCTUATION = "?!.~。？！～…"
+
+
+def normalize_task(user_task: str) -> str:
+  """ Normalize a user task for exact matching
+  Full-width characters are folded to their half-width form, case and whitespace are
+  normalized and trailing punctuation is dropped, so "现在几点了？" matches "现在几点了".
+  Args:
+      user_task (str): The raw user task.
+  Returns:
+      str: The normalized task.
+  """
+  task = unicodedata.normalize("NFKC", user_task or "").casefold()
+  task = re.sub(r"\s+", " ", task).strip()
+  return task.rstrip(_TRAILING_PUNCTUATION + " ")
+
+
+class PlanCache:
+  """ Exact-match cache of execution plans
+  Plans are keyed by the normalized user task, the planning prompt version and the tool
+  catalog version, so a prompt or tool change never serves a stale plan.
+  """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize PlanCache """
+    if getattr(self, "_initialized", False):
+      return
+    cache_config = config_manager.cache_config
+    self._cache: LRUTTLCache[Dict[str, Any]] = LRUTTLCache(
+      max_size=cache_config.PLAN_CACHE_MAX_SIZE,
+      ttl=cache_config.PLAN_CACHE_TTL
+    )
+    self._initialized = True
+
+  @property
+  def enabled(self) -> bool:
+    """ Whether the plan cache is enabled """
+    return config_manager.cache_config.PLAN_CACHE_ENABLED
+
+  def _key(self, user_task: str) -> Tuple[str, str, str]:
+    return (normalize_task(user_task), PLANNING_PROMPT_VERSION, tool_catalog_version())
+
+  def get(self, user_task: str) -> Optional[Dict[str, Any]]:
+    """ Get the cached plan of a task
+    Args:
+        user_task (str): The user task.
+    Returns:
+        Optional[Dict[str, Any]]: A copy of the cached plan with `task_analysis` and `execution_plans`, or None.
+    """
+    if not self.enabled:
+      return None
+    plan = self._cache.get(self._key(user_task))
+    if plan is None:
+      return None
+    logger.info(f"Plan cache hit for task: {user_task}")
+    return copy.deepcopy(plan)
+
+  def put(self, user_task: str, plan: Dict[str, Any]) -> None:
+    """ Cache the plan of a task
+    Args:
+        user_task (str): The user task.
+        plan (Dict[str, Any]): The plan with `task_analysis` and `execution_plans`.
+    """
+    if not self.enabled:
+      return
+    self._cache.set(self._key(user_task), copy.deepcopy({
+      "task_analysis": plan.get("task_analysis", ""),
+      "execution_plans": plan.get("execution_plans", []),
+    }))
+
+  def clear(self) -> None:
+    """ Remove every cached plan """
+    self._cache.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get plan cache statistics """
+    return {"enabled": self.enabled, **self._cache.stats()}
+
+
+# Global plan cache instance
+plan_cache = PlanCache()
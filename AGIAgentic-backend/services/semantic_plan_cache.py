@@ -0,0 +1,290 @@
+
+
+import os
+import re
+import copy
+import json
+import time
+import difflib
+import threading
+
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from common.logger import logger
+from conf.config import config_manager
+from services.plan_cache import normalize_task
+from services.tool import tool_catalog_digest
+from prompts.plan_executor_prompt import PLANNING_PROMPT_VERSION
+
+
+# Words and characters that do not change what a task asks for
+_FILLER_WORDS = re.compile(r"帮我|帮忙|麻烦|请问|一下|能否|可以|我想|我要|please|pls|can you|could you")
+_FILLER_CHARS = re.compile(r"[\s,，、.。?？!！~～…:：;；\"'“”‘’的了吗呢吧啊呀请]")
+
+
+def _core(text: str) -> str:
+  return _FILLER_CHARS.sub("", _FILLER_WORDS.sub("", text))
+
+
+def _quoted(text: str, plan_text: str) -> bool:
+  """ Whether the plan quotes any part of a text, two characters at a time """
+  core = _core(text)
+  if len(core) <= 1:
+    return bool(core) and core in plan_text
+  return any(core[i:i + 2] in plan_text for i in range(len(core) - 1))
+
+
+def plan_fits_task(cached_task: str, plan: Dict[str, Any], user_task: str) -> bool:
+  """ Whether the plan of a cached task also carries out a similar task
+  Similar tasks often differ only in their entities, such as a city, a date or a file name,
+  which the plan steps spell out. The plan fits when every part of the cached task the new task
+  changes or drops is absent from the plan, and every part the new task adds is filler or
+  already in the plan.
+  Args:
+      cached_task (str): The task the plan was made for.
+      plan (Dict[str, Any]): The cached plan.
+      user_task (str): The new task.
+  Returns:
+      bool: True when the plan can be reused as is.
+  """
+  cached, task = normalize_task(cached_task), normalize_task(user_task)
+  plan_text = normalize_task(json.dumps(plan, ensure_ascii=False))
+  for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, cached, task, autojunk=False).get_opcodes():
+    if tag == "equal":
+      continue
+    if _quoted(cached[i1:i2], plan_text):
+      return False
+    added = _core(task[j1:j2])
+    if added and added not in plan_text:
+      return False
+  return True
+
+
+class SemanticPlanCache:
+  """ Semantic cache of execution plans
+  User tasks are embedded and kept as unit vectors in one float32 matrix, so a lookup is a
+  single matrix product. A task whose cosine similarity to a cached task reaches the
+  threshold reuses that task's plan when both name the same entities, see `plan_fits_task`.
+  Only entries created under the current planning prompt version and tool catalog can match,
+  the catalog is identified by a content digest so snapshot entries of another tool set never
+  match after a restart.
+  """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize SemanticPlanCache """
+    if getattr(self, "_initialized", False):
+      return
+    cache_config = config_manager.cache_config
+    self.capacity = max(1, cache_config.SEMANTIC_CACHE_CAPACITY)
+    self.threshold = cache_config.SEMANTIC_CACHE_THRESHOLD
+    self._lock = threading.Lock()
+    # vectors are allocated on the first insert, once the embedding dimension is known
+    self._vectors: Optional[np.ndarray] = None
+    self._last_used = np.zeros(self.capacity, dtype=np.float64)
+    self._version_ids = np.full(self.capacity, -1, dtype=np.int64)
+    self._entries: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+    self._versions: Dict[Tuple[str, str], int] = {}
+    self._size = 0
+    self._hits = 0
+    self._misses = 0
+    self._insertions = 0
+    self._evictions = 0
+    self._errors = 0
+    self._entity_mismatches = 0
+    self._initialized = True
+
+  @property
+  def enabled(self) -> bool:
+    """ Whether the semantic plan cache is enabled """
+    return config_manager.cache_config.SEMANTIC_CACHE_ENABLED
+
+  def _version_id(self) -> int:
+    version = (PLANNING_PROMPT_VERSION, tool_catalog_digest())
+    if version not in self._versions:
+      self._versions[version] = len(self._versions)
+    return self._versions[version]
+
+  @staticmethod
+  def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+  def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Find the most similar cached entry for a batch of query vectors
+    Args:
+        queries (np.ndarray): Query vectors of shape (n, dim) or (dim,).
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Best slot index and cosine similarity per query, index -1 when nothing matches.
+    """
+    queries = self._normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+    if self._vectors is None or self._size == 0 or queries.shape[1] != self._vectors.shape[1]:
+      return np.full(len(queries), -1), np.zeros(len(queries), dtype=np.float32)
+    similarities = queries @ self._vectors[:self._size].T
+    # Entries of another prompt or tool catalog version never match
+    similarities[:, self._version_ids[:self._size] != self._version_id()] = -np.inf
+    best = np.argmax(similarities, axis=1)
+    scores = similarities[np.arange(len(queries)), best]
+    best = np.where(np.isfinite(scores), best, -1)
+    return best, np.where(np.isfinite(scores), scores, 0.0).astype(np.float32)
+
+  async def lookup(self, user_task: str, embeddings: Any) -> Tuple[Optional[Dict[str, Any]], float, Optional[np.ndarray]]:
+    """ Look up the plan of a semantically similar task
+    Args:
+        user_task (str): The user task.
+        embeddings (Any): The embedding model used to embed the task.
+    Returns:
+        Tuple[Optional[Dict[str, Any]], float, Optional[np.ndarray]]: A copy of the matched plan or None,
+        the similarity of the best match, and the task vector to reuse for `insert`.
+    """
+    if not self.enabled:
+      return None, 0.0, None
+    try:
+      vector = np.asarray(await embeddings.aembed_query(normalize_task(user_task)), dtype=np.float32)
+    except Exception as e:
+      self._errors += 1
+      logger.error(f"Error embedding task for the semantic plan cache: {e}")
+      return None, 0.0, None
+
+    with self._lock:
+      indices, scores = self.search(vector)
+      index, score = int(indices[0]), float(scores[0])
+      if index < 0 or score < self.threshold:
+        self._misses += 1
+        return None, score, vector
+      entry = self._entries[index]
+      if not plan_fits_task(entry["user_task"], entry["plan"], user_task): # type: ignore
+        self._misses += 1
+        self._entity_mismatches += 1
+        logger.debug(f"Semantic plan cache entry of task {entry['user_task']} does not fit task {user_task}, similarity: {score:.4f}") # type: ignore
+        return None, score, vector
+      self._hits += 1
+      self._last_used[index] = time.time()
+    logger.info(f"Semantic plan cache hit for task: {user_task}, similarity: {score:.4f}, cached task: {entry['user_task']}") # type: ignore
+    return copy.deepcopy(entry["plan"]), score, vector # type: ignore
+
+  def insert(self, user_task: str, vector: Optional[np.ndarray], plan: Dict[str, Any]) -> None:
+    """ Cache the plan of a task, evicting the least recently used entry when full
+    Args:
+        user_task (str): The user task.
+        vector (Optional[np.ndarray]): The task vector returned by `lookup`.
+        plan (Dict[str, Any]): The plan with `task_analysis` and `execution_plans`.
+    """
+    if not self.enabled or vector is None:
+      return
+    with self._lock:
+      vector = self._normalize(np.asarray(vector, dtype=np.float32))
+      if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+        # first insert, or the embedding model changed its dimension
+        self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        self._entries = [None] * self.capacity
+        self._size = 0
+      if self._size < self.capacity:
+        index = self._size
+        self._size += 1
+      else:
+        index = int(np.argmin(self._last_used[:self._size]))
+        self._evictions += 1
+      self._vectors[index] = vector
+      self._last_used[index] = time.time()
+      self._version_ids[index] = self._version_id()
+      self._entries[index] = {
+        "user_task": user_task,
+        "plan": copy.deepcopy({
+          "task_analysis": plan.get("task_analysis", ""),
+          "execution_plans": plan.get("execution_plans", []),
+        }),
+      }
+      self._insertions += 1
+
+  def save_snapshot(self, path: Optional[str] = None) -> None:
+    """ Persist the cache to a snapshot file
+    Args:
+        path (Optional[str]): Snapshot path, defaults to `CACHE_SEMANTIC_CACHE_SNAPSHOT`.
+    """
+    path = path or config_manager.cache_config.SEMANTIC_CACHE_SNAPSHOT
+    if not path or self._vectors is None or self._size == 0:
+      return
+    with self._lock:
+      versions = {version_id: list(version) for version, version_id in self._versions.items()}
+      meta = json.dumps({
+        "entries": self._entries[:self._size],
+        "versions": [versions.get(int(version_id)) for version_id in self._version_ids[:self._size]],
+      }, ensure_ascii=False)
+      os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+      tmp_path = f"{path}.tmp.npz"
+      np.savez_compressed(tmp_path, vectors=self._vectors[:self._size], last_used=self._last_used[:self._size], meta=np.array(meta))
+      os.replace(tmp_path, path)
+    logger.info(f"Saved {self._size} semantic plan cache entries to {path}")
+
+  def load_snapshot(self, path: Optional[str] = None) -> int:
+    """ Load the cache from a snapshot file
+    Args:
+        path (Optional[str]): Snapshot path, defaults to `CACHE_SEMANTIC_CACHE_SNAPSHOT`.
+    Returns:
+        int: The number of loaded entries.
+    """
+    path = path or config_manager.cache_config.SEMANTIC_CACHE_SNAPSHOT
+    if not path or not os.path.exists(path):
+      return 0
+    try:
+      with np.load(path) as snapshot:
+        vectors = snapshot["vectors"]
+        last_used = snapshot["last_used"]
+        meta = json.loads(str(snapshot["meta"]))
+    except Exception as e:
+      logger.error(f"Error loading semantic plan cache snapshot {path}: {e}")
+      return 0
+
+    with self._lock:
+      # Keep the most recently used entries when the snapshot exceeds the capacity
+      order = np.argsort(-last_used)[:self.capacity]
+      self._vectors = np.zeros((self.capacity, vectors.shape[1]), dtype=np.float32)
+      self._entries = [None] * self.capacity
+      for index, source in enumerate(order):
+        version = tuple(meta["versions"][source] or ("", ""))
+        if version not in self._versions:
+          self._versions[version] = len(self._versions) # type: ignore
+        self._vectors[index] = vectors[source]
+        self._last_used[index] = last_used[source]
+        self._version_ids[index] = self._versions[version] # type: ignore
+        self._entries[index] = meta["entries"][source]
+      self._size = len(order)
+    logger.info(f"Loaded {self._size} semantic plan cache entries from {path}")
+    return self._size
+
+  def clear(self) -> None:
+    """ Remove every cached plan """
+    with self._lock:
+      self._vectors = None
+      self._entries = [None] * self.capacity
+      self._size = 0
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get semantic plan cache statistics """
+    lookups = self._hits + self._misses
+    return {
+      "enabled": self.enabled,
+      "size": self._size,
+      "capacity": self.capacity,
+      "threshold": self.threshold,
+      "hits": self._hits,
+      "misses": self._misses,
+      "insertions": self._insertions,
+      "evictions": self._evictions,
+      "errors": self._errors,
+      "entity_mismatches": self._entity_mismatches,
+      "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+# Global semantic plan cache instance
+semantic_plan_cache = SemanticPlanCache()
@@ -1,7 +1,13 @@
 
 
+import json
+import hashlib
+
+from typing import Any, Dict, List
 from langchain.tools import BaseTool
 
+from services.mcp import MCPService
+
 
 class ToolService:
     
@@ -13,7 +19,12 @@ class ToolService:
         return cls._instance
     
     def __init__(self):
+        if getattr(self, "_initialized", False):
+            return
         self._local_tools = None
+        # bumped every time the local tool catalog changes
+        self._version = 0
+        self._initialized = True
 
     @property
     def local_tools(self) -> list[BaseTool]:
@@ -21,4 +32,53 @@ class ToolService:
         from main import app  # delayed import to avoid circular import at module load
         if self._local_tools is None:
             self._local_tools = getattr(app.state, "local_tools", [])
-        return self._local_tools
\ No newline at end of file
+        return self._local_tools
+
+    @property
+    def version(self) -> int:
+        """ Get the local tool catalog version"""
+        return self._version
+
+    def update_local_tools(self, local_tools: List[Any]) -> int:
+        """ Replace the local tool catalog and bump its version
+        Args:
+            local_tools (List[Any]): The new local tools.
+        Returns:
+            int: The new catalog version.
+        """
+        self._local_tools = list(local_tools)
+        self._version += 1
+        return self._version
+
+
+def tool_catalog_version() -> str:
+    """ Get the version of the combined local and MCP tool catalog
+    Returns:
+        str: A version string that changes whenever either catalog changes.
+    """
+    return f"{ToolService().version}.{MCPService().version}"
+
+
+# Digest of the tool catalog by catalog version, only the latest version is kept
+_catalog_digests: Dict[str, str] = {}
+
+
+def tool_catalog_digest() -> str:
+    """ Get a content digest of the combined local and MCP tool catalog
+    Unlike `tool_catalog_version`, which counts changes in this process, the digest is the same
+    across restarts for the same tools, so it can be persisted.
+    Returns:
+        str: A hash of the sorted tool names and argument schemas.
+    """
+    global _catalog_digests
+    version = tool_catalog_version()
+    digest = _catalog_digests.get(version)
+    if digest is None:
+        tools = [*ToolService().local_tools, *MCPService().mcp_tools]
+        payload = json.dumps(
+            sorted(([tool.name, tool.args] for tool in tools), key=lambda item: item[0]),
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        _catalog_digests = {version: digest}
+    return digest
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The settings require a provider key, tests never call the provider
+os.environ.setdefault("MODEL_ZHIPU_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+import asyncio
+
+from conf.config import config_manager
+from services.admission import PlanAdmission
+
+
+def _fresh_admission(monkeypatch, max_active: int, queue_timeout: float) -> PlanAdmission:
+    monkeypatch.setattr(config_manager.agent_config, "MAX_ACTIVE_PLANS", max_active)
+    monkeypatch.setattr(config_manager.agent_config, "MAX_QUEUED_PLANS", 4)
+    monkeypatch.setattr(config_manager.agent_config, "PLAN_QUEUE_TIMEOUT", queue_timeout)
+    monkeypatch.setattr(PlanAdmission, "_instance", None)
+    return PlanAdmission()
+
+
+def test_wait_turn_sees_slot_freed_while_position_is_handled(monkeypatch):
+    """ A leave() while the consumer handles a queue position must admit the waiting plan right away """
+    admission = _fresh_admission(monkeypatch, max_active=1, queue_timeout=3.0)
+
+    async def scenario() -> float:
+        first = admission.try_enter()
+        second = admission.try_enter()
+        assert first is not None and first.admitted
+        assert second is not None and not second.admitted
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        positions = []
+        async for position in admission.wait_turn(second):
+            positions.append(position)
+            # the slot is freed while the consumer still handles the position, e.g. sends the SSE event
+            admission.leave(first)
+            await asyncio.sleep(0)
+        assert positions == [1]
+        assert second.admitted
+        return loop.time() - start
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 1.0)) < 0.5
+
+
+def test_wait_turn_without_queue_timeout_does_not_hang(monkeypatch):
+    """ With no queue timeout a lost wake-up would block forever """
+    admission = _fresh_admission(monkeypatch, max_active=1, queue_timeout=0)
+
+    async def scenario() -> None:
+        first = admission.try_enter()
+        second = admission.try_enter()
+        async for _ in admission.wait_turn(second):
+            admission.leave(first)
+        assert second.admitted
+
+    asyncio.run(asyncio.wait_for(scenario(), 1.0))
+
+
+def test_wait_turn_times_out_in_queue(monkeypatch):
+    admission = _fresh_admission(monkeypatch, max_active=1, queue_timeout=0.05)
+
+    async def scenario() -> None:
+        admission.try_enter()
+        second = admission.try_enter()
+        try:
+            async for _ in admission.wait_turn(second):
+                pass
+        except asyncio.TimeoutError:
+            return
+        raise AssertionError("expected a queue timeout")
+
+    asyncio.run(scenario())
@@ -0,0 +1,91 @@
+import time
+import asyncio
+
+import pytest
+
+from conf.config import config_manager
+from llms.hedging import LLMHedger, latency_tracker
+from llms.providers.mock import MockChatModel
+
+
+def _hedger(monkeypatch, name: str) -> LLMHedger:
+    """ A fresh hedger that hedges `name` after 0.05s """
+    agent_config = config_manager.agent_config
+    monkeypatch.setattr(agent_config, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(agent_config, "HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(agent_config, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(agent_config, "HEDGE_PERCENTILE", 0.5)
+    monkeypatch.setattr(agent_config, "HEDGE_BUDGET", 1.0)
+    monkeypatch.setattr(config_manager.model_config, "MOCK_LATENCY_DISTRIBUTION", "fixed")
+    monkeypatch.setattr(LLMHedger, "_instance", None)
+    latency_tracker.record(name, 0.05)
+    return LLMHedger()
+
+
+def _slow_then_fast():
+    """ The first call is stuck for 2s, the hedge answers right away """
+    return iter([MockChatModel(model_name="slow", rules=[], latency=2.0), MockChatModel(model_name="fast", rules=[], latency=0.0)])
+
+
+def test_slow_invoke_is_answered_by_the_hedge(monkeypatch):
+    hedger = _hedger(monkeypatch, "test_invoke")
+    models = _slow_then_fast()
+
+    async def scenario():
+        return await hedger.invoke("test_invoke", lambda: next(models).ainvoke("hi"))
+
+    start = time.monotonic()
+    message = asyncio.run(scenario())
+    assert message.content == "[fast]"
+    assert time.monotonic() - start < 1.0
+    assert hedger.stats()["hedges"] == 1
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_hedged_stream_is_read_in_one_task(monkeypatch):
+    hedger = _hedger(monkeypatch, "test_stream")
+    models = _slow_then_fast()
+    readers = {}
+    closed = []
+
+    def call():
+        model = next(models)
+
+        async def stream():
+            try:
+                async for chunk in model.astream("hi"):
+                    readers.setdefault(model.model_name, set()).add(asyncio.current_task())
+                    yield chunk
+            finally:
+                closed.append(model.model_name)
+
+        return stream()
+
+    async def scenario():
+        return "".join([str(chunk.content) async for chunk in hedger.stream("test_stream", call)])
+
+    start = time.monotonic()
+    assert asyncio.run(scenario()) == "[fast]"
+    assert time.monotonic() - start < 1.0
+    assert len(readers["fast"]) == 1
+    assert sorted(closed) == ["fast", "slow"]
+
+
+def test_hedged_stream_without_chunks_is_empty_and_errors_are_raised(monkeypatch):
+    hedger = _hedger(monkeypatch, "test_stream_end")
+
+    async def empty():
+        await asyncio.sleep(0.1)
+        return
+        yield
+
+    async def cut():
+        yield "partial"
+        raise ConnectionError("stream cut")
+
+    async def collect(call):
+        return [chunk async for chunk in hedger.stream("test_stream_end", call)]
+
+    assert asyncio.run(collect(empty)) == []
+    with pytest.raises(ConnectionError):
+        asyncio.run(collect(cut))
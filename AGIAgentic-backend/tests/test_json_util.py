@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from utils.json_util import JSONObjectScanner, json_match
+
+
+PLAN = {"task_analysis": "比较 {时区}", "execution_plans": [{"step": 1, "description": "say \"}{\" \\ done", "depends_on": []}]}
+
+CASES = [
+    ("clean", json.dumps(PLAN, ensure_ascii=False), PLAN),
+    ("fenced with prose", f"好的：\n```json\n{json.dumps(PLAN, ensure_ascii=False, indent=2)}\n```\n说明 {{谢谢}}", PLAN),
+    ("braces in prose", f"注意 {{时区}} 与 {{格式}}。\n{json.dumps(PLAN)}\n{{\"other\": 1}}", PLAN),
+    ("unterminated prefix", "{ 解释文字 " * 30 + '{"a": {"b": 1}}', {"a": {"b": 1}}),
+    ("run of opening braces", "{" * 500 + '{"a": 1}', {"a": 1}),
+    ("no json", "没有 JSON { 这不是 } 也不是 {", None),
+]
+
+
+def _chunked(text: str, size: int):
+    scanner = JSONObjectScanner()
+    for index in range(0, len(text), size):
+        if scanner.feed(text[index:index + size]) is not None:
+            break
+    return scanner.finish()
+
+
+@pytest.mark.parametrize("name,text,expected", CASES, ids=[case[0] for case in CASES])
+def test_scanner_finds_the_first_object(name, text, expected):
+    scanner = JSONObjectScanner()
+    assert (scanner.feed(text) or scanner.finish()) == expected
+
+
+@pytest.mark.parametrize("name,text,expected", CASES, ids=[case[0] for case in CASES])
+def test_chunked_feed_matches_the_whole_text(name, text, expected):
+    # chunk boundaries fall inside strings, escapes and runs of braces
+    for size in (1, 2, 3, 7, 16, 64):
+        assert _chunked(text, size) == expected, size
+
+
+def test_streamed_object_is_returned_as_soon_as_it_closes():
+    scanner = JSONObjectScanner()
+    assert scanner.feed('前言 {"a": "}", ') is None
+    assert scanner.feed('"b": 2}') == {"a": "}", "b": 2}
+    assert scanner.feed("后面的文字") == {"a": "}", "b": 2}
+
+
+def test_each_candidate_is_decoded_once(monkeypatch):
+    decoded = []
+    decode = JSONObjectScanner._decode
+
+    def counting_decode(self, start, end):
+        decoded.append((start, end))
+        return decode(self, start, end)
+
+    monkeypatch.setattr(JSONObjectScanner, "_decode", counting_decode)
+    # a balanced but invalid candidate with deeply nested objects: no nested span is decoded again
+    text = "{x " * 400 + "}" * 400
+    assert _chunked(text, 16) is None
+    assert len(decoded) == 1
+    # an unterminated candidate: only its outermost closed objects are decoded, once each
+    decoded.clear()
+    text = "{ 解释 " + '{"a": {"b": {}}} ' * 50
+    assert _chunked(text, 16) == {"a": {"b": {}}}
+    assert len(decoded) == 1
+
+
+def test_json_match_returns_an_empty_dict_without_json():
+    assert json_match("没有 JSON") == {}
@@ -0,0 +1,54 @@
+import json
+import asyncio
+
+import httpx
+
+from conf.config import config_manager
+from llms.limiter import ProviderLimiter, RateLimitedTransport, reported_tokens
+from llms.providers.zhipu import ZhipuProvider
+
+
+def _client(monkeypatch, handler) -> "tuple[httpx.AsyncClient, ProviderLimiter]":
+    monkeypatch.setattr(config_manager.model_config, "LIMIT_TPM", 60000.0)
+    monkeypatch.setattr(config_manager.model_config, "RATE_LIMIT_BACKOFF", 0.01)
+    limiter = ProviderLimiter("test")
+    return httpx.AsyncClient(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter)), limiter
+
+
+def _request(client: httpx.AsyncClient) -> httpx.Response:
+    async def send() -> httpx.Response:
+        response = await client.post("https://llm.test/chat/completions", json={"model": "m", "messages": [], "max_tokens": 5000})
+        await response.aclose()
+        return response
+    return asyncio.run(send())
+
+
+def test_token_bucket_is_settled_with_the_reported_usage(monkeypatch):
+    client, limiter = _client(monkeypatch, lambda request: httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 120}}))
+    _request(client)
+    stats = limiter.for_model("m").stats()
+    assert stats["usage_reports"] == 1
+    assert stats["overestimated_tokens"] > 4000
+    # only the reported tokens stay taken, give or take the refill
+    assert limiter.for_model("m")._tokens.level >= 60000.0 - 120
+
+
+def test_rate_limited_attempt_gives_its_tokens_back(monkeypatch):
+    answers = iter([httpx.Response(429, headers={"retry-after": "0"}), httpx.Response(200, json={"usage": {"prompt_tokens": 50, "completion_tokens": 30}})])
+    client, limiter = _client(monkeypatch, lambda request: next(answers))
+    assert _request(client).status_code == 200
+    stats = limiter.for_model("m").stats()
+    assert stats["retries"] == 1
+    assert limiter.for_model("m")._tokens.level >= 60000.0 - 80
+
+
+def test_clients_behind_the_limiter_do_not_retry_on_their_own(monkeypatch):
+    monkeypatch.setattr(config_manager.model_config, "LIMITER_ENABLED", True)
+    assert ZhipuProvider().get_llm("glm-4-plus").max_retries == 0
+
+
+def test_usage_is_read_from_the_last_event_of_a_stream():
+    events = [{"choices": [{"delta": {"content": "hi"}}], "usage": None}, {"choices": [], "usage": {"total_tokens": 42}}]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    assert reported_tokens(body.encode()) == 42
+    assert reported_tokens(b'data: {"choices": []}\n\n') == 0
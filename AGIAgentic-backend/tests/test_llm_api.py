@@ -0,0 +1,21 @@
+import asyncio
+
+from api import llm_api
+from api.schemas.llm import ChatBatchReqSchema, EmbeddingBatchReqSchema
+
+
+def test_chat_batch_unknown_provider_is_not_found():
+    response = asyncio.run(llm_api.chat_batch("no-such-provider", "simple", ChatBatchReqSchema(prompts=["hi"])))
+    assert response.status_code == 404
+    assert b"no-such-provider" in response.body
+
+
+def test_embedding_batch_unknown_provider_is_not_found():
+    for stream in (False, True):
+        response = asyncio.run(llm_api.embed_batch("no-such-provider", EmbeddingBatchReqSchema(texts=["hi"], stream=stream)))
+        assert response.status_code == 404
+
+
+def test_unknown_provider_leaves_no_service_behind():
+    asyncio.run(llm_api.chat_batch("random-path-segment", "simple", ChatBatchReqSchema(prompts=["hi"])))
+    assert "random-path-segment" not in llm_api.LLMService._instances
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, INVALID_PARAMS, ErrorData
+
+from _mcp.pool import PooledSession, ServerSessionPool
+
+
+def _pool(monkeypatch) -> ServerSessionPool:
+    pool = ServerSessionPool("stand-in", {"transport": "stdio", "command": "true", "args": []})
+
+    async def _open() -> PooledSession:
+        pooled = PooledSession("stand-in")
+        pooled.session = object() # type: ignore
+        pool._opened += 1
+        return pooled
+
+    monkeypatch.setattr(pool, "_open", _open)
+    return pool
+
+
+def _fail_borrowed(pool: ServerSessionPool, error: BaseException) -> None:
+    async def scenario() -> None:
+        with pytest.raises(type(error)):
+            async with pool.session():
+                raise error
+    asyncio.run(scenario())
+
+
+def test_json_rpc_error_returns_the_session_to_the_pool(monkeypatch):
+    pool = _pool(monkeypatch)
+    _fail_borrowed(pool, McpError(ErrorData(code=INVALID_PARAMS, message="Unknown tool")))
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["size"] == 1
+
+
+@pytest.mark.parametrize("error", [
+    McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")),
+    ConnectionError("reset"),
+    asyncio.TimeoutError(),
+])
+def test_transport_error_closes_the_session(monkeypatch, error):
+    pool = _pool(monkeypatch)
+    _fail_borrowed(pool, error)
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["size"] == 0
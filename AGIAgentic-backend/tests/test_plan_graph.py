@@ -0,0 +1,123 @@
+import asyncio
+
+from conf.config import config_manager
+from conf.setting import AgentSettings
+from graph import plan_graph
+from services.plan_cache import plan_cache
+
+
+def _graph() -> plan_graph.PlanExecutionGraph:
+    """ A plan graph without models, tools or compiled workflow, for driving its nodes directly """
+    graph = plan_graph.PlanExecutionGraph.__new__(plan_graph.PlanExecutionGraph)
+    graph.embedding_llm = None
+    return graph
+
+
+def test_stream_planning_is_off_by_default_with_checkpoints():
+    assert AgentSettings(CHECKPOINTER="sqlite").STREAM_PLANNING is False
+    assert AgentSettings(CHECKPOINTER="none").STREAM_PLANNING is True
+    assert AgentSettings(CHECKPOINTER="sqlite", STREAM_PLANNING=True).STREAM_PLANNING is True
+
+
+def test_repaired_plan_is_not_cached(monkeypatch):
+    monkeypatch.setattr(config_manager.agent_config, "STREAM_PLANNING", False)
+    graph = _graph()
+    plans = {
+        "valid": {"task_analysis": "", "execution_plans": [{"step": 1, "description": "完整计划"}]},
+        "repaired": {"task_analysis": "", "execution_plans": [{"step": 1, "description": "截断后留下的步骤"}]},
+    }
+
+    for outcome, plan in plans.items():
+        async def generate_plan(messages, first_attempt=0, plan=plan, outcome=outcome):
+            return dict(plan), outcome
+
+        monkeypatch.setattr(graph, "_generate_plan", generate_plan)
+        user_task = f"{outcome} plan task"
+        state = asyncio.run(graph._analyze_and_plan({"user_task": user_task, "timing_info": {}}))
+        assert state["execution_plans"] == plan["execution_plans"]
+        assert (plan_cache.get(user_task) is not None) == (outcome == "valid")
+
+
+def _schedule(monkeypatch, steps, failing=(), late=()):
+    """ Run the scheduler on steps put straight on its queue
+    Args:
+        steps: the steps, as (step number, dependencies) or step dicts
+        failing: step numbers whose execution fails
+        late: steps put on the queue only after the first step ran
+    Returns:
+        the results by step number and the executed steps in start order
+    """
+    monkeypatch.setattr(config_manager.agent_config, "STEP_RETRIES", 0)
+    graph = _graph()
+    executed = []
+
+    async def do_execute(step, dependency_results=[]):
+        executed.append(step)
+        await asyncio.sleep(0.01)
+        status = "failed" if step["step"] in failing else "completed"
+        return {"step": step["step"], "execution_result": step.get("description", ""), "status": status, "timing": {}}
+
+    async def process_execution_result(execution_result):
+        return None
+
+    monkeypatch.setattr(graph, "_do_execute", do_execute)
+    monkeypatch.setattr(graph, "_process_execution_result", process_execution_result)
+
+    def _step(step):
+        return step if isinstance(step, dict) else {"step": step[0], "description": "", "depends_on": list(step[1])}
+
+    async def scenario():
+        queue = asyncio.Queue()
+        for step in steps:
+            queue.put_nowait(_step(step))
+        if not late:
+            queue.put_nowait(None)
+        scheduler = asyncio.create_task(graph._schedule_steps(queue, {}))
+        if late:
+            while not executed:
+                await asyncio.sleep(0.001)
+            for step in late:
+                queue.put_nowait(_step(step))
+            queue.put_nowait(None)
+        return await asyncio.wait_for(scheduler, 5)
+
+    results = asyncio.run(scenario())
+    return {number: result["status"] for number, result in results.items()}, executed
+
+
+def test_scheduler_fails_a_dependency_cycle(monkeypatch):
+    statuses, executed = _schedule(monkeypatch, [(1, []), (2, [3]), (3, [2]), (4, [2])])
+    assert statuses == {1: "completed", 2: "failed", 3: "failed", 4: "failed"}
+    assert [step["step"] for step in executed] == [1]
+
+
+def test_scheduler_drops_dependencies_that_never_arrive(monkeypatch):
+    statuses, executed = _schedule(monkeypatch, [(1, [9]), (2, [1, 8])])
+    assert statuses == {1: "completed", 2: "completed"}
+    assert [step["step"] for step in executed] == [1, 2]
+
+
+def test_scheduler_waits_for_dependencies_planned_later(monkeypatch):
+    statuses, executed = _schedule(monkeypatch, [(1, []), (3, [2])], late=[(2, [1])])
+    assert statuses == {1: "completed", 2: "completed", 3: "completed"}
+    assert [step["step"] for step in executed] == [1, 2, 3]
+
+
+def test_scheduler_skips_every_step_behind_a_failure(monkeypatch):
+    statuses, executed = _schedule(monkeypatch, [(1, []), (2, [1]), (3, [2]), (4, [3]), (5, [])], failing={1})
+    assert statuses == {1: "failed", 2: "skipped", 3: "skipped", 4: "skipped", 5: "completed"}
+    assert sorted(step["step"] for step in executed) == [1, 5]
+
+
+def test_scheduler_runs_a_step_number_once(monkeypatch):
+    first = {"step": 1, "description": "first", "depends_on": []}
+    duplicate = {"step": 1, "description": "duplicate", "depends_on": []}
+    # the duplicate arrives while the first step is running
+    statuses, executed = _schedule(monkeypatch, [first, (2, [1])], late=[duplicate])
+    assert statuses == {1: "completed", 2: "completed"}
+    assert [step["description"] for step in executed] == ["first", ""]
+    # the duplicate arrives while the first step is pending
+    waiting = {"step": 1, "description": "first", "depends_on": [2]}
+    statuses, executed = _schedule(monkeypatch, [waiting, duplicate, (2, [])])
+    assert statuses == {1: "completed", 2: "completed"}
+    assert [step["description"] for step in executed] == ["", "first"]
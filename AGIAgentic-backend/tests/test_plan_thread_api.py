@@ -0,0 +1,74 @@
+import asyncio
+
+from types import SimpleNamespace
+
+from api import plan_executor_api
+from api.schemas.plan_executor import PlanThreadReqSchema
+from services.admission import plan_admission
+
+
+class _SlowGraph:
+    """ Stand-in plan graph whose checkpoint reads take a moment """
+
+    def __init__(self, finished: bool = False, retry_steps=None) -> None:
+        self.finished = finished
+        self.retry_steps = retry_steps or []
+        self.resets = 0
+
+    async def get_thread_state(self, thread_id: str):
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(next=() if self.finished else ("check_and_execute",), values={"status": "failed", "step_results": []})
+
+    async def reset_failed_steps(self, thread_id: str):
+        self.resets += 1
+        return self.retry_steps
+
+    async def chat_with_planning_stream(self, thread_id: str, resume: bool = False):
+        yield {"event": "thread", "data": {}}
+
+
+def _concurrent(endpoint, thread_id: str):
+    async def scenario():
+        return await asyncio.gather(*(endpoint(PlanThreadReqSchema(thread_id=thread_id)) for _ in range(2)))
+    return asyncio.run(scenario())
+
+
+def _release(thread_id: str) -> None:
+    """ Give back what the stream that never ran holds """
+    plan_executor_api._running_threads.discard(thread_id)
+    for ticket in list(plan_admission._queue):
+        plan_admission.leave(ticket)
+    plan_admission._active = 0
+
+
+def test_concurrent_resumes_of_a_thread_run_it_once(monkeypatch):
+    monkeypatch.setattr(plan_executor_api.graph_registry, "get_graph", lambda *_: _SlowGraph())
+    responses = _concurrent(plan_executor_api.resume_plan_execution, "resume-race")
+    assert sorted(getattr(response, "status_code", 200) for response in responses) == [200, 409]
+    _release("resume-race")
+
+
+def test_resume_releases_the_thread_when_it_cannot_run(monkeypatch):
+    monkeypatch.setattr(plan_executor_api.graph_registry, "get_graph", lambda *_: _SlowGraph(finished=True))
+    response = asyncio.run(plan_executor_api.resume_plan_execution(PlanThreadReqSchema(thread_id="resume-done")))
+    assert response.status_code == 409
+    assert "resume-done" not in plan_executor_api._running_threads
+
+
+def test_concurrent_retries_of_a_thread_reset_it_once(monkeypatch):
+    graph = _SlowGraph(finished=True, retry_steps=[2])
+    monkeypatch.setattr(plan_executor_api.graph_registry, "get_graph", lambda *_: graph)
+    responses = _concurrent(plan_executor_api.retry_plan_execution, "retry-race")
+    assert sorted(getattr(response, "status_code", 200) for response in responses) == [200, 409]
+    assert graph.resets == 1
+    _release("retry-race")
+
+
+def test_rejected_retry_leaves_the_checkpoint_alone(monkeypatch):
+    graph = _SlowGraph(finished=True, retry_steps=[2])
+    monkeypatch.setattr(plan_executor_api.graph_registry, "get_graph", lambda *_: graph)
+    monkeypatch.setattr(plan_admission, "try_enter", lambda: None)
+    response = asyncio.run(plan_executor_api.retry_plan_execution(PlanThreadReqSchema(thread_id="retry-full")))
+    assert response.status_code == 429
+    assert graph.resets == 0
+    assert "retry-full" not in plan_executor_api._running_threads
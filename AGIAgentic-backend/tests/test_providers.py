@@ -0,0 +1,10 @@
+from llms.providers.zhipu import ZhipuProvider
+
+
+def test_clients_with_unhashable_parameters_are_cached():
+    provider = ZhipuProvider()
+    kwargs = {"model_kwargs": {"do_sample": False}, "stop": ["Observation:"], "default_headers": {"X-Trace": "1"}}
+    llm = provider.get_llm("glm-4-plus", **kwargs)
+    assert provider.get_llm("glm-4-plus", **kwargs) is llm
+    assert provider.get_llm("glm-4-plus", stop=["Final:"]) is not llm
+    assert provider.pool_stats()["client_hits"] == 1
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from typing import Any, AsyncIterator, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+import llms
+
+from llms.routing import RoutedChatModel, RouteSelector
+from llms.providers.mock import MockChatModel
+
+
+class _CutStreamModel(BaseChatModel):
+    """ Streams one chunk, then loses the connection """
+
+    @property
+    def _llm_type(self) -> str:
+        return "cut-stream"
+
+    def _generate(self, messages: List[Any], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError
+
+    async def _astream(self, messages: List[Any], stop: Any = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        yield ChatGenerationChunk(message=AIMessageChunk(content="partial"))
+        raise ConnectionError("stream cut")
+
+
+def test_stream_failure_after_first_chunk_is_recorded():
+    """ A stream that breaks after its first chunk must count as a failure of the candidate that served it """
+    selector = RouteSelector()
+    model = RoutedChatModel(
+        model_name="router:simple", role="simple", candidates=[("mock/cut", _CutStreamModel())], selector=selector
+    )
+
+    async def consume() -> List[str]:
+        contents = []
+        async for chunk in model.astream([HumanMessage(content="hi")]):
+            contents.append(chunk.content)
+        return contents
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume())
+    health = selector.health("mock/cut")
+    assert health.calls == 1
+    assert health.failures == 1
+    assert health.consecutive_failures == 1
+    assert health.error_rate > 0.0
+
+
+def test_stream_success_is_recorded_once_it_ends():
+    selector = RouteSelector()
+    model = RoutedChatModel(
+        model_name="router:simple", role="simple", candidates=[("mock/ok", MockChatModel(model_name="ok", rules=[]))], selector=selector
+    )
+
+    async def consume() -> str:
+        contents = []
+        async for chunk in model.astream([HumanMessage(content="hi")]):
+            if not contents:
+                # the first chunk does not count as a success yet
+                assert selector.health("mock/ok").calls == 0
+            contents.append(chunk.content)
+        return "".join(contents)
+
+    assert asyncio.run(consume()) == "[ok]"
+    health = selector.health("mock/ok")
+    assert health.calls == 1
+    assert health.failures == 0
+
+
+def test_providers_are_registered_by_their_own_module(monkeypatch):
+    monkeypatch.setattr(llms, "PROVIDERS", ("llms.providers.mock.MockProvider", "llms.providers.router.RouterProvider"))
+    providers = llms.initialize_model_manager()
+    assert {name: type(provider).__name__ for name, provider in providers.items()} == {"mock": "MockProvider", "router": "RouterProvider"}
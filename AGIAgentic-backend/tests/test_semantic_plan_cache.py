@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+
+from langchain_core.tools import tool
+
+from conf.config import config_manager
+from services import tool as tool_service
+from services.mcp import MCPService
+from services.tool import ToolService
+from graph import plan_graph
+from services.plan_cache import plan_cache
+from services.semantic_plan_cache import SemanticPlanCache
+
+
+@tool
+def lookup_fact(query: str) -> str:
+    """ Look up a fact """
+    return query
+
+
+@tool
+def lookup_weather(city: str, day: int) -> str:
+    """ Look up the weather """
+    return city
+
+
+class _Embeddings:
+    async def aembed_query(self, text: str):
+        return [1.0, 0.0, 0.0]
+
+
+def _restart(monkeypatch, tools) -> SemanticPlanCache:
+    """ A fresh process: new cache instance, tool catalog counters back at 0 """
+    monkeypatch.setattr(config_manager.cache_config, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(SemanticPlanCache, "_instance", None)
+    monkeypatch.setattr(ToolService(), "_local_tools", list(tools))
+    monkeypatch.setattr(ToolService(), "_version", 0)
+    monkeypatch.setattr(MCPService(), "_mcp_tools", [])
+    monkeypatch.setattr(MCPService(), "_version", 0)
+    monkeypatch.setattr(tool_service, "_catalog_digests", {})
+    return SemanticPlanCache()
+
+
+def test_snapshot_entries_of_another_tool_set_do_not_match(monkeypatch, tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    plan = {"task_analysis": "", "execution_plans": [{"step": 1, "tool": "lookup_fact"}]}
+
+    cache = _restart(monkeypatch, [lookup_fact])
+    cache.insert("查天气", np.array([1.0, 0.0, 0.0]), plan)
+    cache.save_snapshot(path)
+
+    cache = _restart(monkeypatch, [lookup_weather])
+    assert cache.load_snapshot(path) == 1
+    matched, _, _ = asyncio.run(cache.lookup("查天气", _Embeddings()))
+    assert matched is None
+
+    cache = _restart(monkeypatch, [lookup_fact])
+    cache.load_snapshot(path)
+    matched, _, _ = asyncio.run(cache.lookup("查天气", _Embeddings()))
+    assert matched == plan
+
+
+def test_paraphrases_with_other_entities_do_not_share_a_plan(monkeypatch):
+    cache = _restart(monkeypatch, [lookup_weather])
+    plan = {"task_analysis": "", "execution_plans": [{"step": 1, "description": "查询北京明天的天气"}]}
+    # the embeddings see every task as the same, only the entity check tells them apart
+    cache.insert("查询北京明天的天气", np.array([1.0, 0.0, 0.0]), plan)
+
+    for other_task in ("查询上海明天的天气", "查询南京明天的天气", "查询北京后天的天气"):
+        matched, similarity, _ = asyncio.run(cache.lookup(other_task, _Embeddings()))
+        assert similarity >= cache.threshold
+        assert matched is None, other_task
+    matched, _, _ = asyncio.run(cache.lookup("帮我查询一下北京明天的天气？", _Embeddings()))
+    assert matched == plan
+
+
+def test_semantic_hit_is_not_promoted_to_the_exact_cache(monkeypatch):
+    cache = _restart(monkeypatch, [lookup_weather])
+    plan = {"task_analysis": "", "execution_plans": [{"step": 1, "description": "查询北京明天的天气"}]}
+    cache.insert("查询北京明天的天气", np.array([1.0, 0.0, 0.0]), plan)
+    monkeypatch.setattr(plan_graph, "semantic_plan_cache", cache)
+    graph = plan_graph.PlanExecutionGraph.__new__(plan_graph.PlanExecutionGraph)
+    graph.embedding_llm = _Embeddings()
+
+    state = asyncio.run(graph._analyze_and_plan({"user_task": "帮我查询北京明天的天气", "timing_info": {}}))
+    assert state["execution_plans"] == plan["execution_plans"]
+    assert plan_cache.get("帮我查询北京明天的天气") is None
@@ -0,0 +1,40 @@
+from langchain_core.tools import StructuredTool
+
+from conf.config import config_manager
+from services.mcp import MCPService
+from utils.tool.tool_cache import ToolResultCache, memoize_tool
+
+
+def _memoized_tool(monkeypatch, calls):
+    monkeypatch.setattr(config_manager.tools_config, "CACHE_ENABLED", True)
+    monkeypatch.setattr(ToolResultCache, "_instance", None)
+
+    def lookup_city(city: str) -> dict:
+        """ Look up a city """
+        calls.append(city)
+        return {"city": city, "tags": ["capital"]}
+
+    return memoize_tool(StructuredTool.from_function(lookup_city, metadata={"cache": {"ttl": 60}}))
+
+
+def test_cached_results_are_copies(monkeypatch):
+    calls = []
+    tool = _memoized_tool(monkeypatch, calls)
+    result = tool.invoke({"city": "北京"})
+    result["tags"].append("changed by the first caller")
+    cached = tool.invoke({"city": "北京"})
+    assert cached == {"city": "北京", "tags": ["capital"]}
+    cached["tags"].clear()
+    assert tool.invoke({"city": "北京"}) == {"city": "北京", "tags": ["capital"]}
+    assert calls == ["北京"]
+
+
+def test_catalog_refresh_invalidates_cached_results(monkeypatch):
+    calls = []
+    tool = _memoized_tool(monkeypatch, calls)
+    tool.invoke({"city": "北京"})
+    tool.invoke({"city": "北京"})
+    assert calls == ["北京"]
+    monkeypatch.setattr(MCPService(), "_version", MCPService().version + 1)
+    tool.invoke({"city": "北京"})
+    assert calls == ["北京", "北京"]
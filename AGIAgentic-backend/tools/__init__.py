@@ -8,6 +8,7 @@ from .time_tool import *
 from typing import Any, List
 from common.logger import logger
 from langchain.tools import BaseTool
+from utils.tool.tool_cache import memoize_tools
 
 
 def nitialize_tool_manager() -> List[Any]:
@@ -27,4 +28,5 @@ def nitialize_tool_manager() -> List[Any]:
                 tools.append(obj)
                 logger.info(f"Collected tool: {obj.name} from module: {module_name}")
     logger.info(f"Total tools collected: {len(tools)}")
-    return tools
\ No newline at end of file
+    # Wrap tools that opted into result caching through their metadata
+    return memoize_tools(tools)
\ No newline at end of file
@@ -64,6 +64,11 @@ def calculate_date_offset(days: int = 0, hours: int = 0, minutes: int = 0) -> st
     return new_time.strftime("%Y-%m-%d %H:%M:%S")
 
 
+# Results only change once per second, so identical calls within a second are served from the tool cache
+get_current_time.metadata = {"cache": {"ttl": 1.0, "key_args": ["timezone"]}}
+calculate_date_offset.metadata = {"cache": {"ttl": 1.0, "key_args": ["days", "hours", "minutes"]}}
+
+
 # Define the public API of the module
 __all__ = [
     "get_current_time",
@@ -4,7 +4,145 @@ import json
 import logging
 
 
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Characters that matter to a JSON structure scanner, everything else is skipped by the regex engine
+_OBJECT_STRUCTURE = re.compile(r'[{}"\\]\{*')
+_ARRAY_STRUCTURE = re.compile(r'[{}\[\]":\\]')
+
+_DECODER = json.JSONDecoder()
+
+
+class JSONObjectScanner:
+    """ Single-pass scanner that finds the first complete top-level JSON object in a text.
+    The scanner is brace and string aware and only visits structural characters, a run of braces
+    at a time, so it runs in linear time however chatty the text around the JSON is. Text can be
+    fed chunk by chunk as a model streams it; only the text of the open candidate is kept.
+    Every top-level candidate is decoded at most twice: by the C decoder when it opens, which
+    stops at the first error, and once more when it closes if its text was not complete yet.
+    When the text ends inside a candidate that never closes, such as after a stray brace in
+    prose, the outermost objects closed inside it are decoded once each.
+    """
+
+    def __init__(self) -> None:
+        # retained text, starting at the absolute offset `_offset`
+        self._chunks: List[str] = []
+        self._offset = 0
+        self._length = 0
+        # starts of the open objects, outermost first
+        self._starts: List[int] = []
+        # outermost objects closed inside the open candidate, in text order
+        self._closed: List[Tuple[int, int]] = []
+        # text length the decoder saw for the open candidate, a candidate closing within it is not decoded again
+        self._decoded_until = 0
+        self._in_string = False
+        self._escape_position = -1
+        self.result: Optional[Dict[str, Any]] = None
+
+    def _retained_text(self) -> str:
+        text = "".join(self._chunks)
+        self._chunks = [text]
+        return text
+
+    def _open_candidate(self, index: int) -> bool:
+        """ Try the C decoder on a new top-level candidate, the usual place of the JSON """
+        self._decoded_until = self._length
+        try:
+            value, _ = _DECODER.raw_decode(self._retained_text(), index - self._offset)
+        except json.JSONDecodeError:
+            return False
+        if isinstance(value, dict):
+            self.result = value  # type: ignore
+            return True
+        return False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """ Feed the next chunk of text
+        Args:
+            chunk (str): The new text.
+        Returns:
+            Optional[Dict[str, Any]]: The first complete object once found, None until then.
+        """
+        if self.result is not None:
+            return self.result
+        base = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        for match in _OBJECT_STRUCTURE.finditer(chunk):
+            index = base + match.start()
+            structure = match.group()
+            # a structural character followed by a run of opening braces, visited at once
+            end = index + len(structure)
+            if structure[0] == "{":
+                opening = index
+            else:
+                opening = index + 1
+                if structure[0] == "}":
+                    if self._close(index):
+                        return self.result
+                else:
+                    self._string_character(index, structure[0])
+            if opening < end and not self._in_string:
+                if not self._starts and self._open_candidate(opening):
+                    return self.result
+                self._starts.extend(range(opening, end))
+        if not self._starts:
+            # no open candidate, nothing fed so far is needed any more
+            self._chunks, self._offset = [], self._length
+        elif self._starts[0] > self._offset:
+            # forget the text before the open candidate
+            self._chunks = [self._retained_text()[self._starts[0] - self._offset:]]
+            self._offset = self._starts[0]
+        return None
+
+    def _string_character(self, index: int, char: str) -> None:
+        if self._in_string:
+            if index == self._escape_position:
+                return
+            if char == "\\":
+                self._escape_position = index + 1
+            elif char == '"':
+                self._in_string = False
+        elif char == '"':
+            # quotes only matter inside a candidate object
+            self._in_string = bool(self._starts)
+
+    def _close(self, index: int) -> bool:
+        """ Close the innermost open object, True once the first complete object is found """
+        if self._in_string or not self._starts:
+            return False
+        start = self._starts.pop()
+        if self._starts:
+            # keep only the outermost closed objects, the ones nested in this one are dropped
+            while self._closed and self._closed[-1][0] > start:
+                self._closed.pop()
+            self._closed.append((start, index + 1))
+            return False
+        self._closed = []
+        if index >= self._decoded_until:
+            self.result = self._decode(start, index + 1)
+        return self.result is not None
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """ Signal the end of the text and recover from an unterminated candidate
+        Returns:
+            Optional[Dict[str, Any]]: The first complete object, or None if the text holds none.
+        """
+        if self.result is not None or not self._starts:
+            return self.result
+        for start, end in self._closed:
+            self.result = self._decode(start, end)
+            if self.result is not None:
+                break
+        return self.result
+
+    def _decode(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(self._retained_text()[start - self._offset:end - self._offset])
+        except json.JSONDecodeError:
+            return None
+        return value if isinstance(value, dict) else None  # type: ignore
 
 
 def json_match(content: str) -> Dict[str, Any]:
@@ -16,43 +154,105 @@ def json_match(content: str) -> Dict[str, Any]:
     """
     if not content:
         return dict()
-    
+
     try:
         result_data = json.loads(content)
-        return result_data
+        if isinstance(result_data, dict):
+            return result_data  # type: ignore
     except json.JSONDecodeError:
         pass
-    
-    try:
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            result_data = json.loads(json_match.group())
-            return result_data
-    except json.JSONDecodeError:
-        pass
-    
-    try:
-        json_matches = re.findall(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', content, re.DOTALL)
-        for match in json_matches:
-            try:
-                result_data = json.loads(match)
-                return result_data
-            except json.JSONDecodeError:
+
+    scanner = JSONObjectScanner()
+    result_data = scanner.feed(content) or scanner.finish()
+    if result_data is not None:
+        return result_data
+
+    logging.error(f"JSON parsing failed, original content: {content[:200]}...")
+    return dict()
+
+
+class StreamingArrayParser:
+    """ Incremental parser that extracts the items of one array of a streamed JSON object.
+    Like `JSONObjectScanner` it only visits structural characters. Text is fed chunk by chunk as the model produces it; every object item of the array stored
+    under `array_key` in the root object is returned as soon as its closing brace arrives.
+    Text before the root object, such as a markdown fence, is ignored.
+    """
+
+    def __init__(self, array_key: str) -> None:
+        """ Initialize the parser
+        Args:
+            array_key (str): Key of the array in the root object, e.g. "execution_plans".
+        """
+        self.array_key = array_key
+        self._buffer = ""
+        self._position = 0
+        self._stack: List[str] = []
+        self._root_started = False
+        self._in_string = False
+        self._escape_position = -1
+        self._string_start = -1
+        self._last_string = ""
+        self._current_key = ""
+        self._array_depth = 0
+        self._item_start = -1
+        self.array_closed = False
+
+    @property
+    def text(self) -> str:
+        """ All text fed so far """
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """ Feed the next chunk of text
+        Args:
+            chunk (str): The new text.
+        Returns:
+            List[Dict[str, Any]]: The array items completed by this chunk.
+        """
+        self._buffer += chunk
+        items: List[Dict[str, Any]] = []
+        buffer = self._buffer
+        for match in _ARRAY_STRUCTURE.finditer(buffer, self._position):
+            index = match.start()
+            char = match.group()
+            if index == self._escape_position:
                 continue
-    except Exception:
-        pass
-    
-    try:
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}[^{}]*)*\}'
-        json_matches = re.findall(json_pattern, content, re.DOTALL)
-        for match in json_matches:
-            try:
-                result_data = json.loads(match)
-                return result_data
-            except json.JSONDecodeError:
+            if not self._root_started:
+                if char == "{":
+                    self._root_started = True
+                    self._stack.append(char)
                 continue
-    except Exception:
-        pass
-    
-    logging.error(f"JSON parsing failed, original content: {content[:200]}...")
-    return dict()
\ No newline at end of file
+            if self._in_string:
+                if char == "\\":
+                    self._escape_position = index + 1
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = buffer[self._string_start + 1:index]
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":" and len(self._stack) == 1:
+                self._current_key = self._last_string
+            elif char in "{[":
+                if char == "{" and self._array_depth and len(self._stack) == self._array_depth:
+                    self._item_start = index
+                self._stack.append(char)
+                if char == "[" and len(self._stack) == 2 and self._current_key == self.array_key and not self.array_closed:
+                    self._array_depth = 2
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if char == "}" and self._item_start >= 0 and len(self._stack) == self._array_depth:
+                    try:
+                        item = json.loads(buffer[self._item_start:index + 1])
+                        if isinstance(item, dict):
+                            items.append(item)  # type: ignore
+                    except json.JSONDecodeError:
+                        logging.warning(f"Skipping unparsable array item: {buffer[self._item_start:index + 1][:200]}")
+                    self._item_start = -1
+                elif char == "]" and self._array_depth and len(self._stack) == self._array_depth - 1:
+                    self._array_depth = 0
+                    self.array_closed = True
+        self._position = len(buffer)
+        return items
@@ -1,9 +1,13 @@
 
 import json
+import base64
 import inspect
 
+import numpy as np
 
-from typing import Any, Dict
+from typing import Any, Dict, List
+
+from utils.stats_util import latency_summary
 
 
 
@@ -85,4 +89,38 @@ def serializable_llm_result(obj: Any) -> Any:
           return json.dumps(obj)
       except Exception:
           return repr(obj)
-  
+
+
+def encode_float32(vectors: np.ndarray) -> str:
+    """Encode vectors as base64 of their little-endian float32 bytes, row after row."""
+    return base64.b64encode(np.ascontiguousarray(vectors, dtype="<f4").tobytes()).decode("ascii")
+
+
+def serializable_batch_item(index: int, result: Any, latency: float) -> Dict[str, Any]:
+    """Convert one batch chat result, a message or an exception, to a JSON-serializable dict."""
+    if isinstance(result, Exception):
+        return {"index": index, "error": f"{type(result).__name__}: {result}", "latency": round(latency, 3)}
+    return {
+        "index": index,
+        "content": serializable_llm_result(result),
+        "usage": getattr(result, "usage_metadata", None),
+        "latency": round(latency, 3),
+    }
+
+
+def batch_summary(items: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Aggregate counts, latency percentiles and token usage of serialized batch chat items."""
+    usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+    for item in items:
+        for key in usage:
+            usage[key] += (item.get("usage") or {}).get(key, 0)
+    failed = sum(1 for item in items if "error" in item)
+    return {
+        "count": len(items),
+        "succeeded": len(items) - failed,
+        "failed": failed,
+        "duration": round(duration, 3),
+        "throughput": round(len(items) / duration, 2) if duration > 0 else 0.0,
+        "latency_ms": latency_summary(item["latency"] for item in items),
+        "usage": usage,
+    }
@@ -0,0 +1,205 @@
+
+
+import json
+
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+
+from utils.json_util import JSONObjectScanner
+from graph.states.plan_state import ExecutionPlan
+
+
+# Python literals models sometimes write instead of their JSON spelling
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+_CLOSING = {"{": "}", "[": "]"}
+
+
+def repair_json_text(text: str) -> str:
+    """ Apply cheap, local fixes to almost-JSON written by a model
+    In a single string-aware pass: `//` comments are dropped, single-quoted strings, Python
+    literals and raw newlines inside strings are rewritten, stray commas are removed and a
+    truncated text is cut back to its last complete object in an array, so a half-written step
+    is dropped, before its brackets are closed.
+    Args:
+        text (str): Text starting at the first `{` or `[` of the JSON.
+    Returns:
+        str: The repaired text, which may still be invalid JSON.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    # output length and open brackets after the last complete object in an array, where a truncated text is cut
+    safe_point: Optional[Tuple[int, List[str]]] = None
+    quote = ""
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if quote:
+            if char == "\\" and index + 1 < len(text):
+                # `\'` is only an escape inside single-quoted strings
+                out.append("'" if text[index + 1] == "'" else text[index:index + 2])
+                index += 2
+                continue
+            if char == quote:
+                out.append('"')
+                quote = ""
+            elif char == '"':
+                out.append('\\"')
+            elif char == "\n":
+                out.append("\\n")
+            elif char not in "\r":
+                out.append(char)
+            index += 1
+            continue
+
+        if char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+        elif char in "}]":
+            while out and out[-1] in " \t\r\n,":
+                out.pop()
+            opened = stack.pop() if stack else "{"
+            out.append(_CLOSING[opened])
+            if not stack:
+                break
+            if opened == "{" and stack[-1] == "[":
+                safe_point = (len(out), list(stack))
+        elif char == ",":
+            # drop a doubled comma or a comma right after an opening bracket
+            previous = next((piece for piece in reversed(out) if not piece.isspace()), "")
+            if previous[-1:] not in ("", ",", "{", "["):
+                out.append(char)
+        elif text.startswith("//", index):
+            newline = text.find("\n", index)
+            index = len(text) if newline < 0 else newline
+            continue
+        elif char.isalpha():
+            end = index
+            while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[index:end]
+            out.append(_LITERALS.get(word, word))
+            index = end
+            continue
+        else:
+            out.append(char)
+        index += 1
+
+    if quote or stack:
+        # Truncated output: keep the complete elements and close what is still open
+        if safe_point is None:
+            return "".join(out)
+        out, stack = out[:safe_point[0]], safe_point[1]
+        while out and out[-1] in " \t\r\n,":
+            out.pop()
+        out.extend(_CLOSING[bracket] for bracket in reversed(stack))
+    return "".join(out)
+
+
+def _validate(data: Any) -> Tuple[Optional[Dict[str, Any]], str]:
+    try:
+        return ExecutionPlan.model_validate(data).model_dump(), ""
+    except ValidationError as e:
+        return None, str(e)
+
+
+def parse_execution_plan(content: str) -> Tuple[Optional[Dict[str, Any]], str, str]:
+    """ Parse and validate a plan written by the planner, repairing it locally when needed
+    Args:
+        content (str): The planner output, or the arguments of its plan tool call.
+    Returns:
+        Tuple[Optional[Dict[str, Any]], str, str]: The validated plan or None, the outcome
+            ("valid", "repaired" or "failed") and the last parse or validation error.
+    """
+    text = (content or "").strip()
+    try:
+        plan, error = _validate(json.loads(text))
+        if plan is not None:
+            return plan, "valid", ""
+    except json.JSONDecodeError as e:
+        error = str(e)
+
+    candidates: List[Any] = []
+    # The first complete object, when the JSON is wrapped in prose or a code fence
+    scanner = JSONObjectScanner()
+    found = scanner.feed(text) or scanner.finish()
+    if found is not None:
+        candidates.append(found)
+    # The text itself, with comments, literals, trailing commas and truncation fixed
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if starts:
+        try:
+            candidates.append(json.loads(repair_json_text(text[min(starts):])))
+        except json.JSONDecodeError as e:
+            error = str(e)
+
+    for candidate in candidates:
+        if isinstance(candidate, list):
+            # A bare list of steps
+            candidate = {"execution_plans": candidate}
+        plan, validation_error = _validate(candidate)
+        if plan is not None:
+            return plan, "repaired", ""
+        error = validation_error
+    return None, "failed", error
+
+
+class PlanningStats:
+    """ Counters of how planner outputs were parsed, exposed by the stats endpoint """
+
+    _instance = None
+
+    def __new__(cls):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """ Initialize PlanningStats """
+        if getattr(self, "_initialized", False):
+            return
+        self._outcomes: Dict[str, Dict[str, int]] = {}
+        self._retries = 0
+        self._failed_plans = 0
+        self._initialized = True
+
+    def record(self, mode: str, outcome: str) -> None:
+        """ Record the parse outcome of one planner output
+        Args:
+            mode (str): The planning mode that produced the output.
+            outcome (str): "valid", "repaired" or "failed".
+        """
+        counters = self._outcomes.setdefault(mode, {"valid": 0, "repaired": 0, "failed": 0})
+        counters[outcome] += 1
+
+    def record_retry(self) -> None:
+        """ Record an extra planning LLM call made because the output could not be repaired """
+        self._retries += 1
+
+    def record_failed_plan(self) -> None:
+        """ Record a plan that stayed invalid after every attempt """
+        self._failed_plans += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """ Get planning statistics
+        `parse_failure_rate` is the share of outputs that were not valid as written, `repair_rate`
+        the share of those that local repair saved without another LLM call.
+        """
+        modes: Dict[str, Any] = {}
+        for mode, counters in self._outcomes.items():
+            outputs = sum(counters.values())
+            invalid = counters["repaired"] + counters["failed"]
+            modes[mode] = {
+                **counters,
+                "outputs": outputs,
+                "parse_failure_rate": round(invalid / outputs, 4) if outputs else 0.0,
+                "repair_rate": round(counters["repaired"] / invalid, 4) if invalid else 0.0,
+            }
+        return {"modes": modes, "retries": self._retries, "failed_plans": self._failed_plans}
+
+
+# Global planning statistics instance
+planning_stats = PlanningStats()
@@ -0,0 +1,100 @@
+
+
+from typing import Any, Dict, List, Optional, Set
+
+
+def _coerce_step_number(value: Any) -> int:
+    """ Coerce a step reference produced by the model into an int, or -1 if it is unusable."""
+    if isinstance(value, bool):
+        return -1
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value.strip())
+    return -1
+
+
+def normalize_execution_plans(execution_plans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """ Normalize plan steps so every step has a unique integer `step` and a clean `depends_on` list.
+    Steps without an explicit `depends_on` depend on the previous step, so plans written
+    without dependency edges still run strictly in order.
+    Args:
+        execution_plans (List[Dict[str, Any]]): The raw steps returned by the planner.
+    Returns:
+        List[Dict[str, Any]]: New step dicts ordered as given, with normalized `step` and `depends_on`.
+    """
+    steps: List[Dict[str, Any]] = [dict(step) for step in execution_plans if isinstance(step, dict)]  # type: ignore
+
+    # Renumber when the model produced missing or duplicated step numbers
+    numbers = [_coerce_step_number(step.get("step")) for step in steps]
+    if any(n < 1 for n in numbers) or len(set(numbers)) != len(numbers):
+        numbers = list(range(1, len(steps) + 1))
+
+    known: Set[int] = set(numbers)
+    for index, (step, number) in enumerate(zip(steps, numbers)):
+        step["step"] = number
+        raw_depends_on = step.get("depends_on")
+        if raw_depends_on is None:
+            step["depends_on"] = [numbers[index - 1]] if index > 0 else []
+            continue
+        if not isinstance(raw_depends_on, (list, tuple)):
+            raw_depends_on = [raw_depends_on]
+        depends_on: List[int] = []
+        for dep in raw_depends_on:  # type: ignore
+            dep_number = _coerce_step_number(dep)
+            if dep_number in known and dep_number != number and dep_number not in depends_on:
+                depends_on.append(dep_number)
+        step["depends_on"] = depends_on
+    return steps
+
+
+class StreamingPlanNormalizer:
+    """ Normalize plan steps one by one while the planner is still streaming the plan.
+    Steps keep their own number when it is valid and unused, otherwise they get the next free
+    number. A step without `depends_on` depends on the previous step, as in
+    `normalize_execution_plans`. References to steps that have not arrived yet are kept until
+    `finalize`, so the scheduler waits for them.
+    """
+
+    def __init__(self) -> None:
+        self.steps: List[Dict[str, Any]] = []
+        self._numbers: Set[int] = set()
+
+    def add(self, raw_step: Any) -> Optional[Dict[str, Any]]:
+        """ Normalize the next streamed step
+        Args:
+            raw_step (Any): The raw step returned by the planner.
+        Returns:
+            Optional[Dict[str, Any]]: The normalized step, or None when it is not a step object.
+        """
+        if not isinstance(raw_step, dict):
+            return None
+        step: Dict[str, Any] = dict(raw_step)  # type: ignore
+        number = _coerce_step_number(step.get("step"))
+        if number < 1 or number in self._numbers:
+            number = max(self._numbers | {len(self.steps)}) + 1
+        step["step"] = number
+
+        raw_depends_on = step.get("depends_on")
+        if raw_depends_on is None:
+            step["depends_on"] = [self.steps[-1]["step"]] if self.steps else []
+        else:
+            if not isinstance(raw_depends_on, (list, tuple)):
+                raw_depends_on = [raw_depends_on]
+            depends_on: List[int] = []
+            for dep in raw_depends_on:  # type: ignore
+                dep_number = _coerce_step_number(dep)
+                if dep_number >= 1 and dep_number != number and dep_number not in depends_on:
+                    depends_on.append(dep_number)
+            step["depends_on"] = depends_on
+
+        self._numbers.add(number)
+        self.steps.append(step)
+        return step
+
+    def finalize(self) -> List[Dict[str, Any]]:
+        """ Drop references to steps that never arrived
+        Returns:
+            List[Dict[str, Any]]: The normalized plan.
+        """
+        return normalize_execution_plans(self.steps)
@@ -0,0 +1,33 @@
+
+
+from typing import Dict, Iterable, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """ Nearest-rank percentile of already sorted values
+    Args:
+        sorted_values (Sequence[float]): The values in ascending order.
+        q (float): The percentile as a fraction, e.g. 0.95.
+    Returns:
+        float: The percentile, 0.0 when there are no values.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def latency_summary(seconds: Iterable[float]) -> Dict[str, float]:
+    """ Summarize latencies in milliseconds
+    Args:
+        seconds (Iterable[float]): Latencies in seconds.
+    Returns:
+        Dict[str, float]: avg, p50, p95, p99 and max, in milliseconds.
+    """
+    values = sorted(seconds)
+    return {
+        "avg": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        "p50": round(percentile(values, 0.5) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "max": round(values[-1] * 1000, 2) if values else 0.0,
+    }
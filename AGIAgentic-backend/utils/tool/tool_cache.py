@@ -0,0 +1,166 @@
+
+
+import copy
+import json
+import functools
+
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.runnables.config import run_in_executor
+from langchain_core.callbacks.manager import adispatch_custom_event
+
+from common.cache import LRUTTLCache
+from common.logger import logger
+from conf.config import config_manager
+from services.tool import tool_catalog_version
+
+
+# Name of the custom event dispatched from inside a tool run when its result came from the cache
+TOOL_CACHE_HIT_EVENT = "tool_cache_hit"
+
+# Arguments injected by the runtime, never part of a cache key
+_INJECTED_ARGS = {"runtime", "config", "callbacks", "run_manager", "state", "store", "tool_call_id"}
+
+_MISSING = object()
+
+
+def _copy(value: Any) -> Any:
+  """ A copy of a mutable result, so callers never share the cached value """
+  return copy.deepcopy(value) if isinstance(value, (dict, list, set)) else value
+
+
+class ToolResultCache:
+  """ Shared LRU cache of tool results, see `memoize_tools`
+  Results are keyed by tool name, tool catalog version and arguments, mutable results are copied in and out.
+  """
+
+  _instance = None
+
+  def __new__(cls):
+    if not cls._instance:
+      cls._instance = super().__new__(cls)
+    return cls._instance
+
+  def __init__(self):
+    """ Initialize ToolResultCache """
+    if getattr(self, "_initialized", False):
+      return
+    self._cache: LRUTTLCache[Any] = LRUTTLCache(max_size=config_manager.tools_config.CACHE_MAX_SIZE)
+    self._tool_hits: Dict[str, int] = {}
+    self._tool_misses: Dict[str, int] = {}
+    self._initialized = True
+
+  def get(self, key: Tuple[Any, ...], ttl: float) -> Any:
+    """ Get a copy of a cached result, `_MISSING` on a miss """
+    value = self._cache.get(key, ttl=ttl)
+    counters = self._tool_misses if value is None else self._tool_hits
+    counters[key[0]] = counters.get(key[0], 0) + 1
+    return _MISSING if value is None else _copy(value)
+
+  def set(self, key: Tuple[Any, ...], value: Any) -> None:
+    """ Cache a copy of a result, None results are not cached """
+    if value is not None:
+      self._cache.set(key, _copy(value))
+
+  def clear(self) -> None:
+    self._cache.clear()
+
+  def stats(self) -> Dict[str, Any]:
+    """ Get tool result cache statistics, overall and per tool """
+    tools = sorted(set(self._tool_hits) | set(self._tool_misses))
+    return {
+      **self._cache.stats(),
+      "tools": {name: {"hits": self._tool_hits.get(name, 0), "misses": self._tool_misses.get(name, 0)} for name in tools},
+    }
+
+
+def get_cache_policy(tool: BaseTool) -> Optional[Dict[str, Any]]:
+  """ Read the cache policy a tool opted into through its metadata
+  A tool opts in with `metadata={"cache": {"ttl": 60, "key_args": ["city"]}}`; `ttl` falls back to
+  `TOOLS_CACHE_DEFAULT_TTL` and `key_args` to every non-injected argument.
+  Args:
+      tool (BaseTool): The tool.
+  Returns:
+      Optional[Dict[str, Any]]: The normalized policy, or None when the tool is not cacheable.
+  """
+  policy = (getattr(tool, "metadata", None) or {}).get("cache")
+  if not policy:
+    return None
+  if policy is True:
+    policy = {}
+  return {
+    "ttl": float(policy.get("ttl", config_manager.tools_config.CACHE_DEFAULT_TTL)),
+    "key_args": list(policy.get("key_args") or []),
+  }
+
+
+def _cache_key(tool_name: str, key_args: List[str], kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+  arguments = {
+    name: value for name, value in kwargs.items()
+    if name not in _INJECTED_ARGS and (not key_args or name in key_args)
+  }
+  # results of a tool definition replaced by a catalog refresh never match
+  return (tool_name, tool_catalog_version(), json.dumps(arguments, sort_keys=True, ensure_ascii=False, default=str))
+
+
+def memoize_tool(tool: BaseTool) -> BaseTool:
+  """ Wrap a tool that opted into caching so identical calls are served from the result cache
+  Args:
+      tool (BaseTool): The tool.
+  Returns:
+      BaseTool: A memoized copy of the tool, or the tool itself when it is not cacheable.
+  """
+  policy = get_cache_policy(tool)
+  if policy is None:
+    return tool
+  if not isinstance(tool, StructuredTool):
+    logger.warning(f"Tool '{tool.name}' requests caching but is not a StructuredTool, it is left uncached.")
+    return tool
+
+  cache = ToolResultCache()
+  tool_name, ttl, key_args = tool.name, policy["ttl"], policy["key_args"]
+  func, coroutine = tool.func, tool.coroutine
+
+  async def _acall(**kwargs: Any) -> Any:
+    key = _cache_key(tool_name, key_args, kwargs)
+    value = cache.get(key, ttl)
+    if value is not _MISSING:
+      # Mark the enclosing tool span as a cache hit
+      try:
+        await adispatch_custom_event(TOOL_CACHE_HIT_EVENT, {"tool": tool_name})
+      except Exception:
+        pass
+      return value
+    if coroutine is not None:
+      value = await coroutine(**kwargs)
+    else:
+      value = await run_in_executor(None, func, **kwargs) # type: ignore
+    cache.set(key, value)
+    return value
+
+  def _call(**kwargs: Any) -> Any:
+    key = _cache_key(tool_name, key_args, kwargs)
+    value = cache.get(key, ttl)
+    if value is _MISSING:
+      value = func(**kwargs) # type: ignore
+      cache.set(key, value)
+    return value
+
+  # Keep the original signatures, they drive argument injection
+  update: Dict[str, Any] = {"coroutine": functools.wraps(coroutine or func)(_acall)} # type: ignore
+  if func is not None:
+    update["func"] = functools.wraps(func)(_call)
+  logger.info(f"Tool '{tool_name}' results are cached, ttl: {ttl}s, key args: {key_args or 'all'}")
+  return tool.model_copy(update=update)
+
+
+def memoize_tools(tools: List[Any]) -> List[Any]:
+  """ Memoize every tool that opted into caching
+  Args:
+      tools (List[Any]): The tools.
+  Returns:
+      List[Any]: The tools, cacheable ones replaced by memoized copies.
+  """
+  if not config_manager.tools_config.CACHE_ENABLED:
+    return tools
+  return [memoize_tool(tool) if isinstance(tool, BaseTool) else tool for tool in tools]